@@ -1,18 +1,32 @@
 #PTT 黑特政治版
 
-import requests
 from bs4 import BeautifulSoup
 import csv
-import time
+import os
 
 from ckip_transformers.nlp import CkipWordSegmenter
 
+from crawler_common.async_fetch import AsyncFetcher
+from crawler_common.board_index import crawl_board
+from crawler_common.html_archive import HTMLArchive
+from crawler_common.http_cache import HTTPCache, cached_get
+from crawler_common.http_client import get_session
+from crawler_common.near_dup import NearDupIndex
+from crawler_common.ptt_parser import extract_board_article
+from crawler_common.push_time import article_posted_at, normalize_push_times
+from crawler_common.rate_control import get_controller
+from crawler_common.seen_urls import SeenURLStore
+from crawler_common.watermark import BoardWatermarks
+
     
 headers = {'User-Agent': 'Mozilla/5.0'}
 cookies = {'over18': '1'}
+# 共用的 keep-alive 連線池，索引頁與文章都重用同一批連線；
+# 連線池內建 AIMD 自適應限速（起始每秒 2 次，之後依 429 / 延遲自動調整），取代固定的 sleep
+session = get_session()
 
 def get_articles_from_index(index_url):
-    res = requests.get(index_url, headers=headers, cookies=cookies)
+    res = session.get(index_url, headers=headers, cookies=cookies)
     res.encoding = 'utf-8'
     soup = BeautifulSoup(res.text, 'html.parser')
     titles = soup.find_all('div', class_='title')
@@ -31,37 +45,36 @@ def get_prev_page_url(soup):
             return 'https://www.ptt.cc' + btn['href']
     return None
 
-def crawl_article(article_url):
-    res = requests.get(article_url, headers=headers, cookies=cookies)
+def crawl_article(article_url, cache=None, archive=None):
+    # cache 為 HTTPCache 時送出條件式請求，沒變動的文章只會收到 304
+    # archive 為 HTMLArchive 時下載到的原始 HTML 會寫入壓縮封存
+    res = cached_get(session, article_url, cache, headers=headers, cookies=cookies, archive=archive)
     res.encoding = 'utf-8'
-    soup = BeautifulSoup(res.text, 'html.parser')
-
-    title_tag = soup.find('title')
-    title = title_tag.text if title_tag else '無標題'
-
-    main_content = soup.find(id='main-content')
-    
-    # ❗只移除文章頭資訊，不移除留言
-    for tag in main_content.find_all(['div', 'span'], class_=['article-metaline', 'article-metaline-right']):
-        tag.decompose()
-
-    content = main_content.text.strip()
-
-    pushes = soup.find_all('div', class_='push')
-    comments = []
-    for push in pushes:
-        tag = push.find('span', class_=lambda x: x and 'push-tag' in x)
-        user = push.find('span', class_=lambda x: x and 'push-userid' in x)
-        msg = push.find('span', class_=lambda x: x and 'push-content' in x)
-        if tag and user and msg:
-            content_text = msg.text.lstrip(': ').strip()
-            comments.append([tag.text.strip(), user.text.strip(), content_text])
-    
-    return title, content, comments
-
-
-def save_to_csv(filename, articles):
-    with open(filename, mode='w', encoding='utf-8-sig', newline='') as f:
+    return parse_article(res.text)
+
+def parse_article(html):
+    # 單次走訪 lxml 樹取出標題、正文（保留留言）與推文
+    return extract_board_article(html)
+
+def add_comment_times(url, comments):
+    # 推文時間只有「MM/DD HH:MM」，依發文時間補上年份並轉成 ISO 8601（無法解析的保留原文）
+    times = normalize_push_times([row[3] for row in comments], article_posted_at(url))
+    for row, pushed_at in zip(comments, times):
+        if pushed_at:
+            row[3] = pushed_at.isoformat()
+    return comments
+
+
+def open_output_csv(filename, append=False):
+    # append=True（增量爬取）時接在既有檔案後面，否則重新寫一個檔案；
+    # 每篇文章自成一段，附加時不必再寫表頭，BOM 也只在新檔開頭寫一次
+    append = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+    if append:
+        return open(filename, mode='a', encoding='utf-8', newline='')
+    return open(filename, mode='w', encoding='utf-8-sig', newline='')
+
+def save_to_csv(filename, articles, append=False):
+    with open_output_csv(filename, append) as f:
         writer = csv.writer(f)
         for art in articles:
             title, content, comments = art
@@ -69,51 +82,122 @@ def save_to_csv(filename, articles):
             writer.writerow(['文章內容'])
             writer.writerow([content])
             writer.writerow([])
-            writer.writerow(['推文類型', '使用者', '留言內容'])
+            writer.writerow(['推文類型', '使用者', '留言內容', '推文時間'])
             writer.writerows(comments)
             writer.writerow([])
             writer.writerow(['-'*80])
             writer.writerow([])
 
-def main(pages_to_crawl=3, output_csv='HatePolitics_MultiPages.csv'):
-    base_url = 'https://www.ptt.cc/bbs/HatePolitics/index.html'
+def main(pages_to_crawl=3, output_csv='HatePolitics_MultiPages.csv', cache_dir='http_cache',
+         board='HatePolitics', watermark_file=None, parallel_index=False, window=8, dedup_file=None,
+         seen_file=None, archive_dir=None):
+    # watermark_file: 設定後只爬上次之後的新文章，翻到更舊的文章就停止（適合排程增量爬取）
+    # parallel_index: 由 index.html 的頁碼直接產生 index{k}.html，每次並行抓 window 頁，文章隨即排入抓取
+    # dedup_file: 跨看板近似重複索引，轉錄/重貼的文章不寫入 CSV，也就不會重複斷詞
+    # seen_file: 跨執行保留的已爬網址紀錄（Bloom filter + SQLite），爬過的文章不會再下載
+    # archive_dir: 原始 HTML 封存資料夾，改了擷取規則後可用 python -m crawler_common.html_archive reparse 離線重跑
+    base_url = f'https://www.ptt.cc/bbs/{board}/index.html'
     crawled_urls = set()
     all_articles = []
-
-    current_url = base_url
-    for page in range(pages_to_crawl):
-        print(f'爬第 {page+1} 頁：{current_url}')
-        article_links, soup = get_articles_from_index(current_url)
-
-        # 過濾重複文章
-        new_links = [url for url in article_links if url not in crawled_urls]
-        print(f'找到 {len(new_links)} 篇新文章')
-
-        for url in new_links:
-            print(f'爬文章：{url}')
-            try:
-                title, content, comments = crawl_article(url)
-                all_articles.append((title, content, comments))
+    cache = HTTPCache(cache_dir) if cache_dir else None
+    watermarks = BoardWatermarks(watermark_file) if watermark_file else None
+    dedup = NearDupIndex(dedup_file) if dedup_file else None
+    seen = SeenURLStore(seen_file) if seen_file else None
+    archive = HTMLArchive(archive_dir) if archive_dir else None
+    # 水位線只在這次翻到上次的位置、而且沒有文章失敗時才推進
+    status = {'reached': False, 'errors': 0}
+
+    def is_duplicate(url, content):
+        canonical = dedup.check(url, content) if dedup else None
+        if canonical:
+            print(f'近似重複，略過：{url} → {canonical}')
+        return canonical is not None
+
+    if parallel_index:
+        fetcher = AsyncFetcher(session=session, headers=headers, cookies=cookies, cache=cache,
+                               archive=archive)
+        try:
+            for url, article in crawl_board(fetcher, board, pages_to_crawl, parse_article,
+                                            window=window, watermarks=watermarks, skip_urls=seen,
+                                            status=status):
                 crawled_urls.add(url)
-                time.sleep(0.5)  # 請勿太快爬，避免被擋
-            except Exception as e:
-                print(f'爬文章錯誤: {e}')
+                if seen is not None:
+                    seen.add(url, source=board)
+                add_comment_times(url, article[2])
+                if not is_duplicate(url, article[1]):
+                    all_articles.append(article)
+        finally:
+            fetcher.close()
+    else:
+        current_url = base_url
+        for page in range(pages_to_crawl):
+            print(f'爬第 {page+1} 頁：{current_url}')
+            article_links, soup = get_articles_from_index(current_url)
+
+            # 過濾重複文章
+            new_links = [url for url in article_links
+                         if url not in crawled_urls and not (seen is not None and url in seen)]
+            reached_old = False
+            if watermarks:
+                reached_old = watermarks.reached(board, article_links)
+                new_links = [url for url in new_links if watermarks.is_new(board, url)]
+            print(f'找到 {len(new_links)} 篇新文章')
+
+            for url in new_links:
+                print(f'爬文章：{url}')
+                try:
+                    title, content, comments = crawl_article(url, cache, archive)
+                    add_comment_times(url, comments)
+                    crawled_urls.add(url)
+                    if seen is not None:
+                        seen.add(url, source=board)
+                    if not is_duplicate(url, content):
+                        all_articles.append((title, content, comments))
+                except Exception as e:
+                    print(f'爬文章錯誤: {e}')
+                    status['errors'] += 1
         
-        prev_url = get_prev_page_url(soup)
-        if not prev_url:
-            print('沒有上一頁了，結束爬取')
-            break
-        current_url = prev_url
-
+            if reached_old:
+                print('已到達上次爬取的位置，結束爬取')
+                status['reached'] = True
+                break
+
+            prev_url = get_prev_page_url(soup)
+            if not prev_url:
+                print('沒有上一頁了，結束爬取')
+                status['reached'] = True
+                break
+            current_url = prev_url
+
+    session.print_stats()
+    get_controller().print_stats()
+    if cache:
+        cache.print_stats()
+    if archive:
+        archive.print_stats()
+        archive.close()
+    if seen is not None:
+        seen.print_stats()
+        seen.close()
+    if dedup:
+        dedup.print_stats()
+        dedup.save()
+    if watermarks:
+        watermarks.advance(board, crawled_urls, status['reached'], status['errors'])
+        watermarks.save()
     print(f'共爬取 {len(all_articles)} 篇文章，開始存檔...')
-    save_to_csv(output_csv, all_articles)
+    # 增量爬取時每次只有新文章，附加到之前的結果後面；一般爬取則重寫整個檔案
+    save_to_csv(output_csv, all_articles, append=bool(watermark_file or seen_file))
     print(f'完成！存檔路徑：{output_csv}')
+    return all_articles
 
 if __name__ == '__main__':
     # 你可以修改參數，設定要爬幾頁
     # --- PTT 爬蟲區段 ---
     # （這部分就是你原本的爬蟲程式，包含 main()）
-    main(pages_to_crawl=1)
+    # 設定 watermark_file 後每次只會爬上次之後的新文章，pages_to_crawl 成為翻頁上限
+    new_articles = main(pages_to_crawl=1, watermark_file='ptt_watermarks.json', dedup_file='ptt_near_dup.json',
+                        seen_file='ptt_crawled_urls', archive_dir='html_archive')
 
     # --- CKIP 斷詞區段 ---
    
@@ -121,40 +205,15 @@ if __name__ == '__main__':
     # 初始化斷詞器（第一次跑會下載模型，請保持網路）
     ws_driver = CkipWordSegmenter(model="bert-base")
 
-    # 讀取剛剛產出的 CSV
-    articles = []
-    with open('HatePolitics_MultiPages.csv', 'r', encoding='utf-8-sig') as f:
-        reader = csv.reader(f)
-        current_article = {'title': '', 'content': '', 'comments': []}
-        mode = ''
-        for row in reader:
-            if not row:
-                continue
-            if row[0] == '文章標題':
-                if current_article['title']:
-                    articles.append(current_article)
-                    current_article = {'title': '', 'content': '', 'comments': []}
-                current_article['title'] = row[1]
-                mode = ''
-            elif row[0] == '文章內容':
-                mode = 'content'
-            elif row[0] == '推文類型':
-                mode = 'comment'
-            elif row[0].startswith('--------------------------------------------------------------------------------'):
-                continue
-            else:
-                if mode == 'content':
-                    current_article['content'] += row[0] + '\n'
-                elif mode == 'comment' and len(row) == 3:
-                    current_article['comments'].append(row[2])
-        if current_article['title']:
-            articles.append(current_article)
+    # 只斷詞這次新爬到的文章（CSV 以附加模式累積，之前的文章已經斷詞過）
+    articles = [{'title': title, 'content': content, 'comments': [row[2] for row in comments if len(row) >= 3]}
+                for title, content, comments in new_articles]
 
     # 開始斷詞
     def segment_texts(texts):
         return ws_driver(texts)
 
-    with open('HatePolitics_segmented.csv', 'w', encoding='utf-8-sig', newline='') as f:
+    with open_output_csv('HatePolitics_segmented.csv', append=True) as f:
         writer = csv.writer(f)
         for article in articles:
             writer.writerow(['文章標題', article['title']])
@@ -173,6 +232,6 @@ if __name__ == '__main__':
             writer.writerow(['-' * 80])
             writer.writerow([])
 
-    print("斷詞完成，結果已儲存為 HatePolitics_segmented.csv")
+    print(f"斷詞完成，{len(articles)} 篇新文章已附加到 HatePolitics_segmented.csv")
 
 
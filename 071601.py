@@ -4,24 +4,29 @@ from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
 import time
 
+from crawler_common.replay import BrowserReplay
+
 # 1. 設定 Chrome Driver
 options = Options()
 options.add_argument("--start-maximized")
 driver = webdriver.Chrome(options=options)
+# CRAWLER_REPLAY=record 時保存頁面，replay 時略過登入直接讀取快照（見 crawler_common/replay.py）
+replay = BrowserReplay(driver)
 
-# 2. 打開 X 登入頁，請你手動登入
-driver.get("https://twitter.com/login")
-input("請登入完成後按 Enter 繼續...")
-
-# 3. 登入後進入目標用戶頁面
 target_url = "https://twitter.com/elonmusk"
-driver.get(target_url)
+if not replay.replaying:
+    # 2. 打開 X 登入頁，請你手動登入
+    driver.get("https://twitter.com/login")
+    input("請登入完成後按 Enter 繼續...")
+
+    # 3. 登入後進入目標用戶頁面
+    driver.get(target_url)
 
-# 4. 等待頁面動態內容載入
-time.sleep(5)
+    # 4. 等待頁面動態內容載入
+    time.sleep(5)
 
 # 5. 取得完整渲染後的 HTML
-html = driver.page_source
+html = replay.page_source(['twitter_user', target_url])
 
 # 6. 用 BeautifulSoup 解析
 soup = BeautifulSoup(html, "html.parser")
@@ -5,20 +5,25 @@ from bs4 import BeautifulSoup
 import time
 import urllib.parse
 
+from crawler_common.replay import BrowserReplay
+
 options = Options()
 options.add_argument("--start-maximized")
 driver = webdriver.Chrome(options=options)
-
-driver.get("https://twitter.com/login")
-input("請登入完成後按 Enter 繼續...")
+# CRAWLER_REPLAY=record 時保存頁面，replay 時略過登入直接讀取快照
+replay = BrowserReplay(driver)
 
 keyword = "台灣疫情"
 search_url = "https://twitter.com/search?q=" + urllib.parse.quote(keyword) + "&src=typed_query&f=live"
 
-driver.get(search_url)
-time.sleep(5)
+if not replay.replaying:
+    driver.get("https://twitter.com/login")
+    input("請登入完成後按 Enter 繼續...")
+
+    driver.get(search_url)
+    time.sleep(5)
 
-html = driver.page_source
+html = replay.page_source(['twitter_search', search_url])
 soup = BeautifulSoup(html, "html.parser")
 
 tweets = soup.find_all("article")
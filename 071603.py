@@ -4,32 +4,38 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
 
+from crawler_common.replay import BrowserReplay
+
 options = Options()
 options.add_argument("--start-maximized")
 driver = webdriver.Chrome(options=options)
-
-driver.get("https://twitter.com/login")
-input("請登入完成後按 Enter 繼續...")
+# CRAWLER_REPLAY=record 時保存滾動後的頁面，replay 時略過登入與滾動直接讀取快照
+replay = BrowserReplay(driver)
 
 keyword = "台灣疫情"
 search_url = f"https://twitter.com/search?q={keyword}&src=typed_query&f=live"
-driver.get(search_url)
-time.sleep(5)
 
-# 模擬滾動多次，讓頁面載入更多推文
-scroll_pause_time = 2
-last_height = driver.execute_script("return document.body.scrollHeight")
+if not replay.replaying:
+    driver.get("https://twitter.com/login")
+    input("請登入完成後按 Enter 繼續...")
+
+    driver.get(search_url)
+    time.sleep(5)
+
+    # 模擬滾動多次，讓頁面載入更多推文
+    scroll_pause_time = 2
+    last_height = driver.execute_script("return document.body.scrollHeight")
 
-for _ in range(5):  # 滾動 5 次
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(scroll_pause_time)
-    new_height = driver.execute_script("return document.body.scrollHeight")
-    if new_height == last_height:
-        break
-    last_height = new_height
+    for _ in range(5):  # 滾動 5 次
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        time.sleep(scroll_pause_time)
+        new_height = driver.execute_script("return document.body.scrollHeight")
+        if new_height == last_height:
+            break
+        last_height = new_height
 
 # 取得滾動後的完整 HTML
-html = driver.page_source
+html = replay.page_source(['twitter_search_scrolled', search_url])
 soup = BeautifulSoup(html, "html.parser")
 
 tweets = soup.find_all("article")
@@ -4,63 +4,23 @@ import re
 import time
 import json
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from crawler_common.link_store import open_master
 
 def save_to_master_json(new_data, keyword, filename):
     """
-    將新的搜尋結果累積到主要 JSON 檔案中，並去重
+    將新的搜尋結果累積到連結主檔（{主檔名}.sqlite，以網址唯一索引去重），
+    並匯出成原本格式的 JSON 檔案
     """
     try:
-        # 嘗試讀取現有的檔案
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                master_data = json.load(f)
-        else:
-            # 如果檔案不存在，創建新的結構
-            master_data = {
-                "created_time": time.strftime('%Y-%m-%d %H:%M:%S'),
-                "last_updated": "",
-                "search_history": [],
-                "total_unique_links": 0,
-                "all_links": []
-            }
-        
-        # 更新最後修改時間
-        master_data["last_updated"] = time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # 記錄這次搜尋
-        search_record = {
-            "keyword": keyword,
-            "search_time": time.strftime('%Y-%m-%d %H:%M:%S'),
-            "new_links_found": len(new_data)
-        }
-        master_data["search_history"].append(search_record)
-        
-        # 取得現有連結的 URL 集合（用於去重）
-        existing_urls = {link["url"] for link in master_data["all_links"]}
-        
-        # 添加新連結（去重）
-        new_links_added = 0
-        for link in new_data:
-            if link["url"] not in existing_urls:
-                # 添加搜尋關鍵字資訊
-                link_with_keyword = link.copy()
-                link_with_keyword["found_by_keyword"] = keyword
-                link_with_keyword["found_time"] = time.strftime('%Y-%m-%d %H:%M:%S')
-                
-                master_data["all_links"].append(link_with_keyword)
-                existing_urls.add(link["url"])
-                new_links_added += 1
-        
-        # 更新統計
-        master_data["total_unique_links"] = len(master_data["all_links"])
-        search_record["new_unique_links_added"] = new_links_added
-        
-        # 保存檔案
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(master_data, f, ensure_ascii=False, indent=2)
+        store = open_master(filename)
+        new_links_added = store.add_search(keyword, new_data)
+        store.export_json(filename)
         
         print(f"  本次新增 {new_links_added} 個不重複連結")
-        print(f"  累積總連結數：{master_data['total_unique_links']}")
+        print(f"  累積總連結數：{store.count()}")
         
     except Exception as e:
         print(f"保存到主檔案錯誤: {e}")
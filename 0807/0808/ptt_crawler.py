@@ -1,14 +1,33 @@
 import json
-import requests
 import re
 import time
 import os
-from bs4 import BeautifulSoup
+import sys
 import urllib.parse
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from crawler_common.async_fetch import AsyncFetcher
+from crawler_common.crawl_journal import CrawlJournal
+from crawler_common.html_archive import HTMLArchive
+from crawler_common.http_cache import HTTPCache, cached_get
+from crawler_common.http_client import PooledSession
+from crawler_common.pipeline import run_pipeline
+from crawler_common.ptt_parser import extract_crawler_article
+from crawler_common.push_time import add_push_times, article_posted_at
+from crawler_common.rate_control import AIMDController
+
 class PTTCrawler:
-    def __init__(self):
-        self.session = requests.Session()
+    def __init__(self, cache_dir=None, archive_dir=None):
+        """
+        cache_dir: 設定後啟用磁碟 HTTP 快取，重爬時沒變動的文章不再完整下載
+        archive_dir: 設定後把下載到的原始 HTML 寫入壓縮封存，可離線重新解析
+        """
+        self.cache = HTTPCache(cache_dir) if cache_dir else None
+        self.archive = HTMLArchive(archive_dir) if archive_dir else None
+        # 連線池內建 AIMD 自適應限速，取代每篇文章之間固定的 sleep；
+        # 每個爬蟲各用一個控制器，crawl_all_articles 設定的速率不影響程式中其他共用 get_controller() 的搜尋與爬取
+        self.rate_controller = AIMDController()
+        self.session = PooledSession(rate_controller=self.rate_controller)
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
         })
@@ -73,69 +92,22 @@ class PTTCrawler:
             
             print(f"正在爬取: {clean_url}")
             
-            response = self.session.get(clean_url, timeout=10)
+            response = cached_get(self.session, clean_url, self.cache, archive=self.archive, timeout=10)
             response.encoding = 'utf-8'
             
             if response.status_code != 200:
                 print(f"無法訪問文章，狀態碼: {response.status_code}")
                 return None
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
             # 提取文章資訊
             article_data = {
                 'url': clean_url,
-                'original_url': url if url != clean_url else clean_url,
-                'title': '',
-                'author': '',
-                'board': '',
-                'date': '',
-                'content': '',
-                'comments': []
+                'original_url': url if url != clean_url else clean_url
             }
-            
-            # 提取標題
-            title_elem = soup.find('span', class_='article-meta-value')
-            if title_elem:
-                article_data['title'] = title_elem.get_text().strip()
-            
-            # 提取作者、看板、日期
-            meta_spans = soup.find_all('span', class_='article-meta-value')
-            if len(meta_spans) >= 4:
-                article_data['author'] = meta_spans[0].get_text().strip()
-                article_data['board'] = meta_spans[1].get_text().strip()
-                article_data['title'] = meta_spans[2].get_text().strip()
-                article_data['date'] = meta_spans[3].get_text().strip()
-            
-            # 先提取推文/留言（在移除之前）
-            push_divs = soup.find_all('div', class_='push')
-            for push_div in push_divs:
-                push_tag = push_div.find('span', class_='push-tag')
-                push_userid = push_div.find('span', class_='push-userid')
-                push_content = push_div.find('span', class_='push-content')
-                push_ipdatetime = push_div.find('span', class_='push-ipdatetime')
-                
-                if push_tag and push_userid and push_content:
-                    comment = {
-                        'type': push_tag.get_text().strip(),
-                        'user': push_userid.get_text().strip(),
-                        'content': push_content.get_text().strip(),
-                        'datetime': push_ipdatetime.get_text().strip() if push_ipdatetime else ''
-                    }
-                    article_data['comments'].append(comment)
-            
-            # 提取文章內容（在提取推文後再移除推文區域）
-            main_content = soup.find('div', id='main-content')
-            if main_content:
-                # 移除推文區域
-                for push_div in main_content.find_all('div', class_='push'):
-                    push_div.decompose()
-                
-                # 移除其他不需要的元素
-                for elem in main_content.find_all(['span', 'div'], class_=['article-meta-tag', 'article-meta-value']):
-                    elem.decompose()
-                
-                article_data['content'] = main_content.get_text().strip()
+            # 單次走訪 lxml 樹取出標題、作者、看板、日期、推文/留言與移除推文後的內容
+            article_data.update(extract_crawler_article(response.text))
+            # 推文只有「MM/DD HH:MM」，依發文時間補上年份成為 pushed_at
+            add_push_times(article_data['comments'], article_posted_at(clean_url, article_data['date']))
             
             print(f"成功爬取文章: {article_data['title']}")
             print(f"  作者: {article_data['author']}")
@@ -148,38 +120,101 @@ class PTTCrawler:
             print(f"爬取文章錯誤 {url}: {e}")
             return None
     
-    def crawl_all_articles(self, links, output_filename=None, delay=1):
-        """爬取所有文章"""
-        all_articles = []
+    def crawl_all_articles(self, links, output_filename=None, delay=1, journal_file=None,
+                           resume=False, max_attempts=3, concurrency=4, processes=None):
+        """
+        爬取所有文章（下載與解析分成兩段管線：下載並行、解析在行程池中進行）
+
+        Args:
+            delay (float): 起始的請求間隔秒數，之後由限速控制器依伺服器回應自動調整
+            journal_file (str): 爬取日誌檔，記錄每個網址的完成/失敗狀態，程式中斷後可接續
+            resume (bool): 接續既有日誌：略過已完成的網址，失敗的最多重試 max_attempts 次
+            concurrency (int): 同時下載的文章數（速率仍由限速控制器控制）
+            processes (int): 解析行程數，None 為 CPU 核心數減一，0 表示在主行程解析
+        """
         invalid_links = 0
         failed_crawls = 0
+        skipped = 0
+        if delay:
+            self.rate_controller.set_rate('www.ptt.cc', 1 / delay)
+        journal = CrawlJournal(journal_file, resume=resume, max_attempts=max_attempts) if journal_file else None
+        if journal:
+            journal.add_pending(link_info['url'] for link_info in links)
         
-        for i, link_info in enumerate(links, 1):
+        # 先驗證連結，清理後的網址對應回原始連結
+        originals_by_url = {}
+        for link_info in links:
             url = link_info['url']
-            print(f"\n進度: {i}/{len(links)}")
-            
-            article_data = self.crawl_ptt_article(url)
-            if article_data:
-                all_articles.append(article_data)
-            else:
-                # 檢查是否為無效連結格式
-                is_valid, _ = self.validate_ptt_url(url)
-                if not is_valid:
-                    invalid_links += 1
-                else:
+            if journal and not journal.should_fetch(url):
+                skipped += 1
+                continue
+            is_valid, clean_url = self.validate_ptt_url(url)
+            if not is_valid:
+                print(f"無效的 PTT 連結格式: {url}")
+                invalid_links += 1
+                if journal:
+                    journal.mark_failed(url, '無效連結')
+                continue
+            originals_by_url.setdefault(clean_url, []).append(url)
+        
+        articles_by_url = {}
+        done = 0
+        
+        def handle(clean_url, parsed, error):
+            nonlocal done, failed_crawls
+            for url in originals_by_url[clean_url]:
+                done += 1
+                print(f"\n進度: {done}/{len(links) - skipped - invalid_links}")
+                if error is not None:
+                    print(f"爬取文章錯誤 {clean_url}: {error}")
                     failed_crawls += 1
-            
-            # 延遲避免被封鎖
-            if i < len(links):
-                print(f"等待 {delay} 秒...")
-                time.sleep(delay)
+                    if journal:
+                        journal.mark_failed(url, error)
+                    continue
+                article_data = {'url': clean_url, 'original_url': url}
+                article_data.update(parsed)
+                add_push_times(article_data['comments'], article_posted_at(clean_url, article_data['date']))
+                print(f"成功爬取文章: {article_data['title']}")
+                print(f"  作者: {article_data['author']}  看板: {article_data['board']}  "
+                      f"留言數: {len(article_data['comments'])}")
+                articles_by_url[url] = article_data
+                if journal:
+                    journal.mark_done(url, article_data)
+        
+        # 使用 PTTCrawler 自己的 Session（已帶 User-Agent、over18 cookie 與限速控制器）
+        fetcher = AsyncFetcher(concurrency=concurrency, per_host=concurrency, session=self.session,
+                               headers={}, cookies={}, cache=self.cache,
+                               archive=self.archive)
+        try:
+            stats = run_pipeline(fetcher, list(originals_by_url), extract_crawler_article, handle,
+                                 processes)
+            stats.print_stats()
+        finally:
+            fetcher.close()
+        all_articles = [articles_by_url[link_info['url']] for link_info in links
+                        if link_info['url'] in articles_by_url]
+        
+        if journal:
+            # 由日誌重建完整結果（包含先前執行中已完成的文章），順序與連結相同
+            all_articles = [journal.data(link_info['url']) for link_info in links
+                            if journal.data(link_info['url'])]
+            journal.print_summary()
+            journal.close()
         
         # 顯示統計資訊
         print(f"\n爬取統計:")
         print(f"  總連結數: {len(links)}")
+        if skipped:
+            print(f"  日誌略過: {skipped}")
         print(f"  成功爬取: {len(all_articles)}")
         print(f"  無效連結: {invalid_links}")
         print(f"  爬取失敗: {failed_crawls}")
+        if self.cache:
+            self.cache.print_stats()
+        if self.archive:
+            self.archive.flush()
+            self.archive.print_stats()
+        self.rate_controller.print_stats()
         
         # 保存結果
         if output_filename:
@@ -248,7 +283,7 @@ class PTTCrawler:
 
 
 def main():
-    crawler = PTTCrawler()
+    crawler = PTTCrawler(cache_dir='http_cache', archive_dir='html_archive')
     
     print("PTT 文章爬蟲程式")
     print("="*50)
@@ -307,7 +342,7 @@ def main():
             return
         
         # 設定延遲時間
-        delay = input("設定爬取延遲秒數 (預設 1 秒，避免被封鎖): ")
+        delay = input("設定起始爬取延遲秒數 (預設 1 秒，之後依伺服器回應自動調整): ")
         try:
             delay = float(delay) if delay else 1.0
         except ValueError:
@@ -319,12 +354,19 @@ def main():
         else:
             output_name = filename.replace('ptt_links_', 'ptt_articles_').replace('ptt_urls_', 'ptt_articles_').replace('.json', '').replace('.txt', '')
         
+        # 爬取日誌：中斷後可接續，不必從第一篇重新下載
+        journal_file = f"{output_name}_journal.jsonl"
+        resume = False
+        if os.path.exists(journal_file):
+            resume = input(f"找到上次的爬取日誌 {journal_file}，是否接續？(Y/n): ").strip().lower() != 'n'
+        
         print(f"\n開始爬取 {len(links)} 篇文章...")
-        print(f"延遲設定: {delay} 秒")
+        print(f"起始延遲設定: {delay} 秒（自適應調整）")
         print(f"輸出檔案將以 '{output_name}_時間戳記' 格式命名")
         print("注意: 爬取過程可能需要較長時間，請耐心等待...")
         
-        articles = crawler.crawl_all_articles(links, output_name, delay)
+        articles = crawler.crawl_all_articles(links, output_name, delay,
+                                              journal_file=journal_file, resume=resume)
         
         print(f"\n爬取完成！成功爬取 {len(articles)} 篇文章")
         
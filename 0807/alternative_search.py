@@ -6,9 +6,15 @@
 
 import requests
 import json
+import os
+import sys
 import urllib.parse
 import time
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common.search_cache import cached_search, get_search_cache
+
+@cached_search('SearX')
 def search_via_searx(query, max_results=10):
     """
     使用 SearX 搜尋引擎 (開源搜尋引擎)
@@ -62,6 +68,7 @@ def search_via_searx(query, max_results=10):
     
     return results
 
+@cached_search('Startpage (0807)')
 def search_via_startpage(query, max_results=10):
     """
     使用 Startpage 搜尋
@@ -180,6 +187,8 @@ def main():
     startpage_results = search_via_startpage(query, 5)
     all_results.extend(startpage_results)
     
+    get_search_cache().print_stats()
+    
     # 方法3: 直接 PTT URL
     print("\n方法3: 直接 PTT 搜尋連結")
     direct_urls = create_direct_ptt_urls(query)
@@ -7,6 +7,8 @@ Google Maps 爬蟲程式 - 改進版
 """
 
 import json
+import os
+import sys
 import time
 import re
 from selenium import webdriver
@@ -20,6 +22,9 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common.replay import BrowserReplay
+
 
 class GoogleMapsCrawler:
     def __init__(self, headless=False):
@@ -33,6 +38,8 @@ class GoogleMapsCrawler:
         self.wait = None
         self.results = []
         self.setup_driver(headless)
+        # CRAWLER_REPLAY=record 時保存搜尋結果頁，replay 時直接載入快照（見 crawler_common/replay.py）
+        self.replay = BrowserReplay(self.driver)
     
     def setup_driver(self, headless=False):
         """設置 Chrome 瀏覽器，使用 webdriver-manager 自動管理"""
@@ -296,16 +303,23 @@ class GoogleMapsCrawler:
         """主要爬蟲函數"""
         print("開始爬蟲程序...")
         
-        # 搜尋地址
-        if not self.search_address(address):
-            return False
-        
-        # 搜尋附近設施
-        if not self.search_nearby_facilities(facility_type):
-            return False
-        
-        # 等待結果載入
-        time.sleep(5)
+        snapshot_key = ['google_maps', address, facility_type]
+        if self.replay.replaying:
+            # 重播：略過搜尋步驟，直接載入錄下的搜尋結果頁
+            if not self.replay.restore(snapshot_key):
+                return False
+        else:
+            # 搜尋地址
+            if not self.search_address(address):
+                return False
+            
+            # 搜尋附近設施
+            if not self.search_nearby_facilities(facility_type):
+                return False
+            
+            # 等待結果載入
+            time.sleep(5)
+            self.replay.snapshot(snapshot_key)
         
         try:
             # 多種可能的結果容器選擇器
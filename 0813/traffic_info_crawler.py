@@ -6,6 +6,8 @@
 """
 
 import json
+import os
+import sys
 import time
 import re
 from selenium import webdriver
@@ -19,6 +21,9 @@ from selenium.webdriver.common.action_chains import ActionChains
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from webdriver_manager.chrome import ChromeDriverManager
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common.replay import BrowserReplay
+
 
 class TrafficInfoCrawler:
     def __init__(self, headless=False):
@@ -32,6 +37,8 @@ class TrafficInfoCrawler:
         self.wait = None
         self.results = []
         self.setup_driver(headless)
+        # CRAWLER_REPLAY=record 時保存路線頁，replay 時直接載入快照（見 crawler_common/replay.py）
+        self.replay = BrowserReplay(self.driver)
     
     def setup_driver(self, headless=False):
         """設置 Chrome 瀏覽器"""
@@ -189,8 +196,9 @@ class TrafficInfoCrawler:
         traffic_info = {}
         
         try:
-            # 等待路線資訊載入（減少等待時間）
-            time.sleep(3)
+            # 等待路線資訊載入（減少等待時間），重播的快照已經載入完成
+            if not self.replay.replaying:
+                time.sleep(3)
             
             # 尋找所有交通方式按鈕
             transport_buttons = self.driver.find_elements(By.XPATH, "//button[@class='m6Uuef']")
@@ -337,12 +345,17 @@ class TrafficInfoCrawler:
             try:
                 print(f"\n處理第 {i}/{len(facilities)} 個設施: {facility['設施名稱']}")
                 
-                # 搜尋路線
-                success = self.search_facility_directions(
-                    start_address, 
-                    facility['設施名稱'], 
-                    facility['地址']
-                )
+                snapshot_key = ['directions', start_address, facility['設施名稱'], facility['地址']]
+                if self.replay.replaying:
+                    # 重播：略過輸入與點擊，直接載入錄下的路線頁
+                    success = self.replay.restore(snapshot_key)
+                else:
+                    # 搜尋路線
+                    success = self.search_facility_directions(
+                        start_address, 
+                        facility['設施名稱'], 
+                        facility['地址']
+                    )
                 
                 if not success:
                     print(f"  ✗ 跳過: 無法搜尋路線")
@@ -350,6 +363,8 @@ class TrafficInfoCrawler:
                 
                 # 提取交通資訊（不需要距離排序）
                 traffic_info = self.extract_traffic_info()
+                # 擷取前已等待載入完成，此時保存的快照與擷取時看到的頁面相同
+                self.replay.snapshot(snapshot_key)
                 
                 if not traffic_info:
                     print(f"  ✗ 跳過: 無法獲取交通資訊")
@@ -2,16 +2,24 @@ from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
 from bs4 import BeautifulSoup
+import os
+import sys
 import time
 import json
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common.replay import BrowserReplay
+
 class FacebookGroupCrawler:
     def __init__(self):
         self.options = Options()
         self.options.add_argument("--start-maximized")
         self.driver = webdriver.Chrome(options=self.options)
         self.all_texts = []
+        # CRAWLER_REPLAY=record / replay 時錄製或重播每次滾動的頁面
+        self.replay = BrowserReplay(self.driver)
+        self.target_url = None
         
     def login_and_navigate(self, target_url):
         """登入Facebook並導航到目標社團"""
@@ -26,7 +34,7 @@ class FacebookGroupCrawler:
     def scroll_and_extract_posts(self, scroll_count=10):
         """滾動並提取貼文 - 使用原本有效的方法"""
         scroll_pause_time = 2
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
+        last_height = None if self.replay.replaying else self.driver.execute_script("return document.body.scrollHeight")
         
         print(f"開始滾動並提取貼文，共 {scroll_count} 次...")
         
@@ -34,7 +42,10 @@ class FacebookGroupCrawler:
             print(f"第 {scroll_num + 1} 次滾動...")
             
             # 取得目前頁面的 HTML
-            html = self.driver.page_source
+            html = self.replay.page_source(['fb_posts', self.target_url, scroll_num])
+            if self.replay.replaying and not html:
+                print("  錄製資料沒有更多頁面")
+                break
             soup = BeautifulSoup(html, "html.parser")
             
             # 找出可能的貼文 - 使用您原本成功的方法
@@ -51,6 +62,9 @@ class FacebookGroupCrawler:
             
             print(f"  本次提取到 {len(texts)} 個文字內容")
             
+            if self.replay.replaying:
+                continue
+            
             # 滾動
             self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
             time.sleep(scroll_pause_time)
@@ -73,7 +87,7 @@ class FacebookGroupCrawler:
         posts_with_comments = []
         
         # 重新獲取頁面HTML來分析留言
-        html = self.driver.page_source
+        html = self.replay.page_source(['fb_posts', self.target_url, 'final'])
         soup = BeautifulSoup(html, "html.parser")
         
         # 找到所有可能的留言區域
@@ -147,8 +161,10 @@ class FacebookGroupCrawler:
     def crawl(self, target_url, scroll_count=10):
         """主要爬蟲函數"""
         try:
-            # 登入並導航
-            self.login_and_navigate(target_url)
+            # 登入並導航（重播模式不開網頁）
+            self.target_url = target_url
+            if not self.replay.replaying:
+                self.login_and_navigate(target_url)
             
             # 提取貼文（使用原本有效的方法）
             posts_text = self.scroll_and_extract_posts(scroll_count)
@@ -5,11 +5,16 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from bs4 import BeautifulSoup
+import os
+import sys
 import time
 import json
 import re
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common.replay import BrowserReplay
+
 class FacebookGroupCrawler:
     def __init__(self, headless=False):
         self.options = Options()
@@ -28,6 +33,8 @@ class FacebookGroupCrawler:
         
         self.wait = WebDriverWait(self.driver, 10)
         self.posts_data = []
+        # CRAWLER_REPLAY=record / replay 時錄製或重播社團頁面
+        self.replay = BrowserReplay(self.driver)
         
     def login_facebook(self):
         """登入Facebook"""
@@ -177,14 +184,15 @@ class FacebookGroupCrawler:
     def crawl_posts(self, group_url, max_scrolls=10, include_comments=True):
         """主要的爬蟲函數"""
         try:
-            self.login_facebook()
-            self.navigate_to_group(group_url)
-            self.scroll_and_load_posts(max_scrolls)
+            if not self.replay.replaying:
+                self.login_facebook()
+                self.navigate_to_group(group_url)
+                self.scroll_and_load_posts(max_scrolls)
             
             print("開始提取貼文內容...")
             
-            # 獲取頁面HTML
-            html = self.driver.page_source
+            # 獲取頁面HTML（重播模式直接讀取錄製的快照）
+            html = self.replay.page_source(['fb_group', group_url])
             soup = BeautifulSoup(html, 'html.parser')
             
             # 尋找貼文容器 - 使用更廣泛的選擇器
@@ -4,67 +4,56 @@ import re
 import time
 import json
 import os
+import sys
+import threading
 
-def save_to_master_json(new_data, keyword, filename):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common import board_search
+from crawler_common.engine_health import detect_block, get_engine_health
+from crawler_common.hedged_search import HedgedRacer
+from crawler_common.http_client import PooledSession
+from crawler_common.keyword_scheduler import Engine, KeywordScheduler
+from crawler_common.keyword_yield import plan_sweep, print_plan
+from crawler_common.link_store import open_master
+from crawler_common.link_stream import LinkStream
+from crawler_common.paged_search import search_pages
+from crawler_common.rate_control import get_controller
+from crawler_common.search_cache import cached_search, get_search_cache
+
+# 搜尋引擎共用的連線池，每個引擎各自依 429 / 延遲做 AIMD 自適應限速
+search_session = PooledSession(rate_controller=get_controller())
+search_session.trust_env = False  # 忽略環境變數中的代理設定
+# 各搜尋引擎的斷路器：被擋、連續錯誤或連續沒有結果時暫停使用一段時間
+engine_health = get_engine_health()
+
+def save_to_master_json(new_data, keyword, filename, export=True, pages=1):
     """
-    將新的搜尋結果累積到主要 JSON 檔案中，並去重
+    將新的搜尋結果累積到連結主檔並去重
+    主檔存在 {主檔名}.sqlite（網址唯一索引，每次只寫入新結果）；
+    export=True 時同時匯出成原本格式的 JSON，批量搜尋時改為整批結束後再匯出一次
+    pages 為這次搜尋的深度，與新增數一起記入搜尋紀錄，供下次批量搜尋估計關鍵字的收穫；
+    結果來自搜尋快取（from_cache）時沒有花費請求，只加入連結，不記入搜尋紀錄
     """
     try:
-        # 嘗試讀取現有的檔案
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                master_data = json.load(f)
-        else:
-            # 如果檔案不存在，創建新的結構
-            master_data = {
-                "created_time": time.strftime('%Y-%m-%d %H:%M:%S'),
-                "last_updated": "",
-                "search_history": [],
-                "total_unique_links": 0,
-                "all_links": []
-            }
-        
-        # 更新最後修改時間
-        master_data["last_updated"] = time.strftime('%Y-%m-%d %H:%M:%S')
-        
-        # 記錄這次搜尋
-        search_record = {
-            "keyword": keyword,
-            "search_time": time.strftime('%Y-%m-%d %H:%M:%S'),
-            "new_links_found": len(new_data)
-        }
-        master_data["search_history"].append(search_record)
-        
-        # 取得現有連結的 URL 集合（用於去重）
-        existing_urls = {link["url"] for link in master_data["all_links"]}
-        
-        # 添加新連結（去重）
-        new_links_added = 0
-        for link in new_data:
-            if link["url"] not in existing_urls:
-                # 添加搜尋關鍵字資訊
-                link_with_keyword = link.copy()
-                link_with_keyword["found_by_keyword"] = keyword
-                link_with_keyword["found_time"] = time.strftime('%Y-%m-%d %H:%M:%S')
-                
-                master_data["all_links"].append(link_with_keyword)
-                existing_urls.add(link["url"])
-                new_links_added += 1
-        
-        # 更新統計
-        master_data["total_unique_links"] = len(master_data["all_links"])
-        search_record["new_unique_links_added"] = new_links_added
-        
-        # 保存檔案
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(master_data, f, ensure_ascii=False, indent=2)
+        store = open_master(filename)
+        new_links_added = store.add_search(keyword, new_data, pages,
+                                           record=not getattr(new_data, 'from_cache', False))
+        if export:
+            store.export_json(filename)
         
         print(f"  本次新增 {new_links_added} 個不重複連結")
-        print(f"  累積總連結數：{master_data['total_unique_links']}")
+        print(f"  累積總連結數：{store.count()}")
         
     except Exception as e:
         print(f"保存到主檔案錯誤: {e}")
 
+def export_master_json(filename):
+    """把連結主檔匯出成 JSON（PTTCrawler.load_links_from_json 與 crawl_from_links 讀取的格式）"""
+    try:
+        open_master(filename).export_json(filename)
+    except Exception as e:
+        print(f"匯出主檔案錯誤: {e}")
+
 
 def read_keywords_from_file(filename):
     """
@@ -92,9 +81,16 @@ def read_keywords_from_file(filename):
         print(f"讀取關鍵字檔案錯誤: {e}")
         return keywords
 
-def batch_search_from_file(keywords_file, max_results=10, delay_between_searches=2):
+def batch_search_from_file(keywords_file, max_results=10, delay_between_searches=2, engine_workers=1,
+                           on_links=None, budget=None, max_pages=5):
     """
     從檔案讀取關鍵字並進行批量搜索
+    多個搜尋引擎同時工作，每個外部引擎兩次搜尋至少間隔 delay_between_searches 秒；
+    某個引擎查不到時自動交給其他引擎，每個關鍵字完成就立即寫入結果
+    on_links: 每個關鍵字有結果時呼叫 on_links(keyword, results)（例如交給爬取端的 LinkStream）
+    budget: 請求預算（頁數總和）。設定時依主檔的搜尋紀錄估計每個關鍵字的新增連結數，
+            先搜尋收穫高的關鍵字，收穫高且結果被截斷的加深頁數（最多 max_pages 頁），
+            連續沒有新增的往後排，預算用完就停止
     """
     keywords = read_keywords_from_file(keywords_file)
     
@@ -102,52 +98,141 @@ def batch_search_from_file(keywords_file, max_results=10, delay_between_searches
         print("沒有找到有效的關鍵字")
         return
     
-    print(f"\n開始批量搜索，共 {len(keywords)} 個關鍵字")
-    print(f"每次搜索間隔 {delay_between_searches} 秒")
+    # 不另外限制結果數：外部引擎翻頁深度由 MAX_SEARCH_PAGES 限制
+    master_json_filename = "ptt_links_master.json"
+    pages = None
+    if budget is not None:
+        plans = plan_sweep(open_master(master_json_filename), keywords, budget, max_results, max_pages)
+        print_plan(plans, len(dict.fromkeys(keywords)))
+        keywords = [plan.keyword for plan in plans]
+        pages = {plan.keyword: plan.pages for plan in plans}
+    engines = [
+        # PTT 看板搜尋由 AIMD 控制器依 PTT 的回應限速，不另外設定間隔
+        Engine("PTT 看板搜尋", search_via_ptt_boards, workers=engine_workers),
+        Engine("DuckDuckGo", search_via_duckduckgo, delay_between_searches, engine_workers),
+        Engine("Bing", search_via_bing, delay_between_searches, engine_workers),
+        Engine("Startpage", search_via_startpage_original, delay_between_searches, engine_workers),
+    ]
+    
+    print(f"\n開始批量搜索，共 {len(keywords)} 個關鍵字，{len(engines)} 個搜尋引擎同時進行")
+    print(f"每個外部引擎的搜索間隔 {delay_between_searches} 秒")
     print("="*60)
     
     total_results = 0
     successful_searches = 0
+    done = 0
+    start = time.time()
     
-    for i, keyword in enumerate(keywords, 1):
-        print(f"\n[{i}/{len(keywords)}] 搜索關鍵字: {keyword}")
-        print("-" * 40)
-        
-        try:
-            # 執行搜索
-            results = search_via_multiple_engines(keyword, max_results)
+    def on_result(keyword, results, engine_name):
+        nonlocal total_results, successful_searches, done
+        done += 1
+        rate = done / (time.time() - start) * 60
+        if results:
+            successful_searches += 1
+            total_results += len(results)
             
-            if results:
-                successful_searches += 1
-                total_results += len(results)
-                
-                # 保存個別搜索結果
-                save_individual_results(results, keyword)
-                
-                # 累積到主檔案
-                master_json_filename = "ptt_links_master.json"
-                save_to_master_json(results, keyword, master_json_filename)
-                
-                print(f"✓ 找到 {len(results)} 個結果")
-            else:
-                print("✗ 沒有找到結果")
+            # 保存個別搜索結果並累積到主檔案
+            save_individual_results(results, keyword)
+            save_to_master_json(results, keyword, master_json_filename, export=False,
+                                pages=pages.get(keyword, 1) if pages else 1)
+            if on_links:
+                on_links(keyword, results)
             
-            # 搜索間隔（最後一次搜索不需要等待）
-            if i < len(keywords):
-                print(f"等待 {delay_between_searches} 秒後繼續...")
-                time.sleep(delay_between_searches)
-                
-        except Exception as e:
-            print(f"✗ 搜索失敗: {e}")
+            print(f"✓ [{done}/{len(keywords)}] {keyword}：{engine_name} 找到 {len(results)} 個結果"
+                  f"（{rate:.1f} 個關鍵字/分鐘）")
+        else:
+            print(f"✗ [{done}/{len(keywords)}] {keyword}：所有引擎都沒有找到結果（{rate:.1f} 個關鍵字/分鐘）")
+            # 所有引擎都正常時才記為沒有收穫；有引擎斷路中可能只是被擋，不影響關鍵字的評估
+            if all(engine_health.available(engine.name) for engine in engines):
+                save_to_master_json([], keyword, master_json_filename, export=False,
+                                    pages=pages.get(keyword, 1) if pages else 1)
+    
+    scheduler = KeywordScheduler(engines, on_result, engine_health)
+    scheduler.run(keywords, max_results, pages)
     
     # 顯示批量搜索總結
     print("\n" + "="*60)
     print("批量搜索完成！")
     print(f"成功搜索: {successful_searches}/{len(keywords)} 個關鍵字")
     print(f"總共找到: {total_results} 個結果")
-    print(f"結果已累積保存到: ptt_links_master.json")
+    scheduler.print_stats()
+    engine_health.print_stats()
+    get_search_cache().print_stats()
+    export_master_json(master_json_filename)
+    print(f"結果已累積保存到: {master_json_filename}")
+    print("="*60)
+
+def batch_search_ptt_boards(keywords_file, boards_file=None, max_pages=3, keyword_concurrency=8):
+    """
+    從檔案讀取關鍵字，直接以 PTT 看板內建搜尋批量找連結（不經外部搜尋引擎）
+    多個關鍵字、多個看板同時查詢，結果同樣累積到 ptt_links_master.json
+    """
+    keywords = read_keywords_from_file(keywords_file)
+    if not keywords:
+        print("沒有找到有效的關鍵字")
+        return
+    boards = board_search.load_boards(boards_file) if boards_file else board_search.DEFAULT_BOARDS
+
+    print(f"\n開始 PTT 看板搜尋，共 {len(keywords)} 個關鍵字 × {len(boards)} 個看板")
+    print(f"每個看板最多 {max_pages} 頁，同時搜尋 {keyword_concurrency} 個關鍵字")
+    print("="*60)
+
+    master_json_filename = "ptt_links_master.json"
+    total_results = 0
+    successful_searches = 0
+    done = 0
+    start = time.time()
+
+    def on_result(keyword, results):
+        nonlocal total_results, successful_searches, done
+        done += 1
+        print(f"\n[{done}/{len(keywords)}] {keyword}：找到 {len(results)} 個結果")
+        if results:
+            successful_searches += 1
+            total_results += len(results)
+            save_individual_results(results, keyword)
+            save_to_master_json(results, keyword, master_json_filename, export=False)
+
+    board_search.sweep(keywords, boards, max_pages, on_result=on_result,
+                       keyword_concurrency=keyword_concurrency)
+
+    print("\n" + "="*60)
+    print(f"PTT 看板搜尋完成！耗時 {time.time() - start:.1f} 秒")
+    print(f"有結果的關鍵字: {successful_searches}/{len(keywords)} 個")
+    print(f"總共找到: {total_results} 個結果")
+    export_master_json(master_json_filename)
+    print(f"結果已累積保存到: {master_json_filename}")
     print("="*60)
 
+def batch_search_and_crawl(keywords_file, max_results=10, delay_between_searches=5, concurrency=16,
+                           output_jsonl='crawled_articles.jsonl', output_json='crawled_articles.json'):
+    """
+    邊搜尋邊爬取：批量搜尋在背景執行緒進行，每找到新的連結就經由 LinkStream 送進文章抓取管線，
+    第一批連結出現後幾秒內就有文章寫入 output_jsonl，總耗時約為搜尋與爬取兩者中較長的一個
+    """
+    # 爬取端沿用 0826/crawl_from_links.py（快取、日誌、近似重複檢查、HTML 封存）
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '0826'))
+    import crawl_from_links
+
+    stream = LinkStream()
+    start = time.time()
+
+    def search():
+        try:
+            batch_search_from_file(keywords_file, max_results, delay_between_searches,
+                                   on_links=lambda keyword, results: stream.put_many(results, keyword))
+        finally:
+            # 搜尋結束（包含發生錯誤）後關閉串流，爬取端取完剩下的連結就結束
+            stream.close()
+            print(f"\n🔍 搜尋階段結束，耗時 {time.time() - start:.1f} 秒，共送出 {len(stream)} 個連結")
+
+    search_thread = threading.Thread(target=search, daemon=True)
+    search_thread.start()
+    crawl_from_links.main(concurrency=concurrency, output_jsonl=output_jsonl, output_json=output_json,
+                          links_data=stream)
+    search_thread.join()
+    print(f"搜尋與爬取全部完成，總耗時 {time.time() - start:.1f} 秒")
+
 def save_individual_results(results, keyword):
     """
     保存個別關鍵字的搜索結果
@@ -174,39 +259,52 @@ def save_individual_results(results, keyword):
         for result in results:
             f.write(f"{result['url']}\n")
 
-def search_via_multiple_engines(query, max_results=10):
+_hedged_racer = None
+
+def get_search_engines():
+    """搜尋引擎列表（PTT 看板搜尋優先，外部引擎作為備援）"""
+    return [
+        ("PTT 看板搜尋", search_via_ptt_boards),
+        ("DuckDuckGo", search_via_duckduckgo),
+        ("Bing", search_via_bing),
+        ("Startpage", search_via_startpage_original)
+    ]
+
+def get_hedged_racer():
+    """整個程式共用的對沖搜尋器，各引擎的延遲分布與勝出次數跨關鍵字累積"""
+    global _hedged_racer
+    if _hedged_racer is None:
+        _hedged_racer = HedgedRacer(get_search_engines(), health=engine_health)
+    return _hedged_racer
+
+def search_via_multiple_engines(query, max_results=10, hedged=True, merge_window=0.0, deadline=None):
     """
     使用多個搜索引擎搜尋 PTT 相關結果
-    當一個引擎被封鎖時自動切換到其他引擎
+    外部引擎會翻頁（每個查詢最多 MAX_SEARCH_PAGES 頁）直到湊滿 max_results 筆；
+    hedged=True 時先送出主要引擎，超過它延遲的 90 百分位數仍沒有結果就加送下一個引擎，
+    採用最先回來的有效結果（merge_window > 0 時合併這段時間內回來的其他結果）；
+    hedged=False 時依序嘗試，當一個引擎被封鎖時才切換到下一個
     """
     results = []
     
-    # 限制最大結果數
-    if max_results > 20:
-        print(f"⚠️  將最大結果數從 {max_results} 調整為 20（避免被封鎖）")
-        max_results = 20
-    
     print(f"🔍 搜尋關鍵字: {query} (最多 {max_results} 筆)")
     
-    # 嘗試多個搜索引擎
-    search_engines = [
-        ("DuckDuckGo", search_via_duckduckgo),
-        ("Bing", search_via_bing),
-        ("Startpage", search_via_startpage_original)
-    ]
-    
-    for engine_name, search_func in search_engines:
-        print(f"\n🔄 嘗試使用 {engine_name} 搜索...")
-        try:
-            engine_results = search_func(query, max_results)
-            if engine_results:
-                results.extend(engine_results)
-                print(f"✅ {engine_name} 找到 {len(engine_results)} 個結果")
-                break  # 找到結果就停止嘗試其他引擎
-            else:
-                print(f"⚠️  {engine_name} 沒有找到結果")
-        except Exception as e:
-            print(f"❌ {engine_name} 搜索失敗: {e}")
+    if hedged:
+        results, _ = get_hedged_racer().race(query, max_results, merge_window, deadline)
+    else:
+        # 依序嘗試多個搜索引擎
+        for engine_name, search_func in get_search_engines():
+            print(f"\n🔄 嘗試使用 {engine_name} 搜索...")
+            try:
+                engine_results = search_func(query, max_results)
+                if engine_results:
+                    results.extend(engine_results)
+                    print(f"✅ {engine_name} 找到 {len(engine_results)} 個結果")
+                    break  # 找到結果就停止嘗試其他引擎
+                else:
+                    print(f"⚠️  {engine_name} 沒有找到結果")
+            except Exception as e:
+                print(f"❌ {engine_name} 搜索失敗: {e}")
     
     # 去重並限制結果數量
     unique_results = []
@@ -220,131 +318,129 @@ def search_via_multiple_engines(query, max_results=10):
     print(f"🎯 完成搜尋，共找到 {len(unique_results)} 個不重複結果")
     return unique_results
 
-def search_via_duckduckgo(query, max_results=10):
-    """使用 DuckDuckGo 搜索"""
+def search_via_ptt_boards(query, max_results=10):
+    """使用 PTT 看板內建搜尋（多個房屋與地區看板同時查詢）"""
     results = []
+
+    try:
+        results = board_search.search_boards(query, max_results=max_results)
+        for i, result in enumerate(results):
+            print(f"✓ [{i+1:2d}] {result['board']} - {result['title']}")
+    except Exception as e:
+        print(f"PTT 看板搜尋錯誤: {e}")
+
+    return results
+
+# 外部搜尋引擎每個查詢最多翻幾頁
+MAX_SEARCH_PAGES = 5
+PTT_ARTICLE_PATTERN = r'https?://(?:www\.)?ptt\.cc/bbs/[^/]+/M\.\d+\.A\.[A-Z0-9]+\.html'
+SEARCH_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
+}
+
+def make_ptt_result(link, source):
+    """從 PTT 文章網址提取看板和文章資訊，組成搜尋結果"""
+    board_name = "未知看板"
+    article_id = "未知ID"
+    
+    board_match = re.search(r'/bbs/([^/]+)/', link)
+    if board_match:
+        board_name = board_match.group(1)
+    
+    id_match = re.search(r'/M\.(\d+)\.A\.([A-Z0-9]+)\.html', link)
+    if id_match:
+        article_id = id_match.group(1)
+        title = f"PTT {board_name} 板 - 文章ID: {article_id}"
+    else:
+        title = f"PTT {board_name} 板"
+    
+    return {
+        'title': title,
+        'url': link,
+        'source': source,
+        'board': board_name,
+        'article_id': article_id
+    }
+
+def print_search_results(results):
+    for i, result in enumerate(results):
+        print(f"✓ [{i+1:2d}] {result['board']} - {result['article_id']}")
+
+def fetch_engine_page(engine_name, url, page):
+    """
+    取得搜尋引擎的一頁結果
+    被擋（403 / 429 / 驗證碼頁面）或 HTTP 錯誤時記錄到引擎狀態，不使用這次的回應；
+    第 2 頁以後沒有結果視為已翻到最後一頁，不算引擎沒有結果；
+    斷路器不放行時回傳 None（沒有送出請求），由 search_pages 決定是否重送
+    """
+    # 斷路中的引擎不連網，查詢直接交給其他引擎
+    if not engine_health.allow(engine_name):
+        return None
     
     try:
-        search_query = f"{query} site:ptt.cc"
-        encoded_query = urllib.parse.quote(search_query)
-        
-        url = f"https://duckduckgo.com/html/?q={encoded_query}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
-        }
+        response = search_session.get(url, headers=SEARCH_HEADERS, timeout=15, proxies={})
         
-        session = requests.Session()
-        session.trust_env = False
+        # 找出PTT連結（保留頁面中的順序）
+        ptt_links = list(dict.fromkeys(re.findall(PTT_ARTICLE_PATTERN, response.text))) if response.status_code == 200 else []
         
-        response = session.get(url, headers=headers, timeout=15, proxies={})
+        if page > 1 and not ptt_links and response.status_code == 200 and not detect_block(response):
+            return []
+        if not engine_health.record_response(engine_name, response, len(ptt_links)):
+            return []
+        return [make_ptt_result(link, engine_name) for link in ptt_links]
         
-        if response.status_code == 200:
-            content = response.text
-            
-            # 找出PTT連結
-            ptt_pattern = r'https?://(?:www\.)?ptt\.cc/bbs/[^/]+/M\.\d+\.A\.[A-Z0-9]+\.html'
-            ptt_links = list(set(re.findall(ptt_pattern, content)))
-            
-            for i, link in enumerate(ptt_links[:max_results]):
-                # 提取看板和文章資訊
-                board_name = "未知看板"
-                article_id = "未知ID"
-                
-                board_match = re.search(r'/bbs/([^/]+)/', link)
-                if board_match:
-                    board_name = board_match.group(1)
-                
-                id_match = re.search(r'/M\.(\d+)\.A\.([A-Z0-9]+)\.html', link)
-                if id_match:
-                    article_id = id_match.group(1)
-                    title = f"PTT {board_name} 板 - 文章ID: {article_id}"
-                else:
-                    title = f"PTT {board_name} 板"
-                
-                results.append({
-                    'title': title,
-                    'url': link,
-                    'source': 'DuckDuckGo',
-                    'board': board_name,
-                    'article_id': article_id
-                })
-                
-                print(f"✓ [{i+1:2d}] {board_name} - {article_id}")
-                
+    except requests.exceptions.RequestException as e:
+        engine_health.record_error(engine_name, e)
+        print(f"{engine_name} 搜索錯誤（第 {page} 頁）: {e}")
     except Exception as e:
-        print(f"DuckDuckGo 搜索錯誤: {e}")
+        print(f"{engine_name} 搜索錯誤（第 {page} 頁）: {e}")
+    
+    return []
+
+@cached_search('DuckDuckGo')
+def search_via_duckduckgo(query, max_results=10, max_pages=MAX_SEARCH_PAGES):
+    """使用 DuckDuckGo 搜索（html 版每頁約 30 筆，以 s= 翻頁）"""
+    encoded_query = urllib.parse.quote(f"{query} site:ptt.cc")
     
+    def fetch_page(page):
+        url = f"https://duckduckgo.com/html/?q={encoded_query}"
+        if page > 1:
+            offset = (page - 1) * 30
+            url += f"&s={offset}&dc={offset + 1}"
+        return fetch_engine_page("DuckDuckGo", url, page)
+    
+    results = search_pages(fetch_page, max_results, 30, max_pages)
+    print_search_results(results)
     return results
 
-def search_via_bing(query, max_results=10):
-    """使用 Bing 搜索"""
-    results = []
+@cached_search('Bing')
+def search_via_bing(query, max_results=10, max_pages=MAX_SEARCH_PAGES):
+    """使用 Bing 搜索（每頁 10 筆，以 first= 翻頁）"""
+    encoded_query = urllib.parse.quote(f"{query} site:ptt.cc")
     
-    try:
-        search_query = f"{query} site:ptt.cc"
-        encoded_query = urllib.parse.quote(search_query)
-        
+    def fetch_page(page):
         url = f"https://www.bing.com/search?q={encoded_query}"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/115.0.0.0 Safari/537.36'
-        }
-        
-        session = requests.Session()
-        session.trust_env = False
-        
-        response = session.get(url, headers=headers, timeout=15, proxies={})
-        
-        if response.status_code == 200:
-            content = response.text
-            
-            # 找出PTT連結
-            ptt_pattern = r'https?://(?:www\.)?ptt\.cc/bbs/[^/]+/M\.\d+\.A\.[A-Z0-9]+\.html'
-            ptt_links = list(set(re.findall(ptt_pattern, content)))
-            
-            for i, link in enumerate(ptt_links[:max_results]):
-                # 提取看板和文章資訊
-                board_name = "未知看板"
-                article_id = "未知ID"
-                
-                board_match = re.search(r'/bbs/([^/]+)/', link)
-                if board_match:
-                    board_name = board_match.group(1)
-                
-                id_match = re.search(r'/M\.(\d+)\.A\.([A-Z0-9]+)\.html', link)
-                if id_match:
-                    article_id = id_match.group(1)
-                    title = f"PTT {board_name} 板 - 文章ID: {article_id}"
-                else:
-                    title = f"PTT {board_name} 板"
-                
-                results.append({
-                    'title': title,
-                    'url': link,
-                    'source': 'Bing',
-                    'board': board_name,
-                    'article_id': article_id
-                })
-                
-                print(f"✓ [{i+1:2d}] {board_name} - {article_id}")
-                
-    except Exception as e:
-        print(f"Bing 搜索錯誤: {e}")
+        if page > 1:
+            url += f"&first={(page - 1) * 10 + 1}"
+        return fetch_engine_page("Bing", url, page)
     
+    results = search_pages(fetch_page, max_results, 10, max_pages)
+    print_search_results(results)
     return results
 
-def search_via_startpage_original(query, max_results=10):
+@cached_search('Startpage')
+def search_via_startpage_original(query, max_results=10, max_pages=MAX_SEARCH_PAGES):
     """
-    使用 Startpage 搜尋 ptt.cc 相關結果
+    使用 Startpage 搜尋 ptt.cc 相關結果（每頁 10 筆，以 page= 翻頁）
     改進版：添加更好的限制和錯誤處理
     """
     results = []
     
-    # 限制最大結果數，避免請求過多
-    if max_results > 20:
-        print(f"⚠️  將最大結果數從 {max_results} 調整為 20（避免被封鎖）")
-        max_results = 20
+    # 斷路中的引擎不連網，查詢直接交給其他引擎
+    if not engine_health.available("Startpage"):
+        print("⏭️  Startpage 暫停中，略過")
+        return results
+    breaker = engine_health.breaker("Startpage")
     
     try:
         print(f"🔍 搜尋關鍵字: {query} (最多 {max_results} 筆)")
@@ -373,112 +469,69 @@ def search_via_startpage_original(query, max_results=10):
             'Upgrade-Insecure-Requests': '1'
         }
         
-        # 添加重試機制
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                print(f"🔄 第 {attempt + 1} 次嘗試連接 Startpage...")
-                
-                # 清除可能的代理設定
-                session = requests.Session()
-                session.trust_env = False  # 忽略環境變數中的代理設定
-                
-                response = session.get(url, headers=headers, timeout=15, proxies={})
-                
-                if response.status_code == 200:
-                    content = response.text
-                    
-                    # 檢查是否被封鎖或限制
-                    if "blocked" in content.lower() or "captcha" in content.lower():
-                        print("⚠️  可能遇到反爬蟲機制，請稍後再試")
-                        return results
+        def fetch_page(page):
+            page_url = url if page == 1 else f"{url}&page={page}"
+            # 第一頁沒有結果時重試（可能是暫時的），之後的頁沒有結果表示已經到底
+            max_retries = 3 if page == 1 else 1
+            if not engine_health.allow("Startpage"):
+                return None
+            for attempt in range(max_retries):
+                try:
+                    print(f"🔄 第 {page} 頁，第 {attempt + 1} 次嘗試連接 Startpage...")
                     
-                    # 找出所有 PTT 連結
-                    ptt_pattern = r'https?://(?:www\.)?ptt\.cc/bbs/[^/]+/M\.\d+\.A\.[A-Z0-9]+\.html'
-                    ptt_links_raw = re.findall(ptt_pattern, content)
+                    # 經過限速控制器：429 / 5xx / 逾時會自動降低對該引擎的請求速率
+                    response = search_session.get(page_url, headers=headers, timeout=15, proxies={})
                     
-                    if not ptt_links_raw:
-                        print(f"📝 第 {attempt + 1} 次嘗試：未找到PTT連結")
-                        if attempt < max_retries - 1:
-                            print(f"⏳ 等待 {(attempt + 1) * 2} 秒後重試...")
-                            time.sleep((attempt + 1) * 2)
-                            continue
-                        else:
+                    if response.status_code == 200:
+                        # 找出所有 PTT 連結，清理和去重（保留頁面中的順序）
+                        ptt_links_raw = re.findall(PTT_ARTICLE_PATTERN, response.text)
+                        
+                        # 檢查是否被封鎖或限制：斷路後之後的關鍵字不再送到 Startpage
+                        block_reason = detect_block(response, bool(ptt_links_raw))
+                        if block_reason:
+                            print("⚠️  可能遇到反爬蟲機制，暫停使用 Startpage")
+                            breaker.record_block(block_reason)
+                            return []
+                        
+                        if not ptt_links_raw:
+                            print(f"📝 第 {page} 頁第 {attempt + 1} 次嘗試：未找到PTT連結")
+                            if page > 1:
+                                breaker.record_success()
+                                return []
+                            if attempt < max_retries - 1:
+                                print(f"⏳ 等待 {(attempt + 1) * 2} 秒後重試...")
+                                time.sleep((attempt + 1) * 2)
+                                continue
                             print("❌ 多次嘗試後仍未找到結果")
-                            return results
-                    
-                    # 清理和去重連結
-                    ptt_links = []
-                    for link in ptt_links_raw:
-                        clean_link = link.replace('\\', '').strip()
-                        if (clean_link.startswith('http') and 
-                            'ptt.cc/bbs/' in clean_link and 
-                            clean_link.endswith('.html') and
-                            clean_link not in [r['url'] for r in results]):
-                            ptt_links.append(clean_link)
-                    
-                    # 去重
-                    ptt_links = list(set(ptt_links))
-                    
-                    print(f"📊 找到 {len(ptt_links)} 個不重複連結")
-                    
-                    # 處理結果，限制數量
-                    processed_count = 0
-                    for link in ptt_links:
-                        if processed_count >= max_results:
-                            break
-                            
-                        # 從連結中提取資訊
-                        board_name = "未知看板"
-                        article_id = "未知ID"
+                            breaker.record_empty()
+                            return []
                         
-                        # 提取看板名稱
-                        board_match = re.search(r'/bbs/([^/]+)/', link)
-                        if board_match:
-                            board_name = board_match.group(1)
+                        ptt_links = list(dict.fromkeys(link.replace('\\', '').strip() for link in ptt_links_raw))
+                        print(f"📊 第 {page} 頁找到 {len(ptt_links)} 個不重複連結")
+                        breaker.record_success()
+                        return [make_ptt_result(link, 'Startpage') for link in ptt_links]
                         
-                        # 提取文章ID
-                        id_match = re.search(r'/M\.(\d+)\.A\.([A-Z0-9]+)\.html', link)
-                        if id_match:
-                            article_id = id_match.group(1)
-                            title = f"PTT {board_name} 板 - 文章ID: {article_id}"
-                        else:
-                            title = f"PTT {board_name} 板"
+                    elif response.status_code in (403, 429):
+                        # 被限速或封鎖：斷路一段時間，不再對同一個引擎重試
+                        print(f"⚠️  請求被拒絕 ({response.status_code})，暫停使用 Startpage")
+                        breaker.record_block(f"HTTP {response.status_code}")
+                        return []
                         
-                        results.append({
-                            'title': title,
-                            'url': link,
-                            'source': 'Startpage',
-                            'board': board_name,
-                            'article_id': article_id
-                        })
+                    else:
+                        print(f"❌ HTTP錯誤 {response.status_code}")
+                        breaker.record_error(f"HTTP {response.status_code}")
                         
-                        processed_count += 1
-                        print(f"✓ [{processed_count:2d}] {board_name} - {article_id}")
+                except requests.exceptions.Timeout as e:
+                    print(f"⏰ 請求超時，第 {attempt + 1} 次嘗試")
+                    engine_health.record_error("Startpage", e)
                         
-                        # 短暫延遲，避免請求過快
-                        time.sleep(0.3)
-                    
-                    break  # 成功找到結果，跳出重試循環
-                    
-                elif response.status_code == 429:
-                    print(f"⚠️  請求過於頻繁 (429)，等待 {(attempt + 1) * 5} 秒後重試...")
-                    time.sleep((attempt + 1) * 5)
-                    
-                else:
-                    print(f"❌ HTTP錯誤 {response.status_code}")
-                    if attempt < max_retries - 1:
-                        time.sleep(2)
-                    
-            except requests.exceptions.Timeout:
-                print(f"⏰ 請求超時，第 {attempt + 1} 次嘗試")
-                if attempt < max_retries - 1:
-                    time.sleep(3)
-                    
-            except requests.exceptions.RequestException as e:
-                print(f"🌐 網路錯誤: {e}")
-                if attempt < max_retries - 1:
-                    time.sleep(2)
+                except requests.exceptions.RequestException as e:
+                    print(f"🌐 網路錯誤: {e}")
+                    engine_health.record_error("Startpage", e)
+            return []
+        
+        results = search_pages(fetch_page, max_results, 10, max_pages)
+        print_search_results(results)
                     
     except Exception as e:
         print(f"❌ 搜尋錯誤: {e}")
@@ -492,11 +545,35 @@ if __name__ == "__main__":
     print("="*40)
     print("1. 單次搜索")
     print("2. 批量搜索（從檔案讀取關鍵字）")
+    print("3. 批量搜索（PTT 看板內建搜尋，不經外部搜尋引擎）")
+    print("4. 批量搜索並同時爬取文章（找到連結就開始爬）")
     print("="*40)
     
-    mode = input("請選擇模式 (1/2)：").strip()
+    mode = input("請選擇模式 (1/2/3/4)：").strip()
     
-    if mode == "2":
+    if mode == "4":
+        keywords_file = input("請輸入關鍵字檔案名稱（預設：keywords.txt）：").strip() or "keywords.txt"
+        max_results = input("每個關鍵字要抓幾筆結果（預設 10）：").strip()
+        try:
+            max_results = int(max_results) if max_results else 10
+        except ValueError:
+            max_results = 10
+        if not os.path.exists(keywords_file):
+            print(f"關鍵字檔案 {keywords_file} 不存在，請先以模式 2 建立範例檔案")
+        else:
+            batch_search_and_crawl(keywords_file, max_results)
+    
+    elif mode == "3":
+        keywords_file = input("請輸入關鍵字檔案名稱（預設：keywords.txt）：").strip() or "keywords.txt"
+        boards_file = input("看板清單檔（每行一個看板，直接 Enter 使用內建清單）：").strip() or None
+        max_pages = input("每個看板最多翻幾頁（預設 3，每頁 20 筆）：").strip()
+        try:
+            max_pages = int(max_pages) if max_pages else 3
+        except ValueError:
+            max_pages = 3
+        batch_search_ptt_boards(keywords_file, boards_file, max_pages)
+    
+    elif mode == "2":
         # 批量搜索模式
         keywords_file = input("請輸入關鍵字檔案名稱（預設：keywords.txt）：").strip()
         if not keywords_file:
@@ -508,7 +585,7 @@ if __name__ == "__main__":
         except ValueError:
             max_results = 10
         
-        delay = input("搜索間隔秒數（預設 5 秒，建議不少於3秒）：").strip()
+        delay = input("每個搜尋引擎的搜索間隔秒數（預設 5 秒，建議不少於3秒）：").strip()
         try:
             delay = int(delay) if delay else 5
             if delay < 3:
@@ -517,6 +594,12 @@ if __name__ == "__main__":
         except ValueError:
             delay = 5
         
+        budget = input("請求預算（依過去收穫挑選關鍵字與頁數，直接 Enter 搜尋全部關鍵字）：").strip()
+        try:
+            budget = int(budget) if budget else None
+        except ValueError:
+            budget = None
+        
         # 檢查關鍵字檔案是否存在，如果不存在則創建範例檔案
         if not os.path.exists(keywords_file):
             print(f"\n關鍵字檔案 {keywords_file} 不存在，正在創建範例檔案...")
@@ -532,7 +615,7 @@ if __name__ == "__main__":
             print("請編輯此檔案，添加您想搜索的關鍵字，然後重新執行程式")
         else:
             # 執行批量搜索
-            batch_search_from_file(keywords_file, max_results, delay)
+            batch_search_from_file(keywords_file, max_results, delay, budget=budget)
         
     else:
         # 單次搜索模式（原有功能）
@@ -545,6 +628,9 @@ if __name__ == "__main__":
             max_results = 10
         
         data = search_via_multiple_engines(keyword, max_results)
+        get_hedged_racer().print_stats()
+        engine_health.print_stats()
+        get_search_cache().print_stats()
         
         # 格式化輸出結果
         print("\n" + "="*60)
@@ -1,8 +1,9 @@
-import requests
 from bs4 import BeautifulSoup
 import csv
 import json
 
+from crawler_common.http_client import get_session
+
 # 假設這是列表頁 URL
 url = "https://www.rakuya.com.tw/rent?search=city&city=0&page=1"
 
@@ -10,7 +11,8 @@ headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36"
 }
 
-response = requests.get(url, headers=headers)
+session = get_session()
+response = session.get(url, headers=headers)
 soup = BeautifulSoup(response.text, "html.parser")
 
 properties = []
@@ -1,9 +1,13 @@
-import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 
+from crawler_common.http_client import get_session
+
+# 249 頁都連到同一個主機，共用 keep-alive 連線
+session = get_session()
+
 def scrape_page(url):
-    response = requests.get(url)
+    response = session.get(url)
     soup = BeautifulSoup(response.text, 'html.parser')
     listings = []
     for item in soup.find_all("div", class_="obj-item"):
@@ -26,6 +30,7 @@ if __name__ == '__main__':
         listings = scrape_page(url)
         all_listings.extend(listings)
 
+    session.print_stats()
     df = pd.DataFrame(all_listings)
     df.to_csv("rakuya_rentals.csv", index=False, encoding="utf-8-sig")
     print("Scraping complete. Data saved to rakuya_rentals.csv")
\ No newline at end of file
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+crawl_from_links 並行抓取效能測試
+用本機替身伺服器提供 crawled_articles.json 還原的 PTT 頁面，測量不同並行數下每秒爬取幾篇文章
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common.stub_server import PTTStubServer, load_records
+
+import crawl_from_links
+
+
+def run_benchmark(records, levels, latency):
+    with PTTStubServer(latency=latency) as server:
+        server.add_articles(records)
+        links_data = [{'url': server.local_url(r['url']),
+                       'found_by_keyword': f"{r['area']} {r['keyword']}"} for r in records]
+
+        print(f"文章數: {len(links_data)}，模擬延遲: {latency * 1000:.0f} ms")
+        print(f"{'並行數':>6} {'耗時(秒)':>10} {'篇/秒':>10}")
+        for level in levels:
+            start = time.perf_counter()
+            # 逐篇輸出會干擾計時，先導向記憶體
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = crawl_from_links.crawl_links(links_data, concurrency=level,
+                                                       per_host=level, rate=None)
+            elapsed = time.perf_counter() - start
+            print(f"{level:>6} {elapsed:>10.2f} {len(results) / elapsed:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='crawl_from_links 並行抓取效能測試')
+    parser.add_argument('--input', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                        'crawled_articles.json'))
+    parser.add_argument('--levels', default='1,2,4,8,16,32', help='要測試的並行數，以逗號分隔')
+    parser.add_argument('--latency', type=float, default=0.05, help='模擬的網路延遲秒數')
+    parser.add_argument('--limit', type=int, default=0, help='只取前 N 篇文章，0 表示全部')
+    args = parser.parse_args()
+
+    records = load_records(args.input)
+    if args.limit:
+        records = records[:args.limit]
+    levels = [int(x) for x in args.levels.split(',') if x.strip()]
+
+    run_benchmark(records, levels, args.latency)
+
+
+if __name__ == '__main__':
+    main()
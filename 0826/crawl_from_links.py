@@ -1,8 +1,21 @@
-import requests
-from bs4 import BeautifulSoup
+import argparse
 import json
-import time
-import re
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common.async_fetch import AsyncFetcher
+from crawler_common.crawl_journal import CrawlJournal
+from crawler_common.html_archive import HTMLArchive
+from crawler_common.http_cache import HTTPCache, cached_get
+from crawler_common.http_client import get_session
+from crawler_common.jsonl_store import JsonlWriter, compact_jsonl
+from crawler_common.link_stream import LinkStream
+from crawler_common.near_dup import NearDupIndex
+from crawler_common.pipeline import run_pipeline
+from crawler_common.push_time import add_push_times, article_posted_at
+from crawler_common.rate_control import AIMDController
+from crawler_common.ptt_parser import extract_link_article
 
 headers = {'User-Agent': 'Mozilla/5.0'}
 cookies = {'over18': '1'}
@@ -18,119 +31,234 @@ def extract_area_keyword(found_by_keyword):
         keyword = ""
     return area, keyword
 
-def crawl_ptt_article(article_url):
-    """爬取PTT文章內容"""
+def crawl_ptt_article(article_url, cache=None):
+    """爬取PTT文章內容，cache 為 HTTPCache 時沒變動的文章只會收到 304"""
     try:
-        res = requests.get(article_url, headers=headers, cookies=cookies)
+        res = cached_get(get_session(), article_url, cache, headers=headers, cookies=cookies)
         res.encoding = 'utf-8'
-        soup = BeautifulSoup(res.text, 'html.parser')
-
-        # 獲取標題
-        title_tag = soup.find('title')
-        title = title_tag.text if title_tag else '無標題'
-        # 清理標題格式
-        title = re.sub(r'^\[.*?\]\s*', '', title)  # 移除開頭的[板名]
-        title = re.sub(r'\s*-\s*PTT.*$', '', title)  # 移除結尾的PTT資訊
-
-        # 先獲取推文（在移除之前）
-        pushes = soup.find_all('div', class_='push')
-        comments = []
-        for push in pushes:
-            tag_elem = push.find('span', class_=lambda x: x and 'push-tag' in x)
-            user_elem = push.find('span', class_=lambda x: x and 'push-userid' in x)
-            msg_elem = push.find('span', class_=lambda x: x and 'push-content' in x)
-            
-            if tag_elem and user_elem and msg_elem:
-                tag = tag_elem.text.strip()
-                user = user_elem.text.strip()
-                text = msg_elem.text.lstrip(': ').strip()
-                
-                comments.append({
-                    "user": user,
-                    "tag": tag,
-                    "text": text
-                })
-
-        # 獲取文章內容
-        main_content = soup.find(id='main-content')
-        if not main_content:
-            return None, None, []
-
-        # 移除文章頭資訊
-        for tag in main_content.find_all(['div', 'span'], class_=['article-metaline', 'article-metaline-right']):
-            tag.decompose()
-
-        # 移除推文部分，只保留文章正文
-        for tag in main_content.find_all('div', class_='push'):
-            tag.decompose()
-
-        content = main_content.get_text().strip()
-        
-        # 清理內容
-        content = re.sub(r'\n\s*\n', '\n', content)  # 移除多餘空行
-        content = re.sub(r'--\n.*', '', content, flags=re.DOTALL)  # 移除簽名檔
-
-        return title, content, comments
-
+        return parse_ptt_article(res.text, article_url)
     except Exception as e:
         print(f"爬取文章錯誤 {article_url}: {e}")
         return None, None, []
 
-def main():
-    # 讀取link.json
+def parse_ptt_article(html, article_url=''):
+    """解析PTT文章頁面的HTML，回傳 (title, content, comments)"""
     try:
-        with open('link.json', 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            links_data = data.get('all_links', [])
+        # 單次走訪 lxml 樹：標題、推文、正文一次取出，並移除文章頭、推文與簽名檔
+        return extract_link_article(html)
     except Exception as e:
-        print(f"讀取link.json錯誤: {e}")
-        return
-
-    print(f"共找到 {len(links_data)} 個連結")
-    
-    results = []
-    
-    for i, link_info in enumerate(links_data):
-        url = link_info.get('url', '')
-        found_by_keyword = link_info.get('found_by_keyword', '')
-        
-        print(f"正在處理第 {i+1}/{len(links_data)} 個連結: {url}")
-        
-        # 提取地區和關鍵詞
-        area, keyword = extract_area_keyword(found_by_keyword)
-        
-        # 爬取文章
-        title, content, comments = crawl_ptt_article(url)
-        
-        if title and content:
-            result = {
-                "area": area,
-                "keyword": keyword,
-                "url": url,
-                "title": title,
-                "content": content,
-                "comments": comments
-            }
-            results.append(result)
-            print(f"成功爬取: {title[:30]}...")
+        print(f"解析文章錯誤 {article_url}: {e}")
+        return None, None, []
+
+def build_record(link_info, title, content, comments):
+    """
+    組成輸出格式 {area, keyword, url, title, content, comments}
+    每則推文的 datetime 保留頁面上的原始文字，另加上推算年份後的 pushed_at
+    """
+    area, keyword = extract_area_keyword(link_info.get('found_by_keyword', ''))
+    add_push_times(comments, article_posted_at(link_info.get('url', '')))
+    return {
+        "area": area,
+        "keyword": keyword,
+        "url": link_info.get('url', ''),
+        "title": title,
+        "content": content,
+        "comments": comments
+    }
+
+def crawl_links(links_data, concurrency=16, per_host=8, rate=5.0, on_result=None, cache=None,
+                journal=None, dedup=None, adaptive=True, processes=None, archive=None):
+    """
+    並行爬取所有連結，回傳與連結順序一致的文章列表
+    links_data 也可以是 LinkStream：搜尋端陸續加入的連結一出現就開始爬，直到串流關閉
+    concurrency: 同時在途的請求數；per_host: 單一主機上限；rate: 每個主機每秒請求數
+    adaptive: True 時 rate 只是起始速率，之後依 429 / 5xx / 延遲以 AIMD 自動調整；False 時固定為 rate
+    on_result: 每完成一個連結呼叫 on_result(link_info, record)，失敗時 record 為 None
+    cache: HTTPCache，重爬時以條件式請求略過沒變動的文章
+    journal: CrawlJournal，略過已完成的網址並記錄每個網址的結果，回傳值由日誌重建
+    dedup: NearDupIndex，抓到後檢查是否為其他看板的轉錄/重貼，重複的文章加上 duplicate_of 欄位
+    processes: 解析用的行程數（None 為 CPU 核心數減一，0 表示在主行程解析），下載與解析分成兩段管線
+    archive: HTMLArchive，下載到的原始 HTML 寫入壓縮封存，之後可用 html_archive reparse 離線重新解析
+    """
+    controller = None
+    if adaptive and rate:
+        # 每次爬取各用一個控制器，起始速率就是 rate；不改動其他搜尋/爬取共用的 get_controller()
+        controller = AIMDController(initial_rate=rate)
+    fetcher = AsyncFetcher(concurrency=concurrency, per_host=per_host, rate=rate,
+                           headers=headers, cookies=cookies, cache=cache, rate_controller=controller,
+                           archive=archive)
+    if isinstance(links_data, LinkStream):
+        # 串流中的網址加入時已去重，日誌檢查在取出時才進行（在事件迴圈中，不與搜尋執行緒競爭）
+        index_by_url = links_data.index_by_url
+        urls = links_data
+        if journal:
+            def should_fetch(url):
+                journal.add_pending([url])
+                return journal.should_fetch(url)
+            links_data.url_filter = should_fetch
+    else:
+        index_by_url = {}
+        for i, link_info in enumerate(links_data):
+            index_by_url.setdefault(link_info.get('url', ''), []).append(i)
+
+        urls = list(index_by_url)
+        if journal:
+            journal.add_pending(urls)
+            urls = [url for url in urls if journal.should_fetch(url)]
+            print(f"日誌中已完成或超過重試次數的網址略過，本次需爬取 {len(urls)} 個")
+
+    results_by_index = {}
+    done = 0
+
+    def make_record(i, url, title, content, comments):
+        record = build_record(links_data[i], title, content, comments)
+        canonical = dedup.check(url, content) if dedup else None
+        if canonical:
+            # 後續斷詞等處理可略過重複文章，改用原始文章的結果
+            record["duplicate_of"] = canonical
+        return record
+
+    def handle(url, parsed, error):
+        nonlocal done
+        if error is not None:
+            print(f"爬取文章錯誤 {url}: {error}")
+            title, content, comments = None, None, []
         else:
-            print(f"爬取失敗: {url}")
-        
-        # 避免請求過快
-        time.sleep(1)
-        
-        # 每10篇保存一次，避免資料遺失
-        if (i + 1) % 10 == 0:
-            with open('crawled_articles_temp.json', 'w', encoding='utf-8') as f:
-                json.dump(results, f, ensure_ascii=False, indent=2)
-            print(f"已保存臨時檔案，當前進度: {i+1}/{len(links_data)}")
-
-    # 保存最終結果
-    with open('crawled_articles.json', 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
-    
+            title, content, comments = parsed
+
+        if journal:
+            if title and content:
+                journal.mark_done(url, {"title": title, "content": content, "comments": comments})
+            else:
+                journal.mark_failed(url, error or '解析失敗')
+
+        for i in index_by_url[url]:
+            done += 1
+            record = None
+            if title and content:
+                record = make_record(i, url, title, content, comments)
+                results_by_index[i] = record
+                print(f"[{done}] 成功爬取: {title[:30]}...")
+            else:
+                print(f"[{done}] 爬取失敗: {url}")
+            if on_result:
+                on_result(links_data[i], record)
+
+    try:
+        # 下載與解析分開：解析在行程池中進行，兩段之間以有上限的佇列銜接
+        stats = run_pipeline(fetcher, urls, extract_link_article, handle, processes)
+        stats.print_stats()
+    finally:
+        fetcher.session.print_stats()
+        if controller:
+            controller.print_stats()
+        fetcher.close()
+
+    if journal:
+        # 由日誌重建：包含先前執行中已完成的文章
+        for url, indexes in index_by_url.items():
+            data = journal.data(url)
+            if data:
+                for i in indexes:
+                    results_by_index[i] = make_record(i, url, data["title"], data["content"],
+                                                      data["comments"])
+    return [results_by_index[i] for i in sorted(results_by_index)]
+
+def main(concurrency=16, per_host=8, rate=5.0, cache_dir='http_cache',
+         output_jsonl='crawled_articles.jsonl', output_json='crawled_articles.json', compact=True,
+         resume=False, journal_file='crawl_journal.jsonl', max_attempts=3,
+         dedup_file='ptt_near_dup.json', adaptive=True, processes=None, archive_dir='html_archive',
+         links_data=None):
+    """
+    output_jsonl: 每篇文章附加一行寫入，取代每10篇重寫一次的 crawled_articles_temp.json
+    compact: 爬完後把 .jsonl 轉成排版好的 output_json
+    resume: 接續 journal_file 的進度，已完成的網址不再下載，失敗的最多重試 max_attempts 次
+    dedup_file: 跨看板近似重複索引，None 表示不檢查
+    adaptive: rate 為起始速率並依伺服器回應自動調整（AIMD）；False 時固定為 rate
+    processes: 解析行程數，None 為 CPU 核心數減一
+    archive_dir: 原始 HTML 封存資料夾，None 表示不封存
+    links_data: 連結列表或 LinkStream（邊搜尋邊爬），None 時讀取 link.json
+    """
+    if links_data is None:
+        # 讀取link.json
+        try:
+            with open('link.json', 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                links_data = data.get('all_links', [])
+        except Exception as e:
+            print(f"讀取link.json錯誤: {e}")
+            return
+
+    if isinstance(links_data, LinkStream):
+        print("連結由搜尋端陸續加入，找到就開始爬取")
+    else:
+        print(f"共找到 {len(links_data)} 個連結")
+
+    cache = HTTPCache(cache_dir) if cache_dir else None
+    dedup = NearDupIndex(dedup_file) if dedup_file else None
+    archive = HTMLArchive(archive_dir) if archive_dir else None
+
+    mode = "起始" if adaptive else "固定"
+    print(f"並行數 {concurrency}（單一主機 {per_host}），{mode}限速每秒 {rate} 個請求")
+    with CrawlJournal(journal_file, resume=resume, max_attempts=max_attempts) as journal, \
+            JsonlWriter(output_jsonl, mode='a' if resume else 'w') as writer:
+        # 每篇完成就附加一行，成本固定，不會隨已爬數量增加
+        def save_record(link_info, record):
+            if record:
+                writer.write(record)
+
+        results = crawl_links(links_data, concurrency, per_host, rate, on_result=save_record,
+                              cache=cache, journal=journal, dedup=dedup, adaptive=adaptive,
+                              processes=processes, archive=archive)
+        journal.print_summary()
+    if isinstance(links_data, LinkStream):
+        links_data.print_stats()
+    if cache:
+        cache.print_stats()
+    if dedup:
+        dedup.print_stats()
+        dedup.save()
+    if archive:
+        archive.print_stats()
+        archive.close()
+
+    if resume:
+        # 接續時 .jsonl 只有本次的文章，依日誌重建完整輸出
+        with JsonlWriter(output_jsonl, mode='w') as writer:
+            for record in results:
+                writer.write(record)
+
     print(f"爬取完成！共成功爬取 {len(results)} 篇文章")
-    print("結果已保存到 crawled_articles.json")
+    print(f"逐篇結果已保存到 {output_jsonl}")
+    if compact:
+        compact_jsonl(output_jsonl, output_json)
+        print(f"結果已保存到 {output_json}")
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='依 link.json 的連結爬取 PTT 文章')
+    parser.add_argument('--concurrency', type=int, default=16, help='同時在途的請求數')
+    parser.add_argument('--per-host', type=int, default=8, help='單一主機的並行上限')
+    parser.add_argument('--rate', type=float, default=5.0, help='每個主機起始的每秒請求數（之後自動調整）')
+    parser.add_argument('--fixed-rate', action='store_true', help='速率固定為 --rate，不依回應自動調整')
+    parser.add_argument('--no-cache', action='store_true', help='不使用磁碟 HTTP 快取')
+    parser.add_argument('--no-compact', action='store_true', help='只寫 .jsonl，不轉出 crawled_articles.json')
+    parser.add_argument('--compact-only', action='store_true',
+                        help='不爬取，只把既有的 crawled_articles.jsonl 轉成 crawled_articles.json')
+    parser.add_argument('--resume', action='store_true',
+                        help='接續 crawl_journal.jsonl 的進度：略過已完成的連結，重試失敗的連結')
+    parser.add_argument('--max-attempts', type=int, default=3, help='失敗連結最多嘗試幾次')
+    parser.add_argument('--no-dedup', action='store_true', help='不檢查跨看板的近似重複文章')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='解析用的行程數（預設為 CPU 核心數減一，0 表示在主行程解析）')
+    parser.add_argument('--no-archive', action='store_true', help='不把原始 HTML 寫入 html_archive 封存')
+    args = parser.parse_args()
+
+    if args.compact_only:
+        count = compact_jsonl('crawled_articles.jsonl', 'crawled_articles.json')
+        print(f"已轉出 {count} 篇文章到 crawled_articles.json")
+    else:
+        main(concurrency=args.concurrency, per_host=args.per_host, rate=args.rate,
+             cache_dir=None if args.no_cache else 'http_cache', compact=not args.no_compact,
+             resume=args.resume, max_attempts=args.max_attempts,
+             dedup_file=None if args.no_dedup else 'ptt_near_dup.json', adaptive=not args.fixed_rate,
+             processes=args.processes, archive_dir=None if args.no_archive else 'html_archive')
@@ -1,4 +1,8 @@
-import requests
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common.http_client import get_session
 
 url = "https://buy.yungching.com.tw/api/v2/recommend/listpromote"  # 這裡要換成實際在 Network 看到的 API
 params = {
@@ -9,7 +13,7 @@ headers = {
     "User-Agent": "Mozilla/5.0"
 }
 
-resp = requests.get(url, params=params, headers=headers)
+resp = get_session().get(url, params=params, headers=headers)
 data = resp.json()
 
 for house in data.get("result", []):
@@ -4,16 +4,33 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
-import time, json
+import time, json, os, sys, argparse
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
-def crawl_house_details():
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from crawler_common.crawl_journal import CrawlJournal
+
+DETAIL_FIELDS = ("age", "floor_detail", "yc_certification")
+
+def crawl_house_details(resume=False, journal_file="yungching_journal.jsonl", max_attempts=3):
     # 讀取現有的房屋資料
     with open("yungching.json", "r", encoding="utf-8") as f:
         houses_data = json.load(f)
     
     print(f"共有 {len(houses_data)} 筆房屋資料需要爬取詳細資訊")
     
+    # 爬取日誌：以房屋 URL 為鍵，中斷後 --resume 可接續
+    journal = CrawlJournal(journal_file, resume=resume, max_attempts=max_attempts)
+    journal.add_pending(house["url"] for house in houses_data if house.get("url"))
+    restored = 0
+    for house in houses_data:
+        data = journal.data(house["url"]) if house.get("url") else None
+        if data:
+            house.update(data)
+            restored += 1
+    if restored:
+        print(f"由日誌還原 {restored} 筆已完成的資料")
+    
     # 啟動瀏覽器
     driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()))
     wait = WebDriverWait(driver, 10)
@@ -25,6 +42,8 @@ def crawl_house_details():
             if not house.get("url"):
                 print(f"第 {i+1} 筆資料沒有 URL，跳過")
                 continue
+            if not journal.should_fetch(house["url"]):
+                continue
                 
             print(f"正在處理第 {i+1}/{len(houses_data)} 筆: {house.get('title', 'Unknown')}")
             
@@ -80,6 +99,7 @@ def crawl_house_details():
                     print("  - YC Certification: 未找到")
                 
                 updated_count += 1
+                journal.mark_done(house["url"], {field: house[field] for field in DETAIL_FIELDS})
                 
                 # 每處理 10 筆就儲存一次，避免資料遺失
                 if updated_count % 10 == 0:
@@ -89,9 +109,11 @@ def crawl_house_details():
                 
             except TimeoutException:
                 print(f"  - 頁面載入超時，跳過此筆資料")
+                journal.mark_failed(house["url"], "頁面載入超時")
                 continue
             except Exception as e:
                 print(f"  - 處理時發生錯誤: {e}")
+                journal.mark_failed(house["url"], e)
                 continue
                 
     except KeyboardInterrupt:
@@ -102,8 +124,14 @@ def crawl_house_details():
             json.dump(houses_data, f, ensure_ascii=False, indent=2)
         
         driver.quit()
+        journal.print_summary()
+        journal.close()
         print(f"\n爬蟲完成！共處理了 {updated_count} 筆資料")
         print("結果已儲存至 yungching_updated.json")
 
 if __name__ == "__main__":
-    crawl_house_details()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="爬取永慶房屋內頁詳細資訊")
+    parser.add_argument("--resume", action="store_true", help="接續上次的爬取日誌，略過已完成的房屋")
+    parser.add_argument("--max-attempts", type=int, default=3, help="失敗網址最多嘗試幾次")
+    args = parser.parse_args()
+    crawl_house_details(resume=args.resume, max_attempts=args.max_attempts)
\ No newline at end of file
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+各日期資料夾爬蟲共用的工具模組
+
+子資料夾中的腳本請先把專案根目錄加入 sys.path 再匯入，例如：
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from crawler_common.async_fetch import AsyncFetcher
+"""
+
+import os as _os
+
+# 設定 CRAWLER_REPLAY 時，匯入任何共用模組就安裝錄製 / 重播，
+# 腳本在建立 PooledSession 之前（或完全不用 PooledSession）直接呼叫 requests.get 也會被攔截
+if _os.environ.get('CRAWLER_REPLAY'):
+    from crawler_common import replay as _replay
+    _replay.install()
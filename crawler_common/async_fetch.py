@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+非同步並行抓取引擎
+同時保持多個請求在途，以每個主機的並行上限與 token bucket（或 AIMD 自適應）限速取代固定的 time.sleep
+"""
+
+import asyncio
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from crawler_common.http_cache import cached_get
+from crawler_common.http_client import PooledSession
+from crawler_common.rate_control import parse_retry_after
+
+
+DEFAULT_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+DEFAULT_COOKIES = {'over18': '1'}
+
+
+class TokenBucket:
+    """token bucket 限速器：每秒補充 rate 個 token，最多累積 capacity 個"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity) if capacity else max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        """取得一個 token，不足時等待補充"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncFetcher:
+    def __init__(self, concurrency=16, per_host=8, rate=5.0, session=None,
+                 headers=None, cookies=None, timeout=10, cache=None, rate_controller=None,
+                 archive=None):
+        """
+        初始化非同步抓取引擎
+
+        Args:
+            concurrency (int): 全部主機合計的最大在途請求數
+            per_host (int): 單一主機的最大在途請求數
+            rate (float): 單一主機每秒最多發出的請求數，None 表示不限速
+            session (requests.Session): 共用的 Session，None 則建立連線池大小等於 concurrency 的 PooledSession
+            headers (dict): 預設標頭
+            cookies (dict): 預設 cookies
+            timeout (float): 單一請求逾時秒數
+            cache (HTTPCache): 磁碟快取，設定後改用條件式請求
+            rate_controller (AIMDController): 設定後改用自適應限速，rate 只當作參考不再使用
+            archive (HTMLArchive): 原始 HTML 封存，實際下載到的頁面會附加寫入
+        """
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.rate = rate
+        self.timeout = timeout
+        self.cache = cache
+        self.archive = archive
+        self.headers = headers if headers is not None else dict(DEFAULT_HEADERS)
+        self.cookies = cookies if cookies is not None else dict(DEFAULT_COOKIES)
+
+        if session is None:
+            session = PooledSession(pool_maxsize=concurrency, timeout=timeout)
+        self.session = session
+        self.rate_controller = rate_controller
+        if getattr(session, 'rate_controller', None) is not None:
+            # Session 本身已經過限速控制器，不再重複限速
+            self.rate = None
+            self.rate_controller = None
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        # 並行上限與限速器綁定在事件迴圈上，換新的迴圈（再次 asyncio.run）時重新建立
+        self.loop = None
+        self.slots = None
+        self.host_slots = {}
+        self.host_buckets = {}
+
+    def _bind_loop(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop:
+            self.loop = loop
+            self.slots = asyncio.Semaphore(self.concurrency)
+            self.host_slots = {}
+            self.host_buckets = {}
+        return loop
+
+    def _host_limits(self, url):
+        """取得該主機的並行上限與限速器（第一次遇到時建立）"""
+        host = urllib.parse.urlsplit(url).netloc
+        if host not in self.host_slots:
+            self.host_slots[host] = asyncio.Semaphore(self.per_host)
+            use_bucket = self.rate and self.rate_controller is None
+            self.host_buckets[host] = TokenBucket(self.rate) if use_bucket else None
+        return self.host_slots[host], self.host_buckets[host]
+
+    def _get(self, url):
+        """在工作執行緒中執行的同步請求"""
+        start = time.monotonic()
+        try:
+            response = cached_get(self.session, url, self.cache, headers=self.headers,
+                                  archive=self.archive, cookies=self.cookies, timeout=self.timeout)
+        except Exception:
+            if self.rate_controller:
+                self.rate_controller.record(url, None, time.monotonic() - start)
+            raise
+        if self.rate_controller:
+            self.rate_controller.record(url, response.status_code, time.monotonic() - start,
+                                        parse_retry_after(response))
+        response.encoding = 'utf-8'
+        return response
+
+    async def fetch(self, url):
+        """
+        抓取單一網址，受全域與單一主機的並行上限及限速控制
+
+        Returns:
+            tuple: (url, response, error)，成功時 error 為 None
+        """
+        loop = self._bind_loop()
+        host_slot, bucket = self._host_limits(url)
+        async with host_slot, self.slots:
+            if self.rate_controller:
+                await self.rate_controller.wait_async(url)
+            elif bucket:
+                await bucket.acquire()
+            try:
+                response = await loop.run_in_executor(self.executor, self._get, url)
+                return url, response, None
+            except Exception as e:
+                return url, None, e
+
+    async def fetch_many(self, urls):
+        """並行抓取多個網址，依完成順序逐一產生 (url, response, error)"""
+        tasks = [asyncio.ensure_future(self.fetch(url)) for url in urls]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def fetch_all(self, urls, callback):
+        """
+        同步介面：抓取所有網址，每完成一個就呼叫 callback(url, response, error)
+        """
+        async def runner():
+            async for url, response, error in self.fetch_many(urls):
+                callback(url, response, error)
+
+        asyncio.run(runner())
+
+    def close(self):
+        self.executor.shutdown(wait=False)
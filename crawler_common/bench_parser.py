@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PTT 文章解析器比對與效能測試
+用 crawled_articles.json 還原的頁面加上幾個特殊情況當作 fixture，
+確認 ptt_parser 的結果與原本 BeautifulSoup html.parser 版本完全一致（之後新增的推文時間欄位不在原本的版本中，
+比對時先去掉），並比較每篇的解析時間
+
+使用方式：
+    python -m crawler_common.bench_parser [--input 0826/crawled_articles.json] [--rounds 3]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from crawler_common import ptt_parser
+from crawler_common.stub_server import load_records, render_ptt_article
+
+
+DEFAULT_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '0826',
+                             'crawled_articles.json')
+
+# 真實頁面偶爾出現的情況
+EDGE_CASES = [
+    # 推文過多時的警告區塊、推文內容有巢狀標籤
+    '<html><head><title>[問題] 測試 - 看板 Test - 批踢踢實業坊</title></head><body>'
+    '<div id="main-content" class="bbs-screen bbs-content">'
+    '<div class="article-metaline"><span class="article-meta-tag">作者</span>'
+    '<span class="article-meta-value">a (b)</span></div>'
+    '<div class="article-metaline-right"><span class="article-meta-tag">看板</span>'
+    '<span class="article-meta-value">Test</span></div>'
+    '<div class="article-metaline"><span class="article-meta-tag">標題</span>'
+    '<span class="article-meta-value">[問題] 測試</span></div>'
+    '<div class="article-metaline"><span class="article-meta-tag">時間</span>'
+    '<span class="article-meta-value">Mon Jan  1 00:00:00 2024</span></div>'
+    '第一行\n\n   \n<span class="hl f3">彩色字</span> &amp; &lt;符號&gt;\n'
+    '<!-- 註解 --><script>var x = 1;</script>\n'
+    '--\n<span class="f2">※ 發信站: 批踢踢實業坊(ptt.cc)\n</span>'
+    '<div class="push"><span class="f1 hl push-tag">噓 </span><span class="f3 hl push-userid">u1</span>'
+    '<span class="f3 push-content">: <a href="http://x">http://x</a> 看看</span>'
+    '<span class="push-ipdatetime"> 1.2.3.4 01/01 00:01\n</span></div>\n'
+    '<div class="push center warning-box">檔案過大！部分文章無法顯示</div>'
+    '<div class="push"><span class="hl push-tag">推 </span><span class="f3 hl push-userid">u2</span>'
+    '<span class="f3 push-content">:   </span></div>'
+    '</div></body></html>',
+    # 沒有 main-content（文章已刪除或被導向）
+    '<html><head><title>404</title></head><body><div class="bbs-content">'
+    '404 - Not Found.</div></body></html>',
+    # 沒有 meta、只有正文
+    '<html><head><title>[公告] 板規 - 看板 Test - 批踢踢實業坊</title></head><body>'
+    '<div id="main-content">  只有正文\n<pre>  保留  \n  空白 </pre>\n\n</div></body></html>',
+]
+
+
+# ---- 原本的 BeautifulSoup 版本（比對基準） ----
+
+def legacy_link_article(html):
+    """0826/crawl_from_links.py 原本的解析"""
+    soup = BeautifulSoup(html, 'html.parser')
+    title_tag = soup.find('title')
+    title = title_tag.text if title_tag else '無標題'
+    title = re.sub(r'^\[.*?\]\s*', '', title)
+    title = re.sub(r'\s*-\s*PTT.*$', '', title)
+    pushes = soup.find_all('div', class_='push')
+    comments = []
+    for push in pushes:
+        tag_elem = push.find('span', class_=lambda x: x and 'push-tag' in x)
+        user_elem = push.find('span', class_=lambda x: x and 'push-userid' in x)
+        msg_elem = push.find('span', class_=lambda x: x and 'push-content' in x)
+        if tag_elem and user_elem and msg_elem:
+            comments.append({"user": user_elem.text.strip(), "tag": tag_elem.text.strip(),
+                             "text": msg_elem.text.lstrip(': ').strip()})
+    main_content = soup.find(id='main-content')
+    if not main_content:
+        return None, None, []
+    for tag in main_content.find_all(['div', 'span'], class_=['article-metaline', 'article-metaline-right']):
+        tag.decompose()
+    for tag in main_content.find_all('div', class_='push'):
+        tag.decompose()
+    content = main_content.get_text().strip()
+    content = re.sub(r'\n\s*\n', '\n', content)
+    content = re.sub(r'--\n.*', '', content, flags=re.DOTALL)
+    return title, content, comments
+
+
+def legacy_crawler_article(html):
+    """0807/0808/ptt_crawler.py PTTCrawler.crawl_ptt_article 原本的解析"""
+    soup = BeautifulSoup(html, 'html.parser')
+    article = {'title': '', 'author': '', 'board': '', 'date': '', 'content': '', 'comments': []}
+    title_elem = soup.find('span', class_='article-meta-value')
+    if title_elem:
+        article['title'] = title_elem.get_text().strip()
+    meta_spans = soup.find_all('span', class_='article-meta-value')
+    if len(meta_spans) >= 4:
+        article['author'] = meta_spans[0].get_text().strip()
+        article['board'] = meta_spans[1].get_text().strip()
+        article['title'] = meta_spans[2].get_text().strip()
+        article['date'] = meta_spans[3].get_text().strip()
+    for push_div in soup.find_all('div', class_='push'):
+        push_tag = push_div.find('span', class_='push-tag')
+        push_userid = push_div.find('span', class_='push-userid')
+        push_content = push_div.find('span', class_='push-content')
+        push_ipdatetime = push_div.find('span', class_='push-ipdatetime')
+        if push_tag and push_userid and push_content:
+            article['comments'].append({
+                'type': push_tag.get_text().strip(),
+                'user': push_userid.get_text().strip(),
+                'content': push_content.get_text().strip(),
+                'datetime': push_ipdatetime.get_text().strip() if push_ipdatetime else ''
+            })
+    main_content = soup.find('div', id='main-content')
+    if main_content:
+        for push_div in main_content.find_all('div', class_='push'):
+            push_div.decompose()
+        for elem in main_content.find_all(['span', 'div'], class_=['article-meta-tag', 'article-meta-value']):
+            elem.decompose()
+        article['content'] = main_content.get_text().strip()
+    return article
+
+
+def legacy_board_article(html):
+    """071401.py / 0826/crawl.py 原本的 parse_article"""
+    soup = BeautifulSoup(html, 'html.parser')
+    title_tag = soup.find('title')
+    title = title_tag.text if title_tag else '無標題'
+    main_content = soup.find(id='main-content')
+    if main_content is None:
+        raise ValueError('找不到 main-content')
+    for tag in main_content.find_all(['div', 'span'], class_=['article-metaline', 'article-metaline-right']):
+        tag.decompose()
+    content = main_content.text.strip()
+    comments = []
+    for push in soup.find_all('div', class_='push'):
+        tag = push.find('span', class_=lambda x: x and 'push-tag' in x)
+        user = push.find('span', class_=lambda x: x and 'push-userid' in x)
+        msg = push.find('span', class_=lambda x: x and 'push-content' in x)
+        if tag and user and msg:
+            comments.append([tag.text.strip(), user.text.strip(), msg.text.lstrip(': ').strip()])
+    return title, content, comments
+
+
+# ---- ptt_parser 之後新增的欄位（推文時間），比對時去掉，只比對原本就有的欄位 ----
+
+def original_link_fields(result):
+    """crawl_from_links 的推文原本沒有 datetime"""
+    if not isinstance(result, tuple) or len(result) != 3:
+        return result
+    title, content, comments = result
+    return title, content, [{key: value for key, value in comment.items() if key != 'datetime'}
+                            for comment in comments]
+
+
+def original_board_fields(result):
+    """071401 的推文原本只有 [推文類型, 使用者, 留言內容]"""
+    if not isinstance(result, tuple) or len(result) != 3 or result[0] == 'ValueError':
+        return result
+    title, content, comments = result
+    return title, content, [row[:3] for row in comments]
+
+
+PAIRS = [
+    ('crawl_from_links', legacy_link_article, ptt_parser.extract_link_article, original_link_fields),
+    ('PTTCrawler', legacy_crawler_article, ptt_parser.extract_crawler_article, None),
+    ('071401', legacy_board_article, ptt_parser.extract_board_article, original_board_fields),
+]
+
+
+def call(func, html):
+    try:
+        return func(html)
+    except ValueError as e:
+        return ('ValueError', str(e))
+
+
+def load_fixtures(json_filename):
+    """fixture：crawled_articles.json 還原的頁面加上特殊情況"""
+    return [render_ptt_article(record) for record in load_records(json_filename)] + EDGE_CASES
+
+
+def check_identical(fixtures):
+    """逐篇比對原本就有的欄位，回傳不一致的數量"""
+    mismatches = 0
+    for name, legacy, fast, original_fields in PAIRS:
+        for i, html in enumerate(fixtures):
+            result = call(fast, html)
+            if original_fields:
+                result = original_fields(result)
+            if call(legacy, html) != result:
+                mismatches += 1
+                print(f'✗ {name} 第 {i} 篇結果不一致')
+    return mismatches
+
+
+def time_per_article(func, fixtures, rounds):
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for html in fixtures:
+            call(func, html)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(fixtures) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PTT 文章解析器比對與效能測試')
+    parser.add_argument('--input', default=DEFAULT_INPUT, help='crawled_articles.json 格式的文章檔')
+    parser.add_argument('--rounds', type=int, default=3, help='計時重複次數（取最快一次）')
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args.input)
+    print(f'fixture 共 {len(fixtures)} 篇')
+
+    mismatches = check_identical(fixtures)
+    if mismatches:
+        print(f'共 {mismatches} 篇結果不一致')
+        sys.exit(1)
+    print('✓ 三種輸出格式皆與 BeautifulSoup 版本一致')
+
+    print(f"{'格式':<18} {'BeautifulSoup(ms/篇)':>22} {'lxml 單次走訪(ms/篇)':>22} {'加速':>8}")
+    for name, legacy, fast, _ in PAIRS:
+        legacy_ms = time_per_article(legacy, fixtures, args.rounds)
+        fast_ms = time_per_article(fast, fixtures, args.rounds)
+        print(f'{name:<18} {legacy_ms:>22.2f} {fast_ms:>22.2f} {legacy_ms / fast_ms:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
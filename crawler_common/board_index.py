@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PTT 看板索引頁直接定址與平行預先抓取
+只讀一次 index.html 取得最大頁碼，直接產生 index{k}.html 網址，
+索引頁在有限的視窗內並行抓取，文章則在索引頁回來後立刻排入抓取，不必等上一頁解析完
+"""
+
+import asyncio
+import re
+
+from bs4 import BeautifulSoup
+
+
+PTT_BASE_URL = 'https://www.ptt.cc'
+INDEX_NUMBER_PATTERN = re.compile(r'/index(\d+)\.html')
+
+
+def index_url(board, number=None, base_url=PTT_BASE_URL):
+    """產生看板索引頁網址，number 為 None 時是最新頁 index.html"""
+    if number is None:
+        return f'{base_url}/bbs/{board}/index.html'
+    return f'{base_url}/bbs/{board}/index{number}.html'
+
+
+def get_max_index(soup):
+    """
+    從 index.html 的「上頁」按鈕推算最新頁的頁碼
+    上頁是 index{N}.html 時，index.html 就是 index{N+1}.html
+    """
+    for btn in soup.find_all('a', class_='btn wide'):
+        if '上頁' in btn.text and btn.get('href'):
+            match = INDEX_NUMBER_PATTERN.search(btn['href'])
+            if match:
+                return int(match.group(1)) + 1
+    return 1
+
+
+def parse_index_links(soup, base_url=PTT_BASE_URL):
+    """取出索引頁上的文章連結（已刪除的文章沒有連結會略過）"""
+    links = []
+    for title in soup.find_all('div', class_='title'):
+        a_tag = title.find('a')
+        if a_tag:
+            links.append(base_url + a_tag['href'])
+    return links
+
+
+async def crawl_board_async(fetcher, board, pages, parse_article, window=8,
+                            watermarks=None, skip_urls=None, base_url=PTT_BASE_URL, status=None):
+    """
+    以直接定址方式並行爬取看板最新的 pages 頁
+
+    Args:
+        fetcher (AsyncFetcher): 共用的抓取引擎（並行上限與限速由它控制）
+        board (str): 看板名稱
+        pages (int): 要爬的索引頁數
+        parse_article (callable): parse_article(html) -> 文章資料
+        window (int): 同時抓取的索引頁數
+        watermarks (BoardWatermarks): 設定後只爬水位線之後的新文章，碰到舊文章就不再往前翻
+        skip_urls: 要略過的文章網址（set 或 SeenURLStore 等支援 in 的容器）
+        base_url (str): 網站根網址（測試時可指向替身伺服器）
+        status (dict): 設定時填入 reached（翻到上次的水位線或看板第一頁）與 errors（失敗的文章與索引頁數），
+                       供 BoardWatermarks.advance 判斷能否推進水位線
+
+    Returns:
+        list: [(url, 文章資料)]，順序與逐頁翻頁相同（新頁在前，頁內由上而下）
+    """
+    seen = set()
+    skip_urls = skip_urls if skip_urls is not None else ()
+    results = {}
+    article_tasks = []
+    status = status if status is not None else {}
+    status.update(reached=False, errors=0)
+
+    async def fetch_article(key, url):
+        _, response, error = await fetcher.fetch(url)
+        if error is not None or response.status_code != 200:
+            print(f'爬文章錯誤: {url} {error or response.status_code}')
+            status['errors'] += 1
+            return
+        try:
+            results[key] = (url, parse_article(response.text))
+        except Exception as e:
+            print(f'爬文章錯誤: {url} {e}')
+            status['errors'] += 1
+
+    def schedule_articles(rank, soup):
+        """把索引頁上的新文章排入抓取，回傳這頁是否已碰到上次爬過的位置"""
+        links = parse_index_links(soup, base_url)
+        reached = watermarks.reached(board, links) if watermarks else False
+        count = 0
+        for position, url in enumerate(links):
+            if url in seen or url in skip_urls or (watermarks and not watermarks.is_new(board, url)):
+                continue
+            seen.add(url)
+            count += 1
+            article_tasks.append(asyncio.ensure_future(fetch_article((rank, position), url)))
+        print(f'第 {rank + 1} 頁找到 {count} 篇新文章')
+        return reached
+
+    _, response, error = await fetcher.fetch(index_url(board, base_url=base_url))
+    if error is not None or response.status_code != 200:
+        print(f'無法讀取看板首頁: {error or response.status_code}')
+        status['errors'] += 1
+        return []
+    soup = BeautifulSoup(response.text, 'html.parser')
+    max_index = get_max_index(soup)
+    pages = min(pages, max_index)
+    print(f'{board} 最新頁碼 {max_index}，預計爬 {pages} 頁（視窗 {window} 頁）')
+
+    stop = schedule_articles(0, soup)
+    rank = 1
+    while not stop and rank < pages:
+        batch = range(rank, min(rank + window, pages))
+        fetched = await asyncio.gather(*(fetcher.fetch(index_url(board, max_index - r, base_url))
+                                         for r in batch))
+        for r, (url, response, error) in zip(batch, fetched):
+            if error is not None or response.status_code != 200:
+                print(f'索引頁錯誤: {url} {error or response.status_code}')
+                status['errors'] += 1
+                continue
+            if schedule_articles(r, BeautifulSoup(response.text, 'html.parser')):
+                stop = True
+        rank += window
+
+    if stop:
+        print('已到達上次爬取的位置，停止翻頁')
+    # 翻到 index1.html 時看板已經沒有更舊的文章
+    status['reached'] = stop or pages >= max_index
+    await asyncio.gather(*article_tasks)
+    return [results[key] for key in sorted(results)]
+
+
+def crawl_board(fetcher, board, pages, parse_article, window=8, watermarks=None,
+                skip_urls=None, base_url=PTT_BASE_URL, status=None):
+    """crawl_board_async 的同步介面"""
+    return asyncio.run(crawl_board_async(fetcher, board, pages, parse_article, window,
+                                         watermarks, skip_urls, base_url, status))
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PTT 看板內建搜尋（https://www.ptt.cc/bbs/<看板>/search?q=）
+直接查詢 PTT 自己的看板搜尋取代 site:ptt.cc 的外部搜尋引擎：
+多個看板同時查詢、每個看板依「上頁」按鈕往下翻頁，結果沒有 20 筆上限，
+速度只受 PTT 本身的限速控制，不會被搜尋引擎的反爬蟲機制擋下
+
+使用方式：
+    python -m crawler_common.board_search --keyword "板橋 治安" [--boards home-sale,BigBanciao] [--pages 3]
+"""
+
+import argparse
+import asyncio
+import re
+import threading
+import urllib.parse
+
+from bs4 import BeautifulSoup
+
+from crawler_common.async_fetch import AsyncFetcher
+from crawler_common.board_index import PTT_BASE_URL
+from crawler_common.http_client import get_session
+from crawler_common.rate_control import get_controller
+from crawler_common.watermark import parse_article_id
+
+
+SEARCH_SOURCE = 'PTT 看板搜尋'
+BOARD_PATTERN = re.compile(r'/bbs/([^/]+)/')
+
+# 房屋買賣板與各地區板（取自 ptt_links_master.json 中出現最多的看板）
+DEFAULT_BOARDS = [
+    'home-sale', 'WomenTalk', 'Tainan', 'TaichungBun', 'Kaohsiung', 'Taoyuan', 'ChungLi',
+    'Hsinchu', 'BigBanciao', 'BigSanchung', 'ShuangHe', 'Sijhih', 'HsinChuang', 'Wanhua',
+    'Datong', 'Zhongshan', 'Neihu', 'Nangang', 'BigPeitou',
+]
+
+
+def search_url(board, query, page=1, base_url=PTT_BASE_URL):
+    """產生看板搜尋網址"""
+    params = {'q': query} if page == 1 else {'page': page, 'q': query}
+    return f'{base_url}/bbs/{board}/search?{urllib.parse.urlencode(params)}'
+
+
+def make_link(title, url):
+    """組成與 ptt_links_master.json 相同的連結格式"""
+    board_match = BOARD_PATTERN.search(url)
+    parsed_id = parse_article_id(url)
+    return {
+        'title': title,
+        'url': url,
+        'source': SEARCH_SOURCE,
+        'board': board_match.group(1) if board_match else '未知看板',
+        'article_id': str(parsed_id[0]) if parsed_id else '未知ID',
+    }
+
+
+def parse_search_page(html, base_url=PTT_BASE_URL):
+    """
+    解析搜尋結果頁
+
+    Returns:
+        tuple: (連結列表, 是否還有下一頁)
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    links = []
+    for title in soup.find_all('div', class_='title'):
+        a_tag = title.find('a')
+        if a_tag and a_tag.get('href'):
+            links.append(make_link(a_tag.text.strip(), base_url + a_tag['href']))
+    has_more = any('上頁' in btn.text and btn.get('href')
+                   for btn in soup.find_all('a', class_='btn wide'))
+    return links, has_more
+
+
+async def search_board_async(fetcher, board, query, max_pages=3, base_url=PTT_BASE_URL):
+    """在單一看板搜尋，依序翻頁直到沒有下一頁或達到 max_pages"""
+    links = []
+    for page in range(1, max_pages + 1):
+        url, response, error = await fetcher.fetch(search_url(board, query, page, base_url))
+        if error is not None:
+            print(f'看板搜尋錯誤 {board}: {error}')
+            break
+        if response.status_code != 200:
+            # 看板不存在或沒有結果時 PTT 回 404
+            if response.status_code != 404:
+                print(f'看板搜尋錯誤 {board}: HTTP {response.status_code}')
+            break
+        page_links, has_more = parse_search_page(response.text, base_url)
+        links.extend(page_links)
+        if not has_more or not page_links:
+            break
+    return links
+
+
+async def search_boards_async(fetcher, query, boards=None, max_pages=3, max_results=None,
+                              base_url=PTT_BASE_URL):
+    """
+    在多個看板同時搜尋同一個關鍵字
+
+    Args:
+        fetcher (AsyncFetcher): 共用的抓取引擎（並行上限與限速由它控制）
+        query (str): 搜尋字串
+        boards (list): 要搜尋的看板，None 為 DEFAULT_BOARDS
+        max_pages (int): 每個看板最多翻幾頁（每頁 20 筆）
+        max_results (int): 結果上限，None 表示不限
+        base_url (str): 網站根網址（測試時可指向替身伺服器）
+
+    Returns:
+        list: 去重後的連結，新文章在前
+    """
+    boards = boards or DEFAULT_BOARDS
+    per_board = await asyncio.gather(*(search_board_async(fetcher, board, query, max_pages, base_url)
+                                       for board in boards))
+    results = {}
+    for links in per_board:
+        for link in links:
+            results.setdefault(link['url'], link)
+    ordered = sorted(results.values(), key=lambda link: parse_article_id(link['url']) or (0, ''),
+                     reverse=True)
+    return ordered[:max_results] if max_results else ordered
+
+
+async def sweep_async(fetcher, keywords, boards=None, max_pages=3, max_results=None, on_result=None,
+                      keyword_concurrency=8, base_url=PTT_BASE_URL):
+    """
+    多個關鍵字同時搜尋，每個關鍵字完成時呼叫 on_result(keyword, results)
+
+    Returns:
+        dict: keyword -> 連結列表
+    """
+    slots = asyncio.Semaphore(keyword_concurrency)
+    all_results = {}
+
+    async def run(keyword):
+        async with slots:
+            results = await search_boards_async(fetcher, keyword, boards, max_pages, max_results, base_url)
+        all_results[keyword] = results
+        if on_result:
+            on_result(keyword, results)
+
+    await asyncio.gather(*(run(keyword) for keyword in keywords))
+    return all_results
+
+
+def make_fetcher(concurrency=16, session=None):
+    """看板搜尋用的抓取引擎：帶 over18 cookie，速率由共用的 AIMD 控制器依 PTT 的回應調整"""
+    return AsyncFetcher(concurrency=concurrency, per_host=concurrency, session=session,
+                        rate_controller=get_controller())
+
+
+_local = threading.local()
+
+
+def get_fetcher():
+    """
+    取得看板搜尋共用的抓取引擎：使用整個程式共用的連線池（get_session），逐一搜尋關鍵字時重用對 ptt.cc
+    的 keep-alive 連線；AsyncFetcher 的並行上限綁定在事件迴圈上，所以每個執行緒各有一個
+    （多個引擎工作執行緒同時搜尋時互不干擾）
+    """
+    if getattr(_local, 'fetcher', None) is None:
+        _local.fetcher = make_fetcher(session=get_session())
+    return _local.fetcher
+
+
+def search_boards(query, boards=None, max_pages=3, max_results=None, fetcher=None, base_url=PTT_BASE_URL):
+    """search_boards_async 的同步介面，fetcher 為 None 時使用共用的抓取引擎"""
+    fetcher = fetcher or get_fetcher()
+    return asyncio.run(search_boards_async(fetcher, query, boards, max_pages, max_results, base_url))
+
+
+def sweep(keywords, boards=None, max_pages=3, max_results=None, on_result=None, keyword_concurrency=8,
+          fetcher=None, base_url=PTT_BASE_URL):
+    """sweep_async 的同步介面，fetcher 為 None 時使用共用的抓取引擎"""
+    fetcher = fetcher or get_fetcher()
+    return asyncio.run(sweep_async(fetcher, keywords, boards, max_pages, max_results, on_result,
+                                   keyword_concurrency, base_url))
+
+
+def load_boards(filename):
+    """讀取看板清單檔：每行一個看板，忽略空行和以 # 開頭的註解行"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='以 PTT 看板內建搜尋找文章連結')
+    parser.add_argument('--keyword', required=True, help='搜尋字串')
+    parser.add_argument('--boards', default=None, help='以逗號分隔的看板（預設為內建的房屋與地區看板）')
+    parser.add_argument('--pages', type=int, default=3, help='每個看板最多翻幾頁')
+    args = parser.parse_args()
+
+    boards = args.boards.split(',') if args.boards else None
+    results = search_boards(args.keyword, boards, args.pages)
+    for i, link in enumerate(results, 1):
+        print(f"{i}. [{link['board']}] {link['title']}\n   {link['url']}")
+    print(f'共找到 {len(results)} 個連結')
+    get_controller().print_stats()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+可中斷續爬的爬取日誌
+以網址為鍵，逐行附加 pending / done / failed 狀態與嘗試次數（done 時一併保存爬到的資料），
+程式中斷後用 --resume 重新載入：略過已完成的網址、失敗的網址在次數上限內重試，並可由日誌重建輸出
+"""
+
+import os
+import time
+
+from crawler_common.jsonl_store import JsonlWriter, iter_jsonl
+
+
+PENDING = 'pending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class CrawlJournal:
+    def __init__(self, filename, resume=True, max_attempts=3, fsync_every=10):
+        """
+        初始化日誌
+
+        Args:
+            filename (str): 日誌檔（.jsonl）
+            resume (bool): True 時載入既有日誌接續，False 時清空重新開始
+            max_attempts (int): 失敗網址最多嘗試幾次
+            fsync_every (int): 每幾筆狀態變更 fsync 一次
+        """
+        self.filename = filename
+        self.max_attempts = max_attempts
+        self.entries = {}
+
+        if resume and os.path.exists(filename):
+            # 依序重播每一行，最後一行就是該網址目前的狀態
+            for line in iter_jsonl(filename):
+                self.entries[line['url']] = line
+        self.writer = JsonlWriter(filename, fsync_every=fsync_every, mode='a' if resume else 'w')
+
+    def _append(self, url, state, attempts, data=None, error=None):
+        entry = {'url': url, 'state': state, 'attempts': attempts,
+                 'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+        if data is not None:
+            entry['data'] = data
+        if error is not None:
+            entry['error'] = str(error)
+        self.entries[url] = entry
+        self.writer.write(entry)
+
+    def add_pending(self, urls):
+        """登記尚未出現在日誌中的網址"""
+        for url in urls:
+            if url not in self.entries:
+                self._append(url, PENDING, 0)
+
+    def state(self, url):
+        entry = self.entries.get(url)
+        return entry['state'] if entry else None
+
+    def attempts(self, url):
+        entry = self.entries.get(url)
+        return entry['attempts'] if entry else 0
+
+    def should_fetch(self, url):
+        """已完成的略過；失敗的在次數上限內重試"""
+        state = self.state(url)
+        if state == DONE:
+            return False
+        if state == FAILED:
+            return self.attempts(url) < self.max_attempts
+        return True
+
+    def mark_done(self, url, data=None):
+        self._append(url, DONE, self.attempts(url) + 1, data=data)
+
+    def mark_failed(self, url, error=None):
+        self._append(url, FAILED, self.attempts(url) + 1, error=error)
+
+    def data(self, url):
+        """取得已完成網址保存的資料"""
+        entry = self.entries.get(url)
+        return entry.get('data') if entry and entry['state'] == DONE else None
+
+    def summary(self):
+        counts = {PENDING: 0, DONE: 0, FAILED: 0}
+        for entry in self.entries.values():
+            counts[entry['state']] += 1
+        return counts
+
+    def print_summary(self):
+        counts = self.summary()
+        print(f"爬取日誌: 完成 {counts[DONE]}，失敗 {counts[FAILED]}，待處理 {counts[PENDING]}"
+              f"（{self.filename}）")
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
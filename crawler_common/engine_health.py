@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜尋引擎健康狀態與斷路器
+每個引擎一個斷路器，依搜尋結果判斷：
+    被擋（403 / 429 / 驗證碼頁面）    立即斷路
+    連線錯誤、逾時、5xx              連續 error_threshold 次後斷路
+    連續沒有結果                      連續 empty_threshold 次後斷路（常見的「軟封鎖」）
+斷路期間 allow() 直接回傳 False，搜尋函數不連網立刻回傳空結果，查詢自然交給其他引擎；
+冷卻時間過後放行一個試探請求（half-open），成功就恢復，失敗則冷卻時間加倍
+"""
+
+import threading
+import time
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+# 沒有解析到任何結果時才檢查這些字樣，避免正常頁面中的文字造成誤判
+BLOCK_MARKERS = [
+    'captcha', 'unusual traffic', 'are you a robot', 'verify you are human', 'anomaly-modal',
+    'blocked', '異常流量', '驗證您是真人',
+]
+
+
+def detect_block(response, has_results=False):
+    """
+    判斷回應是否為封鎖頁面
+
+    Args:
+        response (requests.Response): 搜尋引擎的回應
+        has_results (bool): 是否已經從頁面解析到結果
+
+    Returns:
+        str: 封鎖原因，不是封鎖頁面時回傳 None
+    """
+    if response.status_code in (403, 429):
+        return f'HTTP {response.status_code}'
+    if response.status_code == 200 and not has_results:
+        content = response.text.lower()
+        for marker in BLOCK_MARKERS:
+            if marker in content:
+                return f'頁面含有「{marker}」'
+    return None
+
+
+class CircuitBreaker:
+    def __init__(self, name, error_threshold=3, empty_threshold=5, cooldown=300.0, max_cooldown=3600.0):
+        """
+        Args:
+            name (str): 引擎名稱
+            error_threshold (int): 連續幾次錯誤後斷路
+            empty_threshold (int): 連續幾次沒有結果後斷路
+            cooldown (float): 第一次斷路的冷卻秒數
+            max_cooldown (float): 冷卻秒數上限（試探失敗時加倍）
+        """
+        self.name = name
+        self.error_threshold = error_threshold
+        self.empty_threshold = empty_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self.probing = False
+        self.errors = 0
+        self.empties = 0
+        self.reason = None
+        # 統計
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+
+    def available(self):
+        """不改變狀態，只判斷現在是否可能放行（給排程器挑選引擎用）"""
+        with self.lock:
+            return self.state != OPEN or time.monotonic() >= self.open_until
+
+    def allow(self):
+        """是否放行這次請求；冷卻結束後只放行一個試探請求"""
+        with self.lock:
+            if self.state == OPEN and time.monotonic() >= self.open_until:
+                self.state = HALF_OPEN
+                self.probing = False
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            self.rejected += 1
+            return False
+
+    def _trip(self, reason):
+        # 試探失敗時冷卻時間加倍，第一次斷路使用基本冷卻時間
+        if self.state == HALF_OPEN:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+        else:
+            self.cooldown = self.base_cooldown
+        self.state = OPEN
+        self.open_until = time.monotonic() + self.cooldown
+        self.probing = False
+        self.reason = reason
+        self.opened += 1
+        print(f"⛔ {self.name} 暫停使用 {self.cooldown:.0f} 秒（{reason}）")
+
+    def record_success(self):
+        with self.lock:
+            if self.state != CLOSED:
+                print(f"✅ {self.name} 恢復使用")
+            self.state = CLOSED
+            self.cooldown = self.base_cooldown
+            self.errors = self.empties = 0
+            self.probing = False
+            self.reason = None
+            self.successes += 1
+
+    def record_block(self, reason):
+        with self.lock:
+            self.failures += 1
+            self._trip(reason)
+
+    def record_error(self, reason):
+        with self.lock:
+            self.failures += 1
+            self.errors += 1
+            if self.state == HALF_OPEN or self.errors >= self.error_threshold:
+                self._trip(f'連續 {self.errors} 次錯誤：{reason}')
+
+    def record_empty(self):
+        with self.lock:
+            self.empties += 1
+            # 試探請求沒有結果不一定是被擋（可能關鍵字本來就沒有結果），再放行下一個試探
+            self.probing = False
+            if self.empties >= self.empty_threshold:
+                self._trip(f'連續 {self.empties} 次沒有結果')
+
+    def stats(self):
+        with self.lock:
+            remaining = max(0.0, self.open_until - time.monotonic()) if self.state == OPEN else 0.0
+            return {'state': self.state, 'reason': self.reason, 'successes': self.successes,
+                    'failures': self.failures, 'rejected': self.rejected, 'opened': self.opened,
+                    'remaining': remaining}
+
+
+class EngineHealth:
+    def __init__(self, **breaker_options):
+        """
+        所有引擎的斷路器
+
+        Args:
+            **breaker_options: 建立 CircuitBreaker 時的參數（error_threshold、cooldown...）
+        """
+        self.breaker_options = breaker_options
+        self.lock = threading.Lock()
+        self.breakers = {}
+
+    def breaker(self, name):
+        with self.lock:
+            if name not in self.breakers:
+                self.breakers[name] = CircuitBreaker(name, **self.breaker_options)
+            return self.breakers[name]
+
+    def available(self, name):
+        return self.breaker(name).available()
+
+    def allow(self, name):
+        allowed = self.breaker(name).allow()
+        if not allowed:
+            print(f"⏭️  {name} 暫停中，略過")
+        return allowed
+
+    def record_response(self, name, response, result_count):
+        """
+        依回應更新引擎狀態
+
+        Returns:
+            bool: 回應可以使用時為 True（被擋或 HTTP 錯誤時為 False）
+        """
+        breaker = self.breaker(name)
+        reason = detect_block(response, result_count > 0)
+        if reason:
+            breaker.record_block(reason)
+            return False
+        if response.status_code != 200:
+            breaker.record_error(f'HTTP {response.status_code}')
+            return False
+        if result_count:
+            breaker.record_success()
+        else:
+            breaker.record_empty()
+        return True
+
+    def record_error(self, name, error):
+        """連線錯誤、逾時等例外"""
+        self.breaker(name).record_error(str(error) or type(error).__name__)
+
+    def print_stats(self):
+        with self.lock:
+            breakers = list(self.breakers.values())
+        if not breakers:
+            return
+        print("搜尋引擎狀態:")
+        for breaker in breakers:
+            s = breaker.stats()
+            if s['state'] == OPEN:
+                state = f"暫停中（剩 {s['remaining']:.0f} 秒，{s['reason']}）"
+            else:
+                state = '試探中' if s['state'] == HALF_OPEN else '正常'
+            print(f"  {breaker.name}: {state}，成功 {s['successes']}，失敗 {s['failures']}，"
+                  f"略過 {s['rejected']}，斷路 {s['opened']} 次")
+
+
+_shared_health = None
+
+
+def get_engine_health():
+    """取得整個程式共用的 EngineHealth（第一次呼叫時建立）"""
+    global _shared_health
+    if _shared_health is None:
+        _shared_health = EngineHealth()
+    return _shared_health
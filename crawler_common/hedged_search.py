@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜尋引擎的對沖請求（hedged request）
+先送出主要引擎，若超過它過去延遲的某個百分位數仍沒有結果（或它回傳空結果），
+就加送下一個備援引擎，採用最先回來的有效結果；可選擇在第一個結果後再等一小段時間，
+把同時回來的其他引擎結果合併。被捨棄的請求與各引擎的勝出次數都會記錄下來
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+
+
+class EngineRecord:
+    def __init__(self, name, search, history=50):
+        self.name = name
+        self.search = search
+        self.latencies = deque(maxlen=history)
+        self.launched = 0
+        self.wins = 0
+        self.empty = 0
+        self.errors = 0
+        self.cancelled = 0
+
+
+class HedgedRacer:
+    def __init__(self, engines, percentile=0.9, default_delay=3.0, min_delay=0.5, min_samples=5, health=None):
+        """
+        Args:
+            engines (list): (名稱, search(query, max_results)) 列表，依優先順序排列
+            percentile (float): 主要引擎延遲超過這個百分位數仍沒有結果時送出備援
+            default_delay (float): 延遲樣本不足時的等待秒數
+            min_delay (float): 等待秒數下限，避免引擎都很快時每次都加送備援
+            min_samples (int): 至少幾個延遲樣本才用百分位數
+            health (EngineHealth): 引擎斷路器，斷路中的引擎不參與這次搜尋
+        """
+        self.engines = [EngineRecord(name, search) for name, search in engines]
+        self.percentile = percentile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.health = health
+        self.lock = threading.Lock()
+        self.races = 0
+        self.hedged = 0
+
+    def hedge_delay(self, engine):
+        """送出下一個引擎前，等待這個引擎的秒數"""
+        with self.lock:
+            samples = sorted(engine.latencies)
+        if len(samples) < self.min_samples:
+            return self.default_delay
+        index = min(len(samples) - 1, int(len(samples) * self.percentile))
+        return max(self.min_delay, samples[index])
+
+    def _run(self, engine, query, max_results, results):
+        start = time.monotonic()
+        try:
+            found = engine.search(query, max_results)
+            error = None
+        except Exception as e:
+            found = []
+            error = e
+        with self.lock:
+            engine.latencies.append(time.monotonic() - start)
+        results.put((engine, found or [], error))
+
+    def race(self, query, max_results=10, merge_window=0.0, deadline=None):
+        """
+        以對沖方式搜尋
+
+        Args:
+            query (str): 搜尋字串
+            max_results (int): 每個引擎的結果上限
+            merge_window (float): 第一個有效結果回來後，再等幾秒合併其他已送出引擎的結果，0 表示不合併
+            deadline (float): 整體最多等幾秒，None 表示等到所有引擎結束
+
+        Returns:
+            tuple: (結果列表, 勝出的引擎名稱)，沒有結果時為 ([], None)
+        """
+        engines = [engine for engine in self.engines
+                   if self.health is None or self.health.available(engine.name)]
+        if not engines:
+            print("⚠️  所有搜尋引擎都暫停中")
+            return [], None
+        results = queue.Queue()
+        start = time.monotonic()
+        launched = []
+        finished = set()
+        collected = []
+        winner = None
+        merge_until = None
+
+        def launch():
+            engine = engines[len(launched)]
+            launched.append(engine)
+            with self.lock:
+                engine.launched += 1
+            print(f"🔄 送出 {engine.name} 搜尋...")
+            threading.Thread(target=self._run, args=(engine, query, max_results, results),
+                             daemon=True).start()
+            return time.monotonic() + self.hedge_delay(engine)
+
+        next_launch = launch()
+        while len(finished) < len(launched):
+            now = time.monotonic()
+            if merge_until is not None:
+                wait_until = merge_until
+            elif len(launched) < len(engines):
+                wait_until = next_launch
+            else:
+                wait_until = None
+            if deadline is not None:
+                wait_until = min(wait_until or float('inf'), start + deadline)
+            try:
+                timeout = None if wait_until is None else max(0.0, wait_until - now)
+                engine, found, error = results.get(timeout=timeout)
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= start + deadline:
+                    print(f"⏰ 超過 {deadline} 秒，停止等待")
+                    break
+                if merge_until is not None:
+                    break
+                # 目前的引擎太慢，加送下一個備援引擎（全部都已送出時只是逾時判斷的誤差，繼續等）
+                if len(launched) < len(engines):
+                    next_launch = launch()
+                continue
+
+            finished.add(engine.name)
+            with self.lock:
+                if error is not None:
+                    engine.errors += 1
+                elif not found:
+                    engine.empty += 1
+            if error is not None:
+                print(f"❌ {engine.name} 搜索失敗: {error}")
+            if not found:
+                if winner is None and len(launched) < len(engines):
+                    # 沒有結果時不必等待，立刻換下一個引擎
+                    next_launch = launch()
+                continue
+
+            collected.extend(found)
+            if winner is None:
+                winner = engine.name
+                with self.lock:
+                    engine.wins += 1
+                print(f"✅ {engine.name} 最先回傳 {len(found)} 個結果")
+                if merge_window <= 0:
+                    break
+                merge_until = time.monotonic() + merge_window
+            else:
+                print(f"➕ 合併 {engine.name} 的 {len(found)} 個結果")
+
+        cancelled = [engine for engine in launched if engine.name not in finished]
+        with self.lock:
+            self.races += 1
+            self.hedged += len(launched) > 1
+            for engine in cancelled:
+                engine.cancelled += 1
+        if cancelled:
+            print(f"🛑 捨棄仍在進行的請求: {', '.join(engine.name for engine in cancelled)}")
+        return collected, winner
+
+    def stats(self):
+        with self.lock:
+            return {
+                'races': self.races,
+                'hedged': self.hedged,
+                'engines': {engine.name: {
+                    'launched': engine.launched, 'wins': engine.wins, 'empty': engine.empty,
+                    'errors': engine.errors, 'cancelled': engine.cancelled,
+                    'win_rate': engine.wins / engine.launched if engine.launched else 0.0,
+                } for engine in self.engines},
+            }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"對沖搜尋: {s['races']} 次，其中 {s['hedged']} 次加送備援引擎")
+        for engine in self.engines:
+            e = s['engines'][engine.name]
+            print(f"  {engine.name}: 送出 {e['launched']} 次，勝出 {e['wins']} 次（{e['win_rate']:.0%}），"
+                  f"無結果 {e['empty']} 次，錯誤 {e['errors']} 次，捨棄 {e['cancelled']} 次，"
+                  f"對沖等待 {self.hedge_delay(engine):.1f} 秒")
@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原始 HTML 壓縮封存（WARC 風格）與離線重新解析
+抓到的原始回應逐筆以 zstd 壓縮、附加寫入分段檔（segment-00001.warc.zst ...），
+每筆是獨立的壓縮區塊，SQLite 索引記錄 (分段, 位移, 長度)，可以直接跳到任一筆讀取。
+修改擷取規則（例如簽名檔的去除方式）時用 reparse 對封存重跑，不必重新下載
+
+需要 zstandard（pip install zstandard）；沒有安裝時改用 zlib 壓縮，索引會記錄各筆的壓縮方式
+
+使用方式：
+    python -m crawler_common.html_archive stats --archive html_archive
+    python -m crawler_common.html_archive get --archive html_archive --url https://www.ptt.cc/bbs/...
+    python -m crawler_common.html_archive reparse --archive html_archive \\
+        --extractor crawler_common.ptt_parser:extract_link_article --output reparsed.jsonl [--processes 4]
+"""
+
+import argparse
+import importlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from crawler_common.jsonl_store import JsonlWriter
+
+
+SEGMENT_PATTERN = 'segment-{:05d}.warc.{}'
+
+
+def _compress(data, codec, level):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, level)
+
+
+def _decompress(data, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ImportError('這筆封存以 zstd 壓縮，請先執行 pip install zstandard')
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+def build_record(url, body, status=200, headers=None):
+    """組成 WARC 風格的紀錄：標頭行、空行、原始回應內容"""
+    lines = [
+        'WARC/1.0',
+        'WARC-Type: response',
+        f'WARC-Target-URI: {url}',
+        f"WARC-Date: {time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}",
+        f'HTTP-Status: {status}',
+    ]
+    for name in ('Content-Type', 'ETag', 'Last-Modified'):
+        if headers and headers.get(name):
+            lines.append(f'{name}: {headers[name]}')
+    lines.append(f'Content-Length: {len(body)}')
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + body
+
+
+def split_record(record):
+    """拆出 (標頭 dict, 原始內容)"""
+    head, _, body = record.partition(b'\r\n\r\n')
+    fields = {}
+    for line in head.decode('utf-8').split('\r\n')[1:]:
+        name, _, value = line.partition(': ')
+        fields[name] = value
+    return fields, body
+
+
+def read_record(segment_path, offset, length, codec):
+    """讀取單一紀錄的原始內容（reparse 的子行程也會呼叫）"""
+    with open(segment_path, 'rb') as f:
+        f.seek(offset)
+        return split_record(_decompress(f.read(length), codec))
+
+
+class HTMLArchive:
+    def __init__(self, archive_dir='html_archive', segment_bytes=256 * 1024 * 1024, level=3):
+        """
+        開啟或建立封存
+
+        Args:
+            archive_dir (str): 封存資料夾，內含分段檔與 index.sqlite
+            segment_bytes (int): 單一分段檔的大小上限，超過時換下一個分段
+            level (int): 壓縮等級
+        """
+        self.archive_dir = archive_dir
+        self.segment_bytes = segment_bytes
+        self.level = level
+        self.codec = 'zstd' if zstandard is not None else 'zlib'
+        os.makedirs(archive_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(archive_dir, 'index.sqlite'), check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS records (
+                               url TEXT NOT NULL,
+                               segment TEXT NOT NULL,
+                               offset INTEGER NOT NULL,
+                               length INTEGER NOT NULL,
+                               codec TEXT NOT NULL,
+                               status INTEGER,
+                               size INTEGER NOT NULL,
+                               fetched REAL NOT NULL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_records_url ON records(url, fetched)')
+        self.db.commit()
+
+        row = self.db.execute('SELECT segment FROM records ORDER BY rowid DESC LIMIT 1').fetchone()
+        self.segment_number = int(row[0].split('-')[1].split('.')[0]) if row else 1
+        self.file = None
+        self._open_segment()
+        self.pending = 0
+
+    def _segment_name(self):
+        return SEGMENT_PATTERN.format(self.segment_number, 'zst' if self.codec == 'zstd' else 'zz')
+
+    def _open_segment(self):
+        if self.file:
+            self.file.close()
+        self.file = open(os.path.join(self.archive_dir, self._segment_name()), 'ab')
+
+    def write(self, url, body, status=200, headers=None):
+        """附加一筆原始回應"""
+        data = _compress(build_record(url, body, status, headers), self.codec, self.level)
+        with self.lock:
+            if self.file.tell() and self.file.tell() + len(data) > self.segment_bytes:
+                self.segment_number += 1
+                self._open_segment()
+            offset = self.file.tell()
+            self.file.write(data)
+            self.db.execute('INSERT INTO records VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                            (url, self._segment_name(), offset, len(data), self.codec, status,
+                             len(body), time.time()))
+            self.pending += 1
+            if self.pending >= 50:
+                self.flush()
+
+    def flush(self):
+        self.file.flush()
+        self.db.commit()
+        self.pending = 0
+
+    def _location(self, row):
+        segment, offset, length, codec = row
+        return os.path.join(self.archive_dir, segment), offset, length, codec
+
+    def contains(self, url):
+        """網址是否已經有封存紀錄"""
+        with self.lock:
+            return self.db.execute('SELECT 1 FROM records WHERE url = ? LIMIT 1', (url,)).fetchone() is not None
+
+    def read(self, url):
+        """讀取網址最新一次的原始內容，沒有封存時回傳 None"""
+        with self.lock:
+            self.flush()
+            row = self.db.execute('SELECT segment, offset, length, codec FROM records WHERE url = ? '
+                                  'ORDER BY fetched DESC LIMIT 1', (url,)).fetchone()
+        if not row:
+            return None
+        return read_record(*self._location(row))[1]
+
+    def locations(self):
+        """每個網址最新一筆的 (url, 分段路徑, 位移, 長度, 壓縮方式)"""
+        with self.lock:
+            self.flush()
+            rows = self.db.execute('''SELECT url, segment, offset, length, codec FROM records r
+                                      WHERE rowid = (SELECT rowid FROM records WHERE url = r.url
+                                                     ORDER BY fetched DESC LIMIT 1)
+                                      ORDER BY rowid''').fetchall()
+        return [(url,) + self._location(row) for url, *row in rows]
+
+    def stats(self):
+        with self.lock:
+            self.flush()
+            records, urls, raw = self.db.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT url), COALESCE(SUM(size), 0) FROM records').fetchone()
+        stored = sum(os.path.getsize(os.path.join(self.archive_dir, name))
+                     for name in os.listdir(self.archive_dir) if name.startswith('segment-'))
+        return {'records': records, 'urls': urls, 'raw_bytes': raw, 'stored_bytes': stored}
+
+    def print_stats(self):
+        s = self.stats()
+        ratio = s['raw_bytes'] / s['stored_bytes'] if s['stored_bytes'] else 0.0
+        print(f"HTML 封存: {s['records']} 筆（{s['urls']} 個網址），原始 {s['raw_bytes'] / 1024:.0f} KB，"
+              f"壓縮後 {s['stored_bytes'] / 1024:.0f} KB（{ratio:.1f}x）")
+
+    def close(self):
+        with self.lock:
+            self.flush()
+            self.file.close()
+            self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_extractor(spec):
+    """'模組:函數' 轉成函數，例如 crawler_common.ptt_parser:extract_link_article"""
+    module_name, _, func_name = spec.partition(':')
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def _reparse_one(extractor_spec, url, segment_path, offset, length, codec):
+    """子行程：讀出一筆紀錄並以擷取函數解析"""
+    _, body = read_record(segment_path, offset, length, codec)
+    try:
+        return url, load_extractor(extractor_spec)(body.decode('utf-8', errors='replace')), None
+    except Exception as e:
+        return url, None, str(e)
+
+
+def reparse(archive_dir, extractor_spec, output_jsonl, processes=None):
+    """
+    以擷取函數重新解析封存中每個網址最新的頁面，完全不連網
+
+    Returns:
+        tuple: (成功數, 失敗數)
+    """
+    with HTMLArchive(archive_dir) as archive:
+        locations = archive.locations()
+    ok = failed = 0
+    with ProcessPoolExecutor(max_workers=processes) as pool, JsonlWriter(output_jsonl, mode='w') as writer:
+        futures = pool.map(_reparse_one, [extractor_spec] * len(locations), *zip(*locations),
+                           chunksize=32) if locations else []
+        for url, result, error in futures:
+            if error is None:
+                writer.write({'url': url, 'result': result})
+                ok += 1
+            else:
+                print(f'解析失敗 {url}: {error}')
+                failed += 1
+    return ok, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='原始 HTML 封存工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    stats_parser = sub.add_parser('stats', help='顯示封存統計')
+    stats_parser.add_argument('--archive', default='html_archive')
+    get_parser = sub.add_parser('get', help='輸出某個網址最新的原始 HTML')
+    get_parser.add_argument('--archive', default='html_archive')
+    get_parser.add_argument('--url', required=True)
+    reparse_parser = sub.add_parser('reparse', help='以擷取函數離線重新解析整個封存')
+    reparse_parser.add_argument('--archive', default='html_archive')
+    reparse_parser.add_argument('--extractor', default='crawler_common.ptt_parser:extract_link_article',
+                                help='模組:函數，函數接收 HTML 字串並回傳可轉成 JSON 的結果')
+    reparse_parser.add_argument('--output', default='reparsed.jsonl')
+    reparse_parser.add_argument('--processes', type=int, default=None, help='行程數（預設為 CPU 核心數）')
+    args = parser.parse_args()
+
+    if args.command == 'reparse':
+        start = time.perf_counter()
+        ok, failed = reparse(args.archive, args.extractor, args.output, args.processes)
+        elapsed = time.perf_counter() - start
+        print(f'重新解析 {ok} 頁（失敗 {failed}），耗時 {elapsed:.2f} 秒，結果已寫入 {args.output}')
+        return
+
+    with HTMLArchive(args.archive) as archive:
+        if args.command == 'stats':
+            archive.print_stats()
+        else:
+            body = archive.read(args.url)
+            if body is None:
+                print('封存中沒有這個網址')
+            else:
+                print(body.decode('utf-8', errors='replace'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本機磁碟 HTTP 快取
+以內容雜湊保存回應內容，並記錄每個網址的 ETag / Last-Modified，
+再次造訪時送出 If-None-Match / If-Modified-Since，沒變動的文章只需一個 304 回應
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+
+class HTTPCache:
+    def __init__(self, cache_dir='http_cache', max_bytes=512 * 1024 * 1024):
+        """
+        初始化快取
+
+        Args:
+            cache_dir (str): 快取資料夾，內含 index.sqlite 與 blobs/
+            max_bytes (int): 快取內容總大小上限，超過時依最近最少使用 (LRU) 淘汰
+        """
+        self.cache_dir = cache_dir
+        self.blob_dir = os.path.join(cache_dir, 'blobs')
+        self.max_bytes = max_bytes
+        os.makedirs(self.blob_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(cache_dir, 'index.sqlite'), check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS entries (
+                               url TEXT PRIMARY KEY,
+                               blob TEXT NOT NULL,
+                               size INTEGER NOT NULL,
+                               etag TEXT,
+                               last_modified TEXT,
+                               last_access REAL NOT NULL)''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_entries_access ON entries(last_access)')
+        self.db.commit()
+        self.total_bytes = self._blob_bytes()
+
+        # 統計：hits = 伺服器回 304 而沿用快取，misses = 完整下載
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def _blob_bytes(self):
+        row = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM '
+                              '(SELECT DISTINCT blob, size FROM entries)').fetchone()
+        return row[0]
+
+    def _blob_path(self, blob):
+        return os.path.join(self.blob_dir, blob[:2], blob)
+
+    def lookup(self, url):
+        """取得網址的快取紀錄，回傳 dict 或 None"""
+        with self.lock:
+            row = self.db.execute('SELECT blob, size, etag, last_modified FROM entries WHERE url = ?',
+                                  (url,)).fetchone()
+        if not row or not os.path.exists(self._blob_path(row[0])):
+            return None
+        return {'blob': row[0], 'size': row[1], 'etag': row[2], 'last_modified': row[3]}
+
+    def conditional_headers(self, entry):
+        """依快取紀錄產生條件式請求標頭"""
+        headers = {}
+        if entry and entry['etag']:
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry['last_modified']:
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def read(self, entry):
+        with open(self._blob_path(entry['blob']), 'rb') as f:
+            return f.read()
+
+    def touch(self, url):
+        with self.lock:
+            self.db.execute('UPDATE entries SET last_access = ? WHERE url = ?', (time.time(), url))
+            self.db.commit()
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """保存回應內容（以 sha256 命名，相同內容只存一份）"""
+        blob = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(blob)
+        with self.lock:
+            is_new_blob = not self.db.execute('SELECT 1 FROM entries WHERE blob = ? LIMIT 1',
+                                              (blob,)).fetchone()
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f'{path}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+
+            old = self.db.execute('SELECT blob FROM entries WHERE url = ?', (url,)).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                            (url, blob, len(body), etag, last_modified, time.time()))
+            if is_new_blob:
+                self.total_bytes += len(body)
+            if old and old[0] != blob:
+                self._release_blob(old[0])
+            self._evict()
+            self.db.commit()
+
+    def _release_blob(self, blob):
+        """沒有網址再引用時刪除內容檔"""
+        if self.db.execute('SELECT 1 FROM entries WHERE blob = ? LIMIT 1', (blob,)).fetchone():
+            return
+        path = self._blob_path(blob)
+        if os.path.exists(path):
+            self.total_bytes -= os.path.getsize(path)
+            os.remove(path)
+
+    def _evict(self):
+        """超過大小上限時，從最久沒用到的紀錄開始刪除"""
+        while self.total_bytes > self.max_bytes:
+            row = self.db.execute('SELECT url, blob FROM entries ORDER BY last_access LIMIT 1').fetchone()
+            if not row:
+                break
+            self.db.execute('DELETE FROM entries WHERE url = ?', (row[0],))
+            self._release_blob(row[1])
+
+    def stats(self):
+        total = self.hits + self.misses
+        with self.lock:
+            entries = self.db.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'bytes_saved': self.bytes_saved,
+            'entries': entries,
+            'total_bytes': self.total_bytes,
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"HTTP 快取: 命中 {s['hits']}，未命中 {s['misses']}（命中率 {s['hit_rate']:.1%}），"
+              f"節省 {s['bytes_saved'] / 1024:.0f} KB，快取 {s['entries']} 筆 / {s['total_bytes'] / 1024:.0f} KB")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+def _response_from_cache(url, body, entry):
+    """用快取內容組成 requests.Response，讓呼叫端照常使用 .text / .status_code"""
+    response = requests.models.Response()
+    response.status_code = 200
+    response.url = url
+    response._content = body
+    response.encoding = 'utf-8'
+    if entry['etag']:
+        response.headers['ETag'] = entry['etag']
+    if entry['last_modified']:
+        response.headers['Last-Modified'] = entry['last_modified']
+    response.from_cache = True
+    return response
+
+
+def cached_get(session, url, cache=None, headers=None, archive=None, **kwargs):
+    """
+    帶快取的 GET：cache 為 None 時等同 session.get
+
+    Args:
+        session: requests.Session 或 requests 模組
+        url (str): 網址
+        cache (HTTPCache): 快取物件
+        headers (dict): 額外的請求標頭
+        archive (HTMLArchive): 原始 HTML 封存，實際下載到的 200 回應會附加寫入；
+                               304 時若封存中還沒有這個網址（封存建立前就已快取的頁面），寫入快取的內容
+        **kwargs: 其餘傳給 session.get 的參數（cookies、timeout...）
+    """
+    if cache is None:
+        response = session.get(url, headers=headers, **kwargs)
+        if archive is not None and response.status_code == 200:
+            archive.write(url, response.content, response.status_code, response.headers)
+        return response
+
+    entry = cache.lookup(url)
+    request_headers = dict(headers or {})
+    request_headers.update(cache.conditional_headers(entry))
+
+    response = session.get(url, headers=request_headers, **kwargs)
+
+    if response.status_code == 304 and entry:
+        with cache.lock:
+            cache.hits += 1
+            cache.bytes_saved += entry['size']
+        cache.touch(url)
+        cached = _response_from_cache(url, cache.read(entry), entry)
+        if archive is not None and not archive.contains(url):
+            archive.write(url, cached.content, 200, cached.headers)
+        return cached
+
+    response.from_cache = False
+    if response.status_code == 200:
+        with cache.lock:
+            cache.misses += 1
+        cache.store(url, response.content,
+                    etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'))
+        if archive is not None:
+            archive.write(url, response.content, response.status_code, response.headers)
+    return response
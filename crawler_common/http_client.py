@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共用的連線池 HTTP 用戶端
+以 keep-alive 的 requests.Session 取代模組層級的 requests.get：
+每個主機保留一組連線池、預設逾時、自動 gzip / brotli 解壓，
+並可列出每個主機的連線重用統計，確認連線真的有被重用；
+設定 rate_controller 後每個請求都經過 AIMD 自適應限速；
+設定環境變數 CRAWLER_REPLAY 時自動安裝錄製 / 重播（見 replay.py）
+"""
+
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+
+from crawler_common import replay
+from crawler_common.rate_control import get_controller, parse_retry_after
+
+
+DEFAULT_TIMEOUT = (5, 30)  # (連線, 讀取) 秒數
+
+
+class PooledSession(requests.Session):
+    def __init__(self, pool_maxsize=16, pool_sizes=None, timeout=DEFAULT_TIMEOUT, max_retries=0,
+                 max_hosts=50, rate_controller=None):
+        """
+        初始化連線池
+
+        Args:
+            pool_maxsize (int): 每個主機預設保留的連線數
+            pool_sizes (dict): 個別主機的連線數，例如 {'www.ptt.cc': 16}
+            timeout (float | tuple): 沒有指定 timeout 的請求使用的預設逾時
+            max_retries (int): 連線失敗時的重試次數
+            max_hosts (int): 最多同時保留幾個主機的連線池
+            rate_controller (AIMDController): 自適應限速器，None 表示不限速
+        """
+        super().__init__()
+        replay.install()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_hosts = max_hosts
+        self.rate_controller = rate_controller
+        self.adapters_by_host = {}
+        # brotli 套件有安裝時會一併宣告 br，urllib3 自動解壓
+        self.headers['Accept-Encoding'] = make_headers(accept_encoding=True)['accept-encoding']
+
+        adapter = HTTPAdapter(pool_connections=max_hosts, pool_maxsize=pool_maxsize,
+                              max_retries=max_retries)
+        self.mount('http://', adapter)
+        self.mount('https://', adapter)
+        for host, size in (pool_sizes or {}).items():
+            self.mount_host(host, size)
+
+    def mount_host(self, host, pool_maxsize):
+        """替單一主機設定獨立大小的連線池"""
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize,
+                              max_retries=self.max_retries)
+        self.adapters_by_host[host] = adapter
+        self.mount(f'http://{host}/', adapter)
+        self.mount(f'https://{host}/', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        if self.rate_controller is None:
+            return super().request(method, url, **kwargs)
+
+        self.rate_controller.wait(url)
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, **kwargs)
+        except requests.RequestException:
+            self.rate_controller.record(url, None, time.monotonic() - start)
+            raise
+        self.rate_controller.record(url, response.status_code, time.monotonic() - start,
+                                    parse_retry_after(response))
+        return response
+
+    def stats(self):
+        """
+        每個主機的請求數與新建連線數
+
+        Returns:
+            dict: {host: {'requests', 'connections', 'reuse_rate'}}
+        """
+        result = {}
+        adapters = {id(adapter): adapter for adapter in self.adapters.values()}
+        for adapter in adapters.values():
+            for key in adapter.poolmanager.pools.keys():
+                pool = adapter.poolmanager.pools.get(key)
+                if pool is None:
+                    continue
+                host = pool.host if pool.port in (None, 80, 443) else f'{pool.host}:{pool.port}'
+                entry = result.setdefault(host, {'requests': 0, 'connections': 0})
+                entry['requests'] += pool.num_requests
+                entry['connections'] += pool.num_connections
+        for entry in result.values():
+            requests_made = entry['requests']
+            entry['reuse_rate'] = 1 - entry['connections'] / requests_made if requests_made else 0.0
+        return result
+
+    def print_stats(self):
+        for host, s in sorted(self.stats().items()):
+            print(f"連線池 {host}: 請求 {s['requests']}，新建連線 {s['connections']}，"
+                  f"重用率 {s['reuse_rate']:.1%}")
+
+
+_shared_session = None
+
+
+def get_session():
+    """取得整個程式共用的 PooledSession（第一次呼叫時建立，使用共用的限速控制器）"""
+    global _shared_session
+    if _shared_session is None:
+        _shared_session = PooledSession(rate_controller=get_controller())
+    return _shared_session
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JSON Lines 串流寫入與壓實
+每篇文章附加一行精簡 JSON、批次 fsync，存檔成本不會隨資料量變大；
+需要排版好的 JSON 陣列時再用 compact_jsonl 一次轉出
+"""
+
+import json
+import os
+
+
+class JsonlWriter:
+    def __init__(self, filename, fsync_every=50, mode='a'):
+        """
+        初始化寫入器
+
+        Args:
+            filename (str): 輸出的 .jsonl 檔
+            fsync_every (int): 每寫入幾筆才 fsync 一次
+            mode (str): 'a' 接續既有檔案，'w' 重新開始
+        """
+        self.filename = filename
+        self.fsync_every = fsync_every
+        self.file = open(filename, mode, encoding='utf-8')
+        self.pending = 0
+        self.count = 0
+
+    def write(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+        self.count += 1
+        self.pending += 1
+        if self.pending >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        """把緩衝寫到磁碟"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_jsonl(filename):
+    """逐行讀取 .jsonl，略過程式中斷時寫到一半的最後一行"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"略過無法解析的一行: {line[:50]}...")
+
+
+def compact_jsonl(jsonl_filename, json_filename, indent=2):
+    """
+    把 .jsonl 轉成排版好的 JSON 陣列（與 json.dump(list, indent=2) 的輸出相同）
+    逐筆串流寫出，不需把整個檔案載入記憶體
+
+    Returns:
+        int: 寫出的筆數
+    """
+    pad = ' ' * indent
+    count = 0
+    tmp_filename = json_filename + '.tmp'
+    with open(tmp_filename, 'w', encoding='utf-8') as out:
+        out.write('[')
+        for record in iter_jsonl(jsonl_filename):
+            item = json.dumps(record, ensure_ascii=False, indent=indent)
+            out.write(',\n' if count else '\n')
+            out.write('\n'.join(pad + line for line in item.split('\n')))
+            count += 1
+        out.write('\n]' if count else ']')
+    os.replace(tmp_filename, json_filename)
+    return count
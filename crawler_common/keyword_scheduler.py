@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多搜尋引擎的批量關鍵字排程
+每個引擎各自有工作執行緒與最小請求間隔（引擎自己的速率預算），所有引擎同時從共用的
+關鍵字佇列取工作；某個引擎查不到結果時，關鍵字放回佇列最前面交給還沒試過的引擎，
+效果等同逐一嘗試多個引擎，但不同關鍵字可以同時由不同引擎處理。
+每個關鍵字完成就呼叫 on_result，不必等整批結束才寫檔
+"""
+
+import threading
+import time
+from collections import deque
+
+
+class Engine:
+    def __init__(self, name, search, interval=0.0, workers=1):
+        """
+        Args:
+            name (str): 引擎名稱
+            search (callable): search(query, max_results) -> 結果列表；經過 cached_search 的函數有 peek，
+                               快取命中時直接使用，不佔用引擎的請求間隔
+            interval (float): 同一個引擎兩次搜尋開始的最小間隔秒數
+            workers (int): 同時進行的搜尋數
+        """
+        self.name = name
+        self.search = search
+        self.peek = getattr(search, 'peek', None)
+        self.interval = interval
+        self.workers = workers
+        self.next_time = 0.0
+        self.searches = 0
+        self.hits = 0
+        self.errors = 0
+        self.cached = 0
+        self.busy = 0.0
+
+
+class KeywordScheduler:
+    def __init__(self, engines, on_result=None, health=None):
+        """
+        Args:
+            engines (list): Engine 列表，排在前面的引擎優先處理新的關鍵字
+            on_result (callable): 每個關鍵字完成時呼叫 on_result(keyword, results, engine_name)，
+                                  同一時間只會有一個呼叫（可以直接寫檔）
+            health (EngineHealth): 引擎斷路器；斷路中的引擎不取新的關鍵字，
+                                   其餘引擎都試過而只剩斷路中的引擎時，關鍵字直接以空結果結束
+        """
+        self.engines = engines
+        self.on_result = on_result
+        self.health = health
+        self.condition = threading.Condition()
+        self.result_lock = threading.Lock()
+        self.pending = deque()
+        self.results = {}
+        self.depths = {}
+        self.remaining = 0
+        self.elapsed = 0.0
+
+    def _available(self, engine):
+        return self.health is None or self.health.available(engine.name)
+
+    def _exhausted(self, tried):
+        """所有引擎都已試過或正在斷路中"""
+        return all(engine.name in tried or not self._available(engine) for engine in self.engines)
+
+    def _take(self, engine):
+        """取出這個引擎還沒試過的第一個關鍵字，全部完成時回傳 None"""
+        while True:
+            stranded = []
+            with self.condition:
+                if not self.remaining:
+                    return None
+                if self._available(engine):
+                    for item in self.pending:
+                        if engine.name not in item[1]:
+                            self.pending.remove(item)
+                            item[1].add(engine.name)
+                            return item
+                else:
+                    # 這個引擎斷路中：沒有其他引擎能處理的關鍵字直接結束，不必等冷卻
+                    stranded = [item for item in self.pending if self._exhausted(item[1])]
+                    for item in stranded:
+                        self.pending.remove(item)
+                if not stranded:
+                    # 斷路的引擎可能隨時恢復，定期重新檢查
+                    self.condition.wait(timeout=None if self.health is None else 1.0)
+            for keyword, _ in stranded:
+                self._finish(keyword, [], None)
+
+    def _pace(self, engine):
+        with self.condition:
+            now = time.monotonic()
+            start = max(now, engine.next_time)
+            engine.next_time = start + engine.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _finish(self, keyword, results, engine_name):
+        with self.result_lock:
+            self.results[keyword] = results
+            if self.on_result:
+                try:
+                    self.on_result(keyword, results, engine_name)
+                except Exception as e:
+                    print(f'處理關鍵字 {keyword} 的結果時發生錯誤: {e}')
+        with self.condition:
+            self.remaining -= 1
+            self.condition.notify_all()
+
+    def _worker(self, engine, max_results):
+        while True:
+            item = self._take(engine)
+            if item is None:
+                return
+            keyword, tried = item
+            limit = max_results * self.depths.get(keyword, 1)
+            start = time.monotonic()
+            error = False
+            try:
+                results = engine.peek(keyword, limit) if engine.peek else None
+                if results is None:
+                    self._pace(engine)
+                    start = time.monotonic()
+                    results = engine.search(keyword, limit)
+            except Exception as e:
+                print(f'❌ {engine.name} 搜尋 {keyword} 失敗: {e}')
+                results = []
+                error = True
+            with self.condition:
+                engine.busy += time.monotonic() - start
+                engine.searches += 1
+                engine.errors += error
+                engine.hits += bool(results)
+                engine.cached += bool(getattr(results, 'from_cache', False))
+            if results:
+                self._finish(keyword, results, engine.name)
+            elif self._exhausted(tried):
+                self._finish(keyword, [], None)
+            else:
+                # 交給還沒試過的引擎，放在最前面讓這個關鍵字盡快完成
+                with self.condition:
+                    self.pending.appendleft(item)
+                    self.condition.notify_all()
+
+    def run(self, keywords, max_results=10, pages=None):
+        """
+        搜尋所有關鍵字，回傳 keyword -> 結果列表（沒有任何引擎找到結果時為空列表）
+
+        Args:
+            keywords (list): 關鍵字列表，依序處理
+            max_results (int): 每頁的結果上限
+            pages (dict): keyword -> 搜尋深度（頁數），該關鍵字的結果上限為 max_results * 頁數
+        """
+        keywords = list(dict.fromkeys(keywords))
+        with self.condition:
+            self.depths = dict(pages or {})
+            self.pending = deque((keyword, set()) for keyword in keywords)
+            self.remaining = len(keywords)
+        start = time.monotonic()
+        threads = [threading.Thread(target=self._worker, args=(engine, max_results), daemon=True)
+                   for engine in self.engines for _ in range(engine.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.monotonic() - start
+        return self.results
+
+    def keywords_per_minute(self):
+        return len(self.results) / self.elapsed * 60 if self.elapsed else 0.0
+
+    def print_stats(self):
+        print(f'關鍵字: {len(self.results)} 個，耗時 {self.elapsed:.1f} 秒，'
+              f'{self.keywords_per_minute():.1f} 個/分鐘')
+        for engine in self.engines:
+            average = engine.busy / engine.searches if engine.searches else 0.0
+            print(f'  {engine.name}: 搜尋 {engine.searches} 次（快取 {engine.cached} 次），有結果 {engine.hits} 次，'
+                  f'錯誤 {engine.errors} 次，平均 {average:.2f} 秒')
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+依關鍵字收穫排程的批量搜尋計畫
+連結主檔（link_store）的搜尋紀錄記下每次搜尋「找到幾個、實際新增幾個不重複連結、搜了幾頁」，
+以此估計每個關鍵字下一次每頁預期能新增的連結數：
+    - 近期的紀錄權重較高（每往前一次權重減半），並以所有關鍵字的平均值作為先驗，
+      沒搜尋過的關鍵字直接用先驗值（保留探索的機會）
+    - 連續沒有新增的關鍵字，每多一次預期值再減半（退避），自然排到預算之外
+    - 上次結果被上限截斷且大多是新連結的關鍵字，下次多搜一頁；沒有新增的回到一頁
+依預期值由高到低挑選，直到用完請求預算（每頁算一次請求）
+
+使用方式：
+    python -m crawler_common.keyword_yield --db 0820/ptt_links_master.sqlite --keywords 0820/keywords.txt --budget 200
+"""
+
+import argparse
+
+from crawler_common.link_store import LinkStore
+
+
+DEFAULT_PRIOR = 5.0
+
+
+class KeywordPlan:
+    def __init__(self, keyword, pages, expected, searches, reason):
+        self.keyword = keyword
+        self.pages = pages
+        self.expected = expected      # 每頁預期新增的連結數
+        self.searches = searches
+        self.reason = reason
+
+
+def estimate(history, prior, page_size, max_pages, decay=0.5):
+    """
+    估計單一關鍵字的每頁預期新增數與下次的搜尋深度
+
+    Args:
+        history (list): [(search_time, 找到數, 新增數, 頁數), ...]，依時間排序
+        prior (float): 先驗的每頁新增數
+        page_size (int): 每頁的結果上限
+        max_pages (int): 最深搜尋幾頁
+
+    Returns:
+        tuple: (每頁預期新增數, 頁數, 說明)
+    """
+    if not history:
+        return prior, 1, '未搜尋過'
+    weighted_added = weighted_pages = 0.0
+    weight = 1.0
+    for _, _, added, pages in reversed(history):
+        weighted_added += weight * added
+        weighted_pages += weight * max(1, pages)
+        weight *= decay
+    expected = (weighted_added + prior) / (weighted_pages + 1)
+
+    zero_streak = 0
+    for _, _, added, _ in reversed(history):
+        if added:
+            break
+        zero_streak += 1
+    _, found, added, pages = history[-1]
+    if zero_streak:
+        return expected * decay ** zero_streak, 1, f'連續 {zero_streak} 次沒有新增'
+    if found >= page_size * max(1, pages) and added * 2 >= found:
+        return expected, min(max_pages, pages + 1), '結果被截斷且多為新連結，加深一頁'
+    return expected, max(1, pages), f'上次新增 {added} 個'
+
+
+def plan_sweep(store, keywords, budget=None, page_size=20, max_pages=5):
+    """
+    產生批量搜尋計畫
+
+    Args:
+        store (LinkStore): 連結主檔
+        keywords (list): 候選關鍵字
+        budget (int): 請求預算（頁數總和），None 表示每個關鍵字都搜尋
+        page_size (int): 每頁結果上限
+        max_pages (int): 單一關鍵字最深幾頁
+
+    Returns:
+        list: 依預期收穫排序的 KeywordPlan
+    """
+    history = store.keyword_searches()
+    total_added = total_pages = 0
+    for records in history.values():
+        for _, _, added, pages in records:
+            total_added += added
+            total_pages += max(1, pages)
+    prior = total_added / total_pages if total_pages else DEFAULT_PRIOR
+
+    candidates = []
+    for keyword in dict.fromkeys(keywords):
+        records = history.get(keyword, [])
+        expected, pages, reason = estimate(records, prior, page_size, max_pages)
+        candidates.append(KeywordPlan(keyword, pages, expected, len(records), reason))
+    candidates.sort(key=lambda plan: plan.expected, reverse=True)
+
+    if budget is None:
+        return candidates
+    plans = []
+    remaining = budget
+    for plan in candidates:
+        if remaining <= 0:
+            break
+        plan.pages = min(plan.pages, remaining)
+        remaining -= plan.pages
+        plans.append(plan)
+    return plans
+
+
+def print_plan(plans, total_keywords, limit=20):
+    pages = sum(plan.pages for plan in plans)
+    expected = sum(plan.expected * plan.pages for plan in plans)
+    print(f"搜尋計畫: {len(plans)}/{total_keywords} 個關鍵字，共 {pages} 頁，預期新增約 {expected:.0f} 個連結")
+    for plan in plans[:limit]:
+        print(f"  {plan.keyword}: {plan.pages} 頁，每頁預期 {plan.expected:.1f} 個（{plan.reason}）")
+    if len(plans) > limit:
+        print(f"  ...（其餘 {len(plans) - limit} 個）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='依歷史收穫產生批量搜尋計畫')
+    parser.add_argument('--db', required=True, help='連結主檔 .sqlite')
+    parser.add_argument('--keywords', required=True, help='關鍵字檔，每行一個')
+    parser.add_argument('--budget', type=int, default=None, help='請求預算（頁數總和）')
+    parser.add_argument('--max-pages', type=int, default=5, help='單一關鍵字最深幾頁')
+    args = parser.parse_args()
+
+    with open(args.keywords, 'r', encoding='utf-8') as f:
+        keywords = [line.strip() for line in f if line.strip() and not line.strip().startswith('#')]
+    store = LinkStore(args.db)
+    plans = plan_sweep(store, keywords, args.budget, max_pages=args.max_pages)
+    print_plan(plans, len(dict.fromkeys(keywords)), limit=len(plans))
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
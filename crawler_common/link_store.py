@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜尋結果連結主檔（SQLite）
+取代每個關鍵字都要讀入、重建網址集合、再以 indent=2 整個重寫 ptt_links_master.json 的做法：
+連結表以網址為唯一索引，每次搜尋在一個交易內批次 INSERT OR IGNORE，成本只與新結果數有關。
+需要 JSON 時（PTTCrawler.load_links_from_json、crawl_from_links）再用 export_json 匯出成原本的格式
+
+主檔 ptt_links_master.json 對應 ptt_links_master.sqlite；開啟時若 JSON 存在而還沒匯入完成會自動匯入
+（匯入在單一交易內完成並在 meta 記下 json_imported，中斷後下次開啟會重新匯入）。
+資料以 SQLite 為準，要重新開始請刪除 .sqlite 檔
+
+使用方式：
+    python -m crawler_common.link_store stats --db 0820/ptt_links_master.sqlite
+    python -m crawler_common.link_store export --db 0820/ptt_links_master.sqlite --output 0820/ptt_links_master.json
+    python -m crawler_common.link_store import --db 0820/ptt_links_master.sqlite --input 0820/ptt_links_master.json
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+# 連結表的固定欄位，其餘欄位放在 extra（JSON）
+LINK_FIELDS = ['url', 'title', 'source', 'board', 'article_id', 'found_by_keyword', 'found_time']
+
+
+def now_text():
+    return time.strftime('%Y-%m-%d %H:%M:%S')
+
+
+class LinkStore:
+    def __init__(self, db_path):
+        """
+        開啟或建立連結主檔
+
+        Args:
+            db_path (str): SQLite 檔案路徑
+        """
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS links (
+                               url TEXT NOT NULL UNIQUE,
+                               title TEXT,
+                               source TEXT,
+                               board TEXT,
+                               article_id TEXT,
+                               found_by_keyword TEXT,
+                               found_time TEXT,
+                               extra TEXT)''')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS searches (
+                               keyword TEXT NOT NULL,
+                               search_time TEXT NOT NULL,
+                               new_links_found INTEGER NOT NULL,
+                               new_unique_links_added INTEGER NOT NULL,
+                               pages INTEGER NOT NULL DEFAULT 1)''')
+        columns = [row[1] for row in self.db.execute('PRAGMA table_info(searches)')]
+        if 'pages' not in columns:
+            # 舊版主檔沒有記錄搜尋深度
+            self.db.execute('ALTER TABLE searches ADD COLUMN pages INTEGER NOT NULL DEFAULT 1')
+        self.db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self.db.execute("INSERT OR IGNORE INTO meta VALUES ('created_time', ?)", (now_text(),))
+        self.db.commit()
+
+    def _link_row(self, link, keyword, found_time):
+        extra = {key: value for key, value in link.items() if key not in LINK_FIELDS}
+        return (link['url'], link.get('title'), link.get('source'), link.get('board'),
+                link.get('article_id'), link.get('found_by_keyword', keyword),
+                link.get('found_time', found_time), json.dumps(extra, ensure_ascii=False) if extra else None)
+
+    def add_search(self, keyword, links, pages=1, record=True):
+        """
+        記錄一次搜尋並加入新連結（已存在的網址略過）
+
+        Args:
+            keyword (str): 搜尋關鍵字
+            links (list): 連結 dict 列表（至少有 url）
+            pages (int): 這次搜尋的深度（結果頁數），供 keyword_yield 估計下次的收穫
+            record (bool): 是否寫入搜尋紀錄；結果來自搜尋快取時沒有實際發出請求，不記錄以免影響收穫估計
+
+        Returns:
+            int: 實際新增的連結數
+        """
+        found_time = now_text()
+        rows = [self._link_row(link, keyword, found_time) for link in links]
+        with self.lock, self.db:
+            before = self.db.total_changes
+            self.db.executemany('INSERT OR IGNORE INTO links VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            added = self.db.total_changes - before
+            if record:
+                self.db.execute('INSERT INTO searches VALUES (?, ?, ?, ?, ?)',
+                                (keyword, found_time, len(links), added, pages))
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('last_updated', ?)", (found_time,))
+        return added
+
+    def count(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM links').fetchone()[0]
+
+    def _meta(self, key):
+        row = self.db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else ''
+
+    def json_imported(self):
+        """舊的 JSON 主檔是否已經匯入完成（或建立時沒有需要匯入的 JSON）"""
+        with self.lock:
+            return bool(self._meta('json_imported'))
+
+    def mark_json_imported(self, source):
+        with self.lock, self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('json_imported', ?)", (source,))
+
+    def links(self):
+        """依加入順序回傳所有連結（與原本 all_links 相同的格式）"""
+        with self.lock:
+            rows = self.db.execute('SELECT * FROM links ORDER BY rowid').fetchall()
+        results = []
+        for url, title, source, board, article_id, keyword, found_time, extra in rows:
+            # 欄位順序與原本 save_to_master_json 寫出的相同
+            link = {'title': title, 'url': url, 'source': source, 'board': board, 'article_id': article_id}
+            if extra:
+                link.update(json.loads(extra))
+            link.update({'found_by_keyword': keyword, 'found_time': found_time})
+            results.append({key: value for key, value in link.items() if value is not None})
+        return results
+
+    def search_history(self):
+        with self.lock:
+            rows = self.db.execute('SELECT keyword, search_time, new_links_found, new_unique_links_added '
+                                   'FROM searches ORDER BY rowid').fetchall()
+        return [{'keyword': keyword, 'search_time': search_time, 'new_links_found': found,
+                 'new_unique_links_added': added} for keyword, search_time, found, added in rows]
+
+    def keyword_searches(self):
+        """
+        每個關鍵字的搜尋紀錄，依時間排序
+
+        Returns:
+            dict: keyword -> [(search_time, 找到數, 新增數, 頁數), ...]
+        """
+        with self.lock:
+            rows = self.db.execute('SELECT keyword, search_time, new_links_found, new_unique_links_added, pages '
+                                   'FROM searches ORDER BY rowid').fetchall()
+        history = {}
+        for keyword, *record in rows:
+            history.setdefault(keyword, []).append(tuple(record))
+        return history
+
+    def to_dict(self):
+        """組成原本 ptt_links_master.json 的結構"""
+        all_links = self.links()
+        with self.lock:
+            created_time, last_updated = self._meta('created_time'), self._meta('last_updated')
+        return {
+            'created_time': created_time,
+            'last_updated': last_updated,
+            'search_history': self.search_history(),
+            'total_unique_links': len(all_links),
+            'all_links': all_links,
+        }
+
+    def export_json(self, filename):
+        """匯出成原本格式的 JSON（先寫暫存檔再取代，讀取端不會讀到寫一半的檔案）"""
+        tmp_path = f'{filename}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, filename)
+
+    def import_json(self, filename):
+        """
+        匯入舊的 ptt_links_master.json（連結與搜尋紀錄），回傳新增的連結數
+        全部在同一個交易內完成並記下 json_imported；重複匯入時已存在的連結與搜尋紀錄（關鍵字 + 時間相同）會略過
+        """
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        rows = [self._link_row(link, link.get('found_by_keyword'), link.get('found_time'))
+                for link in data.get('all_links', [])]
+        with self.lock, self.db:
+            before = self.db.total_changes
+            self.db.executemany('INSERT OR IGNORE INTO links VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            added = self.db.total_changes - before
+            self.db.executemany('INSERT INTO searches (keyword, search_time, new_links_found, '
+                                'new_unique_links_added) SELECT ?, ?, ?, ? WHERE NOT EXISTS '
+                                '(SELECT 1 FROM searches WHERE keyword = ? AND search_time = ?)',
+                                [(record.get('keyword', ''), record.get('search_time', ''),
+                                  record.get('new_links_found', 0), record.get('new_unique_links_added', 0),
+                                  record.get('keyword', ''), record.get('search_time', ''))
+                                 for record in data.get('search_history', [])])
+            for key in ('created_time', 'last_updated'):
+                if data.get(key):
+                    self.db.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, data[key]))
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('json_imported', ?)", (filename,))
+        return added
+
+    def print_stats(self):
+        with self.lock:
+            searches, keywords = self.db.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT keyword) FROM searches').fetchone()
+            boards = self.db.execute('SELECT COUNT(DISTINCT board) FROM links').fetchone()[0]
+        print(f'連結主檔 {self.db_path}: {self.count()} 個不重複連結（{boards} 個看板），'
+              f'搜尋 {searches} 次 / {keywords} 個關鍵字')
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+_master_stores = {}
+
+
+def open_master(filename):
+    """
+    主 JSON 檔對應的 LinkStore（{主檔名}.sqlite），同一個程式內共用；
+    還沒完成匯入時若 JSON 存在，先匯入其中的連結與搜尋紀錄（上次匯入中斷時會重新匯入）
+    """
+    if filename not in _master_stores:
+        db_path = os.path.splitext(filename)[0] + '.sqlite'
+        store = LinkStore(db_path)
+        if not store.json_imported():
+            if os.path.exists(filename):
+                added = store.import_json(filename)
+                print(f'已從 {filename} 匯入 {added} 個連結到 {db_path}')
+            else:
+                # 沒有舊的 JSON，之後匯出的 JSON 來自這個主檔，不需要再匯入
+                store.mark_json_imported('無')
+        _master_stores[filename] = store
+    return _master_stores[filename]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='連結主檔工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    stats_parser = sub.add_parser('stats', help='顯示連結數與搜尋次數')
+    stats_parser.add_argument('--db', required=True)
+    export_parser = sub.add_parser('export', help='匯出成 ptt_links_master.json 格式')
+    export_parser.add_argument('--db', required=True)
+    export_parser.add_argument('--output', required=True)
+    import_parser = sub.add_parser('import', help='匯入 ptt_links_master.json')
+    import_parser.add_argument('--db', required=True)
+    import_parser.add_argument('--input', required=True)
+    args = parser.parse_args()
+
+    store = LinkStore(args.db)
+    if args.command == 'export':
+        store.export_json(args.output)
+        print(f'已匯出 {store.count()} 個連結到 {args.output}')
+    elif args.command == 'import':
+        print(f'新增 {store.import_json(args.input)} 個連結')
+    else:
+        store.print_stats()
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
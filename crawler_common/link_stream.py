@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜尋到爬取的串流佇列
+搜尋執行緒每找到一批連結就 put 進來（以網址去重），爬取端的事件迴圈以 async for 逐一取出，
+第一個連結出現時就開始下載文章，不必等整批關鍵字搜尋完、寫出 ptt_links_master.json 才開始爬。
+同時也可當成 crawl_links 的 links_data：stream[i] 為第 i 個加入的連結，index_by_url 為網址 -> [i]
+"""
+
+import asyncio
+import threading
+import time
+
+
+class LinkStream:
+    def __init__(self, url_filter=None):
+        """
+        Args:
+            url_filter (callable): url_filter(url) -> bool，在事件迴圈中取出網址時呼叫，
+                                   回傳 False 的網址不送去爬取（例如日誌中已完成的文章）
+        """
+        self.url_filter = url_filter
+        self.lock = threading.Lock()
+        self.links = []
+        self.index_by_url = {}
+        self.pending = []
+        self.loop = None
+        self.queue = None
+        self.closed = False
+        self.duplicates = 0
+        self.skipped = 0
+        self.start = time.monotonic()
+        self.first_link = None
+
+    def put(self, link):
+        """加入一個連結（dict，至少有 url），已加入過的網址略過並回傳 False"""
+        url = link.get('url')
+        with self.lock:
+            if not url or url in self.index_by_url:
+                self.duplicates += 1
+                return False
+            self.index_by_url[url] = [len(self.links)]
+            self.links.append(link)
+            if self.first_link is None:
+                self.first_link = time.monotonic() - self.start
+            if self.loop is None:
+                self.pending.append(url)
+            else:
+                self.loop.call_soon_threadsafe(self.queue.put_nowait, url)
+        return True
+
+    def put_many(self, links, keyword=None):
+        """
+        加入多個連結，keyword 不為 None 時在複本加上 found_by_keyword
+
+        Returns:
+            int: 新加入的連結數
+        """
+        added = 0
+        for link in links:
+            if keyword is not None:
+                link = dict(link, found_by_keyword=keyword)
+            added += self.put(link)
+        return added
+
+    def close(self):
+        """不會再有新的連結，取完目前的佇列後 async for 就結束"""
+        with self.lock:
+            self.closed = True
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    def __len__(self):
+        with self.lock:
+            return len(self.links)
+
+    def __getitem__(self, index):
+        with self.lock:
+            return self.links[index]
+
+    def __aiter__(self):
+        # 第一次在事件迴圈中迭代時綁定迴圈，之前加入的網址移進 asyncio 佇列
+        with self.lock:
+            if self.loop is None:
+                self.loop = asyncio.get_running_loop()
+                self.queue = asyncio.Queue()
+                for url in self.pending:
+                    self.queue.put_nowait(url)
+                self.pending = []
+                if self.closed:
+                    self.queue.put_nowait(None)
+        return self
+
+    async def __anext__(self):
+        while True:
+            url = await self.queue.get()
+            if url is None:
+                # 結束標記放回去，讓其他同時迭代的工作也能結束
+                self.queue.put_nowait(None)
+                raise StopAsyncIteration
+            if self.url_filter is None or self.url_filter(url):
+                return url
+            self.skipped += 1
+
+    def print_stats(self):
+        first = f'{self.first_link:.1f} 秒' if self.first_link is not None else '無'
+        print(f'連結串流: 加入 {len(self)} 個，重複略過 {self.duplicates} 個，'
+              f'日誌中已完成略過 {self.skipped} 個，第一個連結出現於 {first}')
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨看板近似重複文章偵測（MinHash + LSH 分段）
+同一篇文章常被轉錄到好幾個看板，網址不同但內文幾乎一樣；
+以字元 shingle 的 MinHash 簽章分段放進雜湊桶，查詢只比對同桶的候選，
+文章數增加時查詢成本仍維持次線性。爬蟲抓到文章後先查詢，重複的就連到原始文章、略過後續斷詞
+
+使用方式：
+    python -m crawler_common.near_dup --input 0826/crawled_articles.json [--threshold 0.7]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import zlib
+
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+SIGNATURE_PATTERN = re.compile(r'\n--\n.*', re.DOTALL)
+NON_WORD_PATTERN = re.compile(r'[\W_]+')
+
+
+def normalize(text):
+    """去掉簽名檔、空白與標點，只留下文字本身"""
+    text = SIGNATURE_PATTERN.sub('', text or '')
+    return NON_WORD_PATTERN.sub('', text).lower()
+
+
+def shingles(text, size=5):
+    """字元 n-gram（中文沒有空白分詞，用連續字元當 shingle）"""
+    text = normalize(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    def __init__(self, num_perm=128, seed=1):
+        """
+        初始化 MinHash 的雜湊函數組
+
+        Args:
+            num_perm (int): 簽章長度（雜湊函數個數）
+            seed (int): 固定亂數種子，讓存檔的簽章在下次執行時仍可比對
+        """
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self.perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                      for _ in range(num_perm)]
+
+    def signature(self, text, shingle_size=5):
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles(text, shingle_size)]
+        if not hashes:
+            return None
+        return [min((a * h + b) % MERSENNE_PRIME for h in hashes) & MAX_HASH
+                for a, b in self.perms]
+
+
+def estimate_similarity(sig_a, sig_b):
+    """簽章相同位置的比例即 Jaccard 相似度的估計值"""
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / len(sig_a)
+
+
+class NearDupIndex:
+    def __init__(self, filename=None, num_perm=128, bands=16, threshold=0.7, shingle_size=5):
+        """
+        初始化近似重複索引
+
+        Args:
+            filename (str): 保存簽章與重複對應的 JSON 檔，None 表示只放在記憶體
+            num_perm (int): 簽章長度，需能被 bands 整除
+            bands (int): LSH 分段數；每段 num_perm / bands 列，
+                         相似度約 (1/bands)^(bands/num_perm) 以上的文章會成為候選
+            threshold (float): 估計相似度達到多少才算重複
+            shingle_size (int): 字元 shingle 長度
+        """
+        if num_perm % bands:
+            raise ValueError('num_perm 必須能被 bands 整除')
+        self.filename = filename
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.signatures = {}
+        self.duplicates = {}
+        self.buckets = [{} for _ in range(bands)]
+
+        if filename and os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.duplicates = data.get('duplicates', {})
+            for key, signature in data.get('signatures', {}).items():
+                self._insert(key, signature)
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            yield band, tuple(signature[band * self.rows:(band + 1) * self.rows])
+
+    def _insert(self, key, signature):
+        self.signatures[key] = signature
+        for band, band_key in self._band_keys(signature):
+            self.buckets[band].setdefault(band_key, []).append(key)
+
+    def query(self, text=None, signature=None):
+        """
+        找出最相似的已登記文章
+
+        Returns:
+            tuple: (key, 估計相似度)，沒有達到門檻時回傳 (None, 0.0)
+        """
+        if signature is None:
+            signature = self.hasher.signature(text, self.shingle_size)
+        if signature is None:
+            return None, 0.0
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(band_key, ()))
+
+        best_key, best_score = None, 0.0
+        for key in candidates:
+            score = estimate_similarity(signature, self.signatures[key])
+            if score > best_score:
+                best_key, best_score = key, score
+        if best_score >= self.threshold:
+            return best_key, best_score
+        return None, 0.0
+
+    def check(self, key, text):
+        """
+        爬到文章後呼叫：重複時記錄並回傳原始文章的 key，否則登記這篇並回傳 None
+        同一個 key 再次檢查時沿用先前的結果
+        """
+        if key in self.duplicates:
+            return self.duplicates[key]
+        if key in self.signatures:
+            return None
+        signature = self.hasher.signature(text, self.shingle_size)
+        if signature is None:
+            return None
+        canonical, _ = self.query(signature=signature)
+        if canonical is not None:
+            self.duplicates[key] = canonical
+            return canonical
+        self._insert(key, signature)
+        return None
+
+    def canonical(self, key):
+        """取得 key 對應的原始文章（本身就是原始文章時回傳自己）"""
+        return self.duplicates.get(key, key)
+
+    def save(self):
+        """先寫入暫存檔再取代，避免中斷時留下損毀的檔案"""
+        if not self.filename:
+            return
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump({'signatures': self.signatures, 'duplicates': self.duplicates}, f,
+                      ensure_ascii=False)
+        os.replace(tmp_filename, self.filename)
+
+    def print_stats(self):
+        print(f"近似重複索引: 原始文章 {len(self.signatures)} 篇，重複 {len(self.duplicates)} 篇")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='找出文章檔中的近似重複文章')
+    parser.add_argument('--input', default='crawled_articles.json', help='含 url、content 的文章 JSON')
+    parser.add_argument('--threshold', type=float, default=0.7, help='估計相似度門檻')
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        articles = json.load(f)
+    index = NearDupIndex(threshold=args.threshold)
+    for article in articles:
+        canonical = index.check(article['url'], article.get('content'))
+        if canonical and canonical != article['url']:
+            print(f"{article['url']}\n  → 重複於 {canonical}")
+    index.print_stats()
+
+
+if __name__ == '__main__':
+    main()
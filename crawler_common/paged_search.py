@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜尋引擎的多頁搜尋
+每一輪同時送出最多 concurrency 頁（Bing first=、DuckDuckGo s=、Startpage page=），依頁碼順序合併並以網址去重；
+結果數達到上限、翻到 max_pages、或某一頁沒有任何新的網址（已到最後一頁或引擎開始重複結果）就停止。
+fetch_page 回傳 None 表示這一頁沒有送出（斷路器試探中只放行一個請求），
+之後改為逐頁送出並重送這一頁，等試探結果決定；再次被拒表示引擎已斷路，停止翻頁。
+同時送出的請求仍經過 search_session 的 AIMD 限速控制器，不會超過該引擎主機的速率
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+def search_pages(fetch_page, max_results, page_size, max_pages=5, concurrency=2):
+    """
+    多頁搜尋並合併結果
+
+    Args:
+        fetch_page (callable): fetch_page(page) -> 該頁的結果列表（page 從 1 開始，每個結果至少有 url），
+                               請求被斷路器擋下而沒有送出時回傳 None
+        max_results (int): 結果上限
+        page_size (int): 引擎每頁大約的結果數，用來估計這一輪還需要幾頁
+        max_pages (int): 最多翻幾頁
+        concurrency (int): 每一輪同時送出的頁數
+
+    Returns:
+        list: 合併後的結果，依頁碼與頁內順序排列
+    """
+    results = []
+    seen_urls = set()
+    fetched = {}
+    rejected = set()
+    page = 1
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        while page <= max_pages and len(results) < max_results:
+            # 只送出補足剩餘數量所需的頁數，不多送請求；上一輪已取得的頁不重送
+            needed = -(-(max_results - len(results)) // page_size)
+            batch = list(range(page, min(max_pages, page + min(needed, concurrency) - 1) + 1))
+            todo = [number for number in batch if number not in fetched]
+            fetched.update(zip(todo, executor.map(fetch_page, todo)))
+            for number in batch:
+                items = fetched.pop(number)
+                if items is None:
+                    # 前面沒有任何一頁送出成功（整個引擎斷路中），或重送仍被擋下：停止翻頁
+                    if number in rejected or not results:
+                        if results:
+                            print(f"⏭️  第 {number} 頁仍被斷路器擋下，停止翻頁")
+                        return results[:max_results]
+                    # 試探中的斷路器只放行了前面的頁，改為逐頁送出，等試探結果再重送這一頁
+                    rejected.add(number)
+                    concurrency = 1
+                    break
+                new_results = [item for item in items if item['url'] not in seen_urls]
+                if not new_results:
+                    # 這一頁沒有新網址，後面的頁也不會有，同一輪之後的頁一併捨棄
+                    if number > 1:
+                        print(f"📄 第 {number} 頁沒有新的連結，停止翻頁")
+                    return results[:max_results]
+                for item in new_results:
+                    seen_urls.add(item['url'])
+                    results.append(item)
+                page = number + 1
+    return results[:max_results]
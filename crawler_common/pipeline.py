@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+抓取 / 解析兩段式管線
+I/O 段由 AsyncFetcher 下載原始 HTML，CPU 段在 ProcessPoolExecutor 中解析，
+兩段之間用有上限的佇列連接：解析跟不上時下載會自動暫停（背壓），
+解析不再占用事件迴圈，多核心機器上可以維持更多在途請求，並分別統計兩段的處理量
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+
+    def add(self, elapsed, error=False):
+        now = time.perf_counter()
+        if self.started is None:
+            self.started = now - elapsed
+        self.finished = now
+        self.count += 1
+        self.busy += elapsed
+        if error:
+            self.errors += 1
+
+    def throughput(self):
+        """這一段從第一筆開始到最後一筆結束的每秒處理量"""
+        if not self.count or self.finished is None or self.finished <= self.started:
+            return 0.0
+        return self.count / (self.finished - self.started)
+
+
+class PipelineStats:
+    def __init__(self):
+        self.fetch = StageStats('抓取')
+        self.parse = StageStats('解析')
+        self.queue_peak = 0
+        self.callback_errors = 0
+        self.elapsed = 0.0
+
+    def print_stats(self):
+        for stage in (self.fetch, self.parse):
+            average = stage.busy / stage.count * 1000 if stage.count else 0.0
+            print(f"{stage.name}: {stage.count} 頁（錯誤 {stage.errors}），{stage.throughput():.1f} 頁/秒，"
+                  f"平均每頁 {average:.1f} ms")
+        print(f"佇列最高 {self.queue_peak} 頁，總耗時 {self.elapsed:.2f} 秒")
+        if self.callback_errors:
+            print(f"處理結果時發生 {self.callback_errors} 次錯誤")
+
+
+def _timed_call(parse_func, html):
+    """在子行程中執行解析並計時"""
+    start = time.perf_counter()
+    result = parse_func(html)
+    return result, time.perf_counter() - start
+
+
+async def run_pipeline_async(fetcher, urls, parse_func, on_result, pool=None, parse_workers=1,
+                             queue_size=64):
+    """
+    以兩段式管線抓取並解析所有網址
+
+    Args:
+        fetcher (AsyncFetcher): 下載用的抓取引擎，同時下載數為 fetcher.concurrency
+        urls (iterable): 要抓取的網址；也可以是非同步可迭代物件（例如 LinkStream），
+                         網址陸續產生時邊到邊抓
+        parse_func (callable): parse_func(html) -> 解析結果，須為模組層級函數（可 pickle）
+        on_result (callable): on_result(url, 解析結果, error)，在事件迴圈中依完成順序呼叫
+        pool (ProcessPoolExecutor): 解析用的行程池，None 時直接在事件迴圈中解析
+        parse_workers (int): 同時送進行程池的解析工作數
+        queue_size (int): 已下載、等待解析的頁面上限
+
+    Returns:
+        PipelineStats: 各段的處理量統計
+    """
+    loop = asyncio.get_running_loop()
+    stats = PipelineStats()
+    parse_queue = asyncio.Queue(maxsize=queue_size)
+    streaming = hasattr(urls, '__aiter__')
+    url_iter = urls if streaming else iter(urls)
+    start = time.perf_counter()
+
+    async def fetch_one(url):
+        fetch_start = time.perf_counter()
+        _, response, error = await fetcher.fetch(url)
+        if error is None and response.status_code != 200:
+            error = f'HTTP {response.status_code}'
+        stats.fetch.add(time.perf_counter() - fetch_start, error is not None)
+        # 佇列滿了就在這裡等待，下載不會無限制地超前解析
+        await parse_queue.put((url, None if error else response.text, error))
+        stats.queue_peak = max(stats.queue_peak, parse_queue.qsize())
+
+    async def fetch_worker():
+        if streaming:
+            async for url in url_iter:
+                await fetch_one(url)
+        else:
+            for url in url_iter:
+                await fetch_one(url)
+
+    async def parse_worker():
+        while True:
+            item = await parse_queue.get()
+            if item is None:
+                return
+            url, html, error = item
+            parsed = None
+            if error is None:
+                try:
+                    if pool is None:
+                        parsed, elapsed = _timed_call(parse_func, html)
+                    else:
+                        parsed, elapsed = await loop.run_in_executor(pool, _timed_call, parse_func, html)
+                    stats.parse.add(elapsed)
+                except Exception as e:
+                    stats.parse.add(0.0, error=True)
+                    error = e
+            # 結果處理（寫檔、日誌）出錯時只記錄下來；解析工作一旦結束，佇列填滿後下載端會永遠卡在 put
+            try:
+                on_result(url, parsed, error)
+            except Exception as e:
+                stats.callback_errors += 1
+                print(f'處理結果時發生錯誤: {url} {e}')
+
+    parsers = [asyncio.ensure_future(parse_worker()) for _ in range(max(1, parse_workers))]
+    await asyncio.gather(*(fetch_worker() for _ in range(fetcher.concurrency)))
+    for _ in parsers:
+        await parse_queue.put(None)
+    await asyncio.gather(*parsers)
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+def run_pipeline(fetcher, urls, parse_func, on_result, processes=None, queue_size=64):
+    """
+    run_pipeline_async 的同步介面
+
+    Args:
+        processes (int): 解析行程數，None 為 CPU 核心數減一（留一核給下載與事件迴圈），
+                         0 表示在主行程中解析（單核心機器的預設）
+    """
+    if processes is None:
+        processes = (os.cpu_count() or 1) - 1
+    if processes <= 0:
+        return asyncio.run(run_pipeline_async(fetcher, urls, parse_func, on_result,
+                                              queue_size=queue_size))
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        # 每個行程保留兩個工作，行程間傳遞資料時解析不會空轉
+        return asyncio.run(run_pipeline_async(fetcher, urls, parse_func, on_result, pool,
+                                              parse_workers=processes * 2, queue_size=queue_size))
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+單次走訪的 PTT 文章解析器
+以 lxml 建樹後只走訪一次，同時取出 <title>、article-meta-value、正文與推文，
+再依各爬蟲原本的規則組成結果（輸出與原本 BeautifulSoup 版本一致，見 bench_parser.py）
+"""
+
+import re
+
+import lxml.html
+
+
+# 與 BeautifulSoup 一致：這些標籤內的文字不算進 get_text()
+SKIP_TEXT_TAGS = {'script', 'style', 'template', 'rt', 'rp'}
+PRESERVE_WHITESPACE_TAGS = {'pre', 'textarea'}
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+IN_MAIN = 1          # 第一個 id="main-content" 的元素內
+IN_MAIN_DIV = 2      # 第一個 id="main-content" 的 div 內
+IN_METALINE = 4      # article-metaline / article-metaline-right
+IN_META_SPAN = 8     # article-meta-tag / article-meta-value
+IN_PUSH = 16         # div.push
+IN_SKIP = 32
+IN_PRESERVE = 64
+
+PUSH_SLOTS = {
+    'push-tag': ('tag', 'tag_exact'),
+    'push-userid': ('user', 'user_exact'),
+    'push-content': ('content', 'content_exact'),
+    'push-ipdatetime': (None, 'ipdatetime_exact'),
+}
+
+
+def _normalize(text, flags):
+    """BeautifulSoup 會把只有空白的字串縮成單一換行或空格"""
+    if not flags & IN_PRESERVE and not text.strip(ASCII_SPACES):
+        return '\n' if '\n' in text else ' '
+    return text
+
+
+def _element_text(el, flags=0):
+    """等同 BeautifulSoup 的 tag.get_text()"""
+    parts = []
+
+    def collect(node, node_flags):
+        if node.tag in SKIP_TEXT_TAGS:
+            node_flags |= IN_SKIP
+        if node.tag in PRESERVE_WHITESPACE_TAGS:
+            node_flags |= IN_PRESERVE
+        if node.text and not node_flags & IN_SKIP:
+            parts.append(_normalize(node.text, node_flags))
+        for child in node:
+            if isinstance(child.tag, str):
+                collect(child, node_flags)
+            if child.tail and not node_flags & IN_SKIP:
+                parts.append(_normalize(child.tail, node_flags))
+
+    collect(el, flags & IN_PRESERVE)
+    return ''.join(parts)
+
+
+class ParsedArticle:
+    def __init__(self):
+        self.title_el = None
+        self.main = None
+        self.main_div = None
+        self.meta_values = []
+        self.pushes = []
+        self.segments = []
+
+    def text(self, include, exclude):
+        """組合符合條件的正文片段"""
+        return ''.join(text for text, flags in self.segments
+                       if flags & include and not flags & exclude)
+
+    def page_title(self):
+        return _element_text(self.title_el) if self.title_el is not None else None
+
+
+def parse(html):
+    """
+    解析 PTT 文章頁面，只走訪一次 DOM
+
+    Returns:
+        ParsedArticle: 保存 title 元素、meta 值、推文與帶有區塊旗標的正文片段
+    """
+    root = lxml.html.document_fromstring(html)
+    parsed = ParsedArticle()
+    open_pushes = []
+
+    def walk(el, flags):
+        tag = el.tag
+        classes = el.get('class')
+        tokens = classes.split() if classes else ()
+        push = None
+
+        if el.get('id') == 'main-content':
+            if parsed.main is None:
+                parsed.main = el
+                flags |= IN_MAIN
+            if tag == 'div' and parsed.main_div is None:
+                parsed.main_div = el
+                flags |= IN_MAIN_DIV
+
+        if tokens and (tag == 'div' or tag == 'span'):
+            if 'article-metaline' in tokens or 'article-metaline-right' in tokens:
+                flags |= IN_METALINE
+            if 'article-meta-tag' in tokens or 'article-meta-value' in tokens:
+                flags |= IN_META_SPAN
+            if tag == 'div' and 'push' in tokens:
+                push = {'in_metaline': bool(flags & IN_METALINE)}
+                parsed.pushes.append(push)
+                open_pushes.append(push)
+                flags |= IN_PUSH
+            elif tag == 'span':
+                if 'article-meta-value' in tokens:
+                    parsed.meta_values.append((el, flags))
+                for name, (loose, exact) in PUSH_SLOTS.items():
+                    # 原本的 lambda 比對是「class 含有該字串」，class_='push-tag' 則是完全相同
+                    matched_exact = name in tokens
+                    matched_loose = matched_exact or any(name in token for token in tokens)
+                    for open_push in open_pushes:
+                        if loose and matched_loose and loose not in open_push:
+                            open_push[loose] = (el, flags)
+                        if matched_exact and exact not in open_push:
+                            open_push[exact] = (el, flags)
+        elif tag == 'title' and parsed.title_el is None:
+            parsed.title_el = el
+
+        if tag in SKIP_TEXT_TAGS:
+            flags |= IN_SKIP
+        if tag in PRESERVE_WHITESPACE_TAGS:
+            flags |= IN_PRESERVE
+
+        keep = flags & (IN_MAIN | IN_MAIN_DIV) and not flags & IN_SKIP
+        if keep and el.text:
+            parsed.segments.append((_normalize(el.text, flags), flags))
+        for child in el:
+            if isinstance(child.tag, str):
+                walk(child, flags)
+            if keep and child.tail:
+                parsed.segments.append((_normalize(child.tail, flags), flags))
+
+        if push is not None:
+            open_pushes.pop()
+
+    walk(root, 0)
+    return parsed
+
+
+def _slot_text(push, slot):
+    el, flags = push[slot]
+    return _element_text(el, flags)
+
+
+def extract_link_article(html):
+    """
+    crawl_from_links.parse_ptt_article 的規則
+
+    Returns:
+        tuple: (title, content, comments)，comments 為 {"user","tag","text","datetime"} 列表
+    """
+    parsed = parse(html)
+
+    title = parsed.page_title()
+    title = title if title is not None else '無標題'
+    title = re.sub(r'^\[.*?\]\s*', '', title)
+    title = re.sub(r'\s*-\s*PTT.*$', '', title)
+
+    comments = []
+    for push in parsed.pushes:
+        if 'tag' in push and 'user' in push and 'content' in push:
+            comments.append({
+                "user": _slot_text(push, 'user').strip(),
+                "tag": _slot_text(push, 'tag').strip(),
+                "text": _slot_text(push, 'content').lstrip(': ').strip(),
+                "datetime": _slot_text(push, 'ipdatetime_exact').strip() if 'ipdatetime_exact' in push else ''
+            })
+
+    if parsed.main is None:
+        return None, None, []
+
+    content = parsed.text(IN_MAIN, IN_METALINE | IN_PUSH).strip()
+    content = re.sub(r'\n\s*\n', '\n', content)
+    content = re.sub(r'--\n.*', '', content, flags=re.DOTALL)
+    return title, content, comments
+
+
+def extract_crawler_article(html):
+    """
+    PTTCrawler.crawl_ptt_article 的規則
+
+    Returns:
+        dict: title、author、board、date、content、comments（type/user/content/datetime）
+    """
+    parsed = parse(html)
+    article = {'title': '', 'author': '', 'board': '', 'date': '', 'content': '', 'comments': []}
+
+    meta = [_element_text(el, flags).strip() for el, flags in parsed.meta_values]
+    if meta:
+        article['title'] = meta[0]
+    if len(meta) >= 4:
+        article['author'], article['board'], article['title'], article['date'] = meta[:4]
+
+    for push in parsed.pushes:
+        if 'tag_exact' in push and 'user_exact' in push and 'content_exact' in push:
+            article['comments'].append({
+                'type': _slot_text(push, 'tag_exact').strip(),
+                'user': _slot_text(push, 'user_exact').strip(),
+                'content': _slot_text(push, 'content_exact').strip(),
+                'datetime': _slot_text(push, 'ipdatetime_exact').strip() if 'ipdatetime_exact' in push else ''
+            })
+
+    if parsed.main_div is not None:
+        article['content'] = parsed.text(IN_MAIN_DIV, IN_PUSH | IN_META_SPAN).strip()
+    return article
+
+
+def extract_board_article(html):
+    """
+    071401.py / 0826/crawl.py 的 parse_article 規則（正文保留推文）
+
+    Returns:
+        tuple: (title, content, comments)，comments 為 [推文類型, 使用者, 留言內容, 推文時間]
+    """
+    parsed = parse(html)
+    title = parsed.page_title()
+    title = title if title is not None else '無標題'
+
+    if parsed.main is None:
+        raise ValueError('找不到 main-content')
+    content = parsed.text(IN_MAIN, IN_METALINE).strip()
+
+    comments = []
+    for push in parsed.pushes:
+        if push['in_metaline']:
+            continue
+        if 'tag' in push and 'user' in push and 'content' in push:
+            comments.append([_slot_text(push, 'tag').strip(),
+                             _slot_text(push, 'user').strip(),
+                             _slot_text(push, 'content').lstrip(': ').strip(),
+                             _slot_text(push, 'ipdatetime_exact').strip() if 'ipdatetime_exact' in push else ''])
+    return title, content, comments
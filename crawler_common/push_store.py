@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PTT 推文欄式儲存（Parquet / Arrow）
+把巢狀在文章 JSON 裡的推文拆成獨立的欄式表：user、tag 以字典編碼，
+以 article_id 對應文章表、推文時間解析成 timestamp，
+「各地區推噓分佈」「最常留言的使用者」這類統計就能直接向量化計算，不必走訪整棵 JSON。
+另外匯出每篇文章每小時的推文數（時間分桶索引），「發文後第一小時的推文速度」
+「某地區上個月的活躍度」只需掃描分桶表，不必逐則推文計算
+
+需要 pyarrow（pip install pyarrow），沒有安裝時其他模組不受影響
+
+使用方式：
+    python -m crawler_common.push_store export --input 0826/crawled_articles.json --output push_store
+    python -m crawler_common.push_store tags --store push_store
+    python -m crawler_common.push_store top --store push_store [--tag 噓] [--limit 20]
+    python -m crawler_common.push_store velocity --store push_store [--hours 1] [--limit 20]
+    python -m crawler_common.push_store activity --store push_store [--area 板橋] [--since 2025-07-01] [--by day]
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+from crawler_common.jsonl_store import iter_jsonl
+from crawler_common.push_time import TAIPEI, article_posted_at, normalize_push_times
+
+
+ARTICLES_FILE = 'articles.parquet'
+PUSHES_FILE = 'pushes.parquet'
+BUCKETS_FILE = 'push_buckets.parquet'
+
+BOARD_PATTERN = re.compile(r'/bbs/([^/]+)/')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise ImportError('推文欄式儲存需要 pyarrow，請先執行 pip install pyarrow')
+
+
+def load_articles(filename):
+    """讀取 .json 文章陣列或 .jsonl（crawl_from_links 的串流輸出）"""
+    if filename.endswith('.jsonl'):
+        return list(iter_jsonl(filename))
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def build_tables(articles):
+    """
+    把文章列表拆成文章表與推文表
+
+    支援兩種推文格式：crawl_from_links 的 {user, tag, text, datetime}
+    以及 PTTCrawler 的 {type, user, content, datetime}；
+    已有 pushed_at 時直接使用，否則由 datetime 依發文時間推算年份
+
+    Returns:
+        tuple: (articles_table, pushes_table)，pushes.article_id 即文章表的列號
+    """
+    _require_pyarrow()
+    urls, areas, keywords, boards, titles, posted = [], [], [], [], [], []
+    push_article, push_position, push_user, push_tag, push_text, push_time = [], [], [], [], [], []
+
+    for article_id, article in enumerate(articles):
+        url = article.get('url', '')
+        posted_at = article_posted_at(url, article.get('date'))
+        board = BOARD_PATTERN.search(url)
+
+        urls.append(url)
+        areas.append(article.get('area'))
+        keywords.append(article.get('keyword'))
+        boards.append(board.group(1) if board else article.get('board'))
+        titles.append(article.get('title'))
+        posted.append(posted_at)
+
+        comments = article.get('comments') or []
+        push_times = normalize_push_times([comment.get('datetime') for comment in comments], posted_at)
+        for position, (comment, pushed_at) in enumerate(zip(comments, push_times)):
+            if comment.get('pushed_at'):
+                pushed_at = datetime.fromisoformat(comment['pushed_at'])
+            push_article.append(article_id)
+            push_position.append(position)
+            push_user.append(comment.get('user'))
+            push_tag.append(comment.get('tag', comment.get('type')))
+            push_text.append(comment.get('text', comment.get('content')))
+            push_time.append(pushed_at)
+
+    timestamp = pa.timestamp('s', tz='Asia/Taipei')
+    articles_table = pa.table({
+        'article_id': pa.array(range(len(urls)), pa.int32()),
+        'url': pa.array(urls, pa.string()),
+        'area': pa.array(areas, pa.string()).dictionary_encode(),
+        'keyword': pa.array(keywords, pa.string()).dictionary_encode(),
+        'board': pa.array(boards, pa.string()).dictionary_encode(),
+        'title': pa.array(titles, pa.string()),
+        'posted_at': pa.array(posted, timestamp),
+    })
+    pushes_table = pa.table({
+        'article_id': pa.array(push_article, pa.int32()),
+        'position': pa.array(push_position, pa.int32()),
+        'user': pa.array(push_user, pa.string()).dictionary_encode(),
+        'tag': pa.array(push_tag, pa.string()).dictionary_encode(),
+        'text': pa.array(push_text, pa.string()),
+        'pushed_at': pa.array(push_time, timestamp),
+    })
+    return articles_table, pushes_table
+
+
+def warn_undated(pushes_table):
+    """
+    沒有推文時間的推文無法放進時間分桶，數量不為 0 時提示使用者
+
+    Returns:
+        int: 沒有推文時間的推文數
+    """
+    undated = pushes_table['pushed_at'].null_count
+    if undated:
+        print(f'⚠️  {undated}/{pushes_table.num_rows} 則推文沒有推文時間，不會計入時間分桶'
+              f'（velocity / activity）。請先以 python -m crawler_common.html_archive reparse 重新擷取，'
+              f'或重新爬取文章取得推文時間後再匯出')
+    return undated
+
+
+def build_buckets(articles_table, pushes_table):
+    """
+    時間分桶索引：每篇文章、每小時、每種推文的數量
+
+    Returns:
+        pyarrow.Table: [article_id, area, bucket, hours_since_post, tag, count]，
+                       bucket 為推文時間取整到小時，hours_since_post 為發文後第幾個小時
+    """
+    pushes = pushes_table.filter(pc.is_valid(pushes_table['pushed_at']))
+    posted = pc.take(articles_table['posted_at'], pushes['article_id'])
+    seconds = pc.cast(pc.subtract(pushes['pushed_at'], posted), pa.int64())
+    table = pa.table({
+        'article_id': pushes['article_id'],
+        'area': pc.take(articles_table['area'], pushes['article_id']),
+        'bucket': pc.floor_temporal(pushes['pushed_at'], unit='hour'),
+        'hours_since_post': pc.cast(pc.floor(pc.divide(pc.cast(seconds, pa.float64()), 3600.0)),
+                                    pa.int32()),
+        'tag': pushes['tag'],
+    })
+    keys = ['article_id', 'area', 'bucket', 'hours_since_post', 'tag']
+    buckets = table.group_by(keys).aggregate([([], 'count_all')])
+    buckets = buckets.select(keys + ['count_all']).rename_columns(keys + ['count'])
+    return buckets.sort_by([('article_id', 'ascending'), ('bucket', 'ascending')])
+
+
+def export_store(input_filename, store_dir='push_store'):
+    """
+    把文章 JSON / JSONL 匯出成 store_dir 下的 articles.parquet、pushes.parquet
+    與時間分桶索引 push_buckets.parquet
+
+    Returns:
+        tuple: (文章數, 推文數)
+    """
+    articles_table, pushes_table = build_tables(load_articles(input_filename))
+    warn_undated(pushes_table)
+    os.makedirs(store_dir, exist_ok=True)
+    pq.write_table(articles_table, os.path.join(store_dir, ARTICLES_FILE), compression='zstd')
+    pq.write_table(pushes_table, os.path.join(store_dir, PUSHES_FILE), compression='zstd')
+    pq.write_table(build_buckets(articles_table, pushes_table), os.path.join(store_dir, BUCKETS_FILE),
+                   compression='zstd')
+    return articles_table.num_rows, pushes_table.num_rows
+
+
+def _decode(table):
+    """聚合後的鍵欄位轉回一般字串（字典欄位無法排序，聚合結果很小，轉換成本可忽略）"""
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type):
+            table = table.set_column(i, field.name, pc.cast(table[field.name], field.type.value_type))
+    return table
+
+
+class PushStore:
+    def __init__(self, store_dir='push_store'):
+        """
+        讀取匯出的推文欄式資料
+
+        Args:
+            store_dir (str): export_store 的輸出資料夾
+        """
+        _require_pyarrow()
+        self.articles = pq.read_table(os.path.join(store_dir, ARTICLES_FILE))
+        self.pushes = pq.read_table(os.path.join(store_dir, PUSHES_FILE))
+        buckets_path = os.path.join(store_dir, BUCKETS_FILE)
+        if os.path.exists(buckets_path):
+            self.buckets = pq.read_table(buckets_path)
+        else:
+            # 舊版匯出沒有分桶索引，讀取時現場建立
+            self.buckets = build_buckets(self.articles, self.pushes)
+
+    def article_column(self, name):
+        """把文章表的欄位對齊到每一則推文（article_id 就是文章表的列號）"""
+        return pc.take(self.articles[name], self.pushes['article_id'])
+
+    def tag_distribution(self, by='area'):
+        """
+        各地區（或 keyword / board）的推、噓、→ 數量
+
+        Returns:
+            pyarrow.Table: [by, tag, count]，依 by、count 排序
+        """
+        table = pa.table({by: self.article_column(by), 'tag': self.pushes['tag']})
+        counts = table.group_by([by, 'tag']).aggregate([([], 'count_all')])
+        counts = _decode(counts.select([by, 'tag', 'count_all']).rename_columns([by, 'tag', 'count']))
+        return counts.sort_by([(by, 'ascending'), ('count', 'descending')])
+
+    def top_commenters(self, limit=20, tag=None):
+        """
+        留言最多的使用者
+
+        Args:
+            limit (int): 取前幾名
+            tag (str): 只計算某種推文（例如 '噓'），None 表示全部
+
+        Returns:
+            pyarrow.Table: [user, count, articles]，articles 為留言過的文章數
+        """
+        pushes = self.pushes
+        if tag is not None:
+            pushes = pushes.filter(pc.equal(pc.cast(pushes['tag'], pa.string()), tag))
+        counts = pushes.group_by('user').aggregate([('article_id', 'count'),
+                                                    ('article_id', 'count_distinct')])
+        counts = counts.select(['user', 'article_id_count', 'article_id_count_distinct'])
+        counts = _decode(counts.rename_columns(['user', 'count', 'articles']))
+        return counts.sort_by([('count', 'descending'), ('user', 'ascending')]).slice(0, limit)
+
+    def push_velocity(self, hours=1, limit=20):
+        """
+        發文後前 hours 小時內推文最多的文章（只掃描分桶索引）
+
+        Returns:
+            pyarrow.Table: [url, title, area, pushes]
+        """
+        buckets = self.buckets
+        elapsed = buckets['hours_since_post']
+        buckets = buckets.filter(pc.and_(pc.greater_equal(elapsed, 0), pc.less(elapsed, hours)))
+        counts = buckets.group_by('article_id').aggregate([('count', 'sum')])
+        counts = counts.sort_by([('count_sum', 'descending'), ('article_id', 'ascending')]).slice(0, limit)
+        ids = counts['article_id']
+        return _decode(pa.table({
+            'url': pc.take(self.articles['url'], ids),
+            'title': pc.take(self.articles['title'], ids),
+            'area': pc.take(self.articles['area'], ids),
+            'pushes': counts['count_sum'],
+        }))
+
+    def area_activity(self, area=None, since=None, until=None, by='day'):
+        """
+        各地區在每個時段的推文數（只掃描分桶索引）
+
+        Args:
+            area (str): 只看某個地區，None 表示全部
+            since (datetime): 起始時間（含），None 表示不限
+            until (datetime): 結束時間（不含），None 表示不限
+            by (str): 'hour'、'day' 或 'month'
+
+        Returns:
+            pyarrow.Table: [area, period, count]，依 area、period 排序
+        """
+        buckets = self.buckets
+        if area is not None:
+            buckets = buckets.filter(pc.equal(pc.cast(buckets['area'], pa.string()), area))
+        bucket_type = buckets.schema.field('bucket').type
+        if since is not None:
+            buckets = buckets.filter(pc.greater_equal(buckets['bucket'], pa.scalar(since, bucket_type)))
+        if until is not None:
+            buckets = buckets.filter(pc.less(buckets['bucket'], pa.scalar(until, bucket_type)))
+        period = buckets['bucket'] if by == 'hour' else pc.floor_temporal(buckets['bucket'], unit=by)
+        table = pa.table({'area': buckets['area'], 'period': period, 'count': buckets['count']})
+        counts = table.group_by(['area', 'period']).aggregate([('count', 'sum')])
+        counts = _decode(counts.select(['area', 'period', 'count_sum']).rename_columns(['area', 'period', 'count']))
+        return counts.sort_by([('area', 'ascending'), ('period', 'ascending')])
+
+
+def print_table(table):
+    for row in table.to_pylist():
+        print('  '.join(str(value) for value in row.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='PTT 推文欄式儲存')
+    sub = parser.add_subparsers(dest='command', required=True)
+    export_parser = sub.add_parser('export', help='把文章 JSON/JSONL 匯出成 Parquet')
+    export_parser.add_argument('--input', default='crawled_articles.json', help='文章 .json 或 .jsonl')
+    export_parser.add_argument('--output', default='push_store', help='輸出資料夾')
+    tags_parser = sub.add_parser('tags', help='各地區推噓分佈')
+    tags_parser.add_argument('--store', default='push_store')
+    tags_parser.add_argument('--by', default='area', choices=['area', 'keyword', 'board'])
+    top_parser = sub.add_parser('top', help='最常留言的使用者')
+    top_parser.add_argument('--store', default='push_store')
+    top_parser.add_argument('--tag', default=None, help='只計算某種推文，例如 噓')
+    top_parser.add_argument('--limit', type=int, default=20)
+    velocity_parser = sub.add_parser('velocity', help='發文後前幾小時推文最多的文章')
+    velocity_parser.add_argument('--store', default='push_store')
+    velocity_parser.add_argument('--hours', type=int, default=1)
+    velocity_parser.add_argument('--limit', type=int, default=20)
+    activity_parser = sub.add_parser('activity', help='各地區每個時段的推文數')
+    activity_parser.add_argument('--store', default='push_store')
+    activity_parser.add_argument('--area', default=None)
+    activity_parser.add_argument('--since', default=None, help='起始日期，例如 2025-07-01')
+    activity_parser.add_argument('--until', default=None, help='結束日期（不含），例如 2025-08-01')
+    activity_parser.add_argument('--by', default='day', choices=['hour', 'day', 'month'])
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        start = time.perf_counter()
+        article_count, push_count = export_store(args.input, args.output)
+        print(f'已匯出 {article_count} 篇文章、{push_count} 則推文到 {args.output}/'
+              f'（{time.perf_counter() - start:.2f} 秒）')
+        return
+
+    store = PushStore(args.store)
+    start = time.perf_counter()
+    if args.command == 'tags':
+        result = store.tag_distribution(args.by)
+    elif args.command == 'top':
+        result = store.top_commenters(args.limit, args.tag)
+    elif args.command == 'velocity':
+        result = store.push_velocity(args.hours, args.limit)
+    else:
+        since = datetime.fromisoformat(args.since).replace(tzinfo=TAIPEI) if args.since else None
+        until = datetime.fromisoformat(args.until).replace(tzinfo=TAIPEI) if args.until else None
+        result = store.area_activity(args.area, since, until, args.by)
+    elapsed = (time.perf_counter() - start) * 1000
+    print_table(result)
+    if args.command in ('velocity', 'activity'):
+        print(f'查詢 {store.buckets.num_rows} 個分桶（{store.pushes.num_rows} 則推文）耗時 {elapsed:.1f} ms')
+        warn_undated(store.pushes)
+    else:
+        print(f'查詢 {store.pushes.num_rows} 則推文耗時 {elapsed:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PTT 推文時間正規化
+推文頁面上只有「MM/DD HH:MM」（有時前面帶 IP），沒有年份；
+以文章發文時間（網址 M.<epoch> 或文章的「時間」欄位）推算年份，
+並依推文順序處理跨年：時間比前一則推文早了超過一天，就表示已經進入下一年
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+
+from crawler_common.watermark import parse_article_id
+
+
+# PTT 時間一律是台灣時間
+TAIPEI = timezone(timedelta(hours=8))
+PUSH_TIME_PATTERN = re.compile(r'(\d{1,2})/(\d{1,2})\s+(\d{1,2}):(\d{2})')
+ROLLOVER_TOLERANCE = timedelta(days=1)
+
+
+def article_posted_at(url=None, date_text=None):
+    """
+    取得文章的發文時間
+
+    Args:
+        url (str): 文章網址，優先使用其中的 M.<epoch>
+        date_text (str): 文章的「時間」欄位，例如 'Fri Aug  8 10:30:00 2025'
+
+    Returns:
+        datetime: 台灣時間，無法判斷時回傳 None
+    """
+    parsed_id = parse_article_id(url or '')
+    if parsed_id:
+        return datetime.fromtimestamp(parsed_id[0], TAIPEI)
+    try:
+        return datetime.strptime(' '.join((date_text or '').split()),
+                                 '%a %b %d %H:%M:%S %Y').replace(tzinfo=TAIPEI)
+    except ValueError:
+        return None
+
+
+def normalize_push_times(texts, posted_at):
+    """
+    依序把推文時間轉成完整的 datetime
+
+    Args:
+        texts (list): 各則推文的原始時間文字，順序與頁面相同
+        posted_at (datetime): 文章發文時間
+
+    Returns:
+        list: 與 texts 對應的 datetime，無法解析時為 None
+    """
+    if posted_at is None:
+        return [None] * len(texts)
+    year = posted_at.year
+    previous = posted_at
+    results = []
+    for text in texts:
+        match = PUSH_TIME_PATTERN.search(text or '')
+        if not match:
+            results.append(None)
+            continue
+        month, day, hour, minute = (int(g) for g in match.groups())
+        try:
+            pushed_at = datetime(year, month, day, hour, minute, tzinfo=TAIPEI)
+            if pushed_at < previous - ROLLOVER_TOLERANCE:
+                # 推文不會早於發文與前一則推文，月份倒退表示跨年（12 月的文章在 1 月被推）
+                pushed_at = pushed_at.replace(year=year + 1)
+        except ValueError:
+            results.append(None)
+            continue
+        year = pushed_at.year
+        previous = pushed_at
+        results.append(pushed_at)
+    return results
+
+
+def parse_push_time(text, posted_at):
+    """解析單則推文的時間（沒有前一則推文可參考時，以發文時間判斷跨年）"""
+    return normalize_push_times([text], posted_at)[0]
+
+
+def add_push_times(comments, posted_at, source='datetime'):
+    """
+    在每則推文加上 pushed_at（ISO 8601 字串，無法解析時為 None）
+
+    Args:
+        comments (list): 推文 dict 列表，原始時間在 comment[source]
+        posted_at (datetime): 文章發文時間
+
+    Returns:
+        list: 原本的 comments（就地修改）
+    """
+    times = normalize_push_times([comment.get(source) for comment in comments], posted_at)
+    for comment, pushed_at in zip(comments, times):
+        comment['pushed_at'] = pushed_at.isoformat() if pushed_at else None
+    return comments
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每個主機的 AIMD 自適應限速
+回應正常時每秒把速率加上固定值（加法增加），遇到 429、5xx、連線錯誤或延遲明顯上升時把速率乘上
+一個比例（乘法減少），速率最後會停在伺服器能承受的最高值附近，取代寫死的 time.sleep
+"""
+
+import asyncio
+import threading
+import time
+import urllib.parse
+
+
+class HostRate:
+    def __init__(self, rate):
+        self.rate = rate
+        self.next_time = 0.0
+        self.latency = None       # 延遲的指數移動平均
+        self.baseline = None      # 觀察到的最低平均延遲
+        self.last_decrease = 0.0
+        self.ok = 0
+        self.congested = 0
+
+
+class AIMDController:
+    def __init__(self, initial_rate=2.0, min_rate=0.2, max_rate=20.0, increase=0.5, decrease=0.5,
+                 latency_factor=2.0, cooldown=1.0):
+        """
+        初始化限速控制器
+
+        Args:
+            initial_rate (float): 新主機的起始速率（每秒請求數）
+            min_rate (float): 速率下限
+            max_rate (float): 速率上限
+            increase (float): 回應正常時，每秒增加的速率
+            decrease (float): 壅塞時速率乘上的比例
+            latency_factor (float): 平均延遲超過基準的幾倍視為壅塞
+            cooldown (float): 兩次減速之間至少間隔幾秒（同一波壅塞只減一次）
+        """
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _host(self, url):
+        host = urllib.parse.urlsplit(url).netloc or url
+        if host not in self.hosts:
+            self.hosts[host] = HostRate(self.initial_rate)
+        return self.hosts[host]
+
+    def set_rate(self, url, rate):
+        """手動設定某個主機目前的速率（url 可以是網址或主機名稱）"""
+        with self.lock:
+            self._host(url).rate = min(self.max_rate, max(self.min_rate, rate))
+
+    def reserve(self, url):
+        """預約下一個發送時間，回傳需要等待的秒數"""
+        with self.lock:
+            state = self._host(url)
+            now = time.monotonic()
+            slot = max(now, state.next_time)
+            state.next_time = slot + 1 / state.rate
+            return slot - now
+
+    def wait(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    async def wait_async(self, url):
+        delay = self.reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def record(self, url, status=None, latency=None, retry_after=None):
+        """
+        回報一次請求的結果
+
+        Args:
+            url (str): 請求的網址
+            status (int): HTTP 狀態碼，連線錯誤或逾時為 None
+            latency (float): 回應時間（秒）
+            retry_after (float): 伺服器 Retry-After 要求等待的秒數
+        """
+        with self.lock:
+            state = self._host(url)
+            now = time.monotonic()
+            slow = False
+            if latency is not None:
+                state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+                if state.baseline is None or state.latency < state.baseline:
+                    state.baseline = state.latency
+                slow = state.latency > state.baseline * self.latency_factor
+
+            if status is None or status == 429 or status >= 500 or slow:
+                state.congested += 1
+                if now - state.last_decrease >= self.cooldown:
+                    state.rate = max(self.min_rate, state.rate * self.decrease)
+                    state.last_decrease = now
+                    # 減速後延遲基準重新觀察
+                    state.baseline = state.latency
+                state.next_time = max(state.next_time, now + (retry_after or 0), now + 1 / state.rate)
+            else:
+                state.ok += 1
+                # 速率 r 時每秒約有 r 個回應，每個加 increase / r，合計每秒增加 increase
+                state.rate = min(self.max_rate, state.rate + self.increase / state.rate)
+
+    def stats(self):
+        with self.lock:
+            return {host: {'rate': s.rate, 'ok': s.ok, 'congested': s.congested,
+                           'latency': s.latency}
+                    for host, s in self.hosts.items()}
+
+    def print_stats(self):
+        for host, s in sorted(self.stats().items()):
+            latency = f"{s['latency'] * 1000:.0f} ms" if s['latency'] is not None else '-'
+            print(f"限速 {host}: 目前 {s['rate']:.2f} 次/秒，正常 {s['ok']}，壅塞 {s['congested']}，"
+                  f"平均延遲 {latency}")
+
+
+def parse_retry_after(response):
+    """讀取 Retry-After 標頭的秒數（HTTP 日期格式不處理）"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+_shared_controller = None
+
+
+def get_controller():
+    """取得整個程式共用的 AIMDController（第一次呼叫時建立）"""
+    global _shared_controller
+    if _shared_controller is None:
+        _shared_controller = AIMDController()
+    return _shared_controller
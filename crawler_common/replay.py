@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+離線錄製 / 重播
+以環境變數切換模式，爬蟲程式本身不需要改參數：
+    CRAWLER_REPLAY=record   照常連網，並把每個回應與瀏覽器頁面快照存到 CRAWLER_REPLAY_DIR
+    CRAWLER_REPLAY=replay   不連網，所有請求改由本機替身伺服器回放錄下的內容
+    （未設定）              正常連網
+CRAWLER_REPLAY_DIR 預設為 replay_fixtures
+
+requests 的部分在 HTTPAdapter 層攔截：設定 CRAWLER_REPLAY 時，匯入任何 crawler_common 模組就會安裝
+（crawler_common/__init__.py 呼叫 install()），之後模組層級的 requests.get 與各個 Session 都會經過；
+完全沒有匯入 crawler_common 的腳本不會被攔截。重播時請求會真的送到本機伺服器，
+連線、HTTP 解析與並行都照常執行，端對端跑一次就是可重複的效能測試。
+Selenium 的部分由 BrowserReplay 在導覽完成的時間點保存 page_source，
+重播時略過登入、搜尋、捲動等步驟，直接讓瀏覽器載入替身伺服器上的快照再照常擷取
+
+使用方式：
+    CRAWLER_REPLAY=record python 0826/crawl_from_links.py
+    CRAWLER_REPLAY=replay python 0826/crawl_from_links.py
+    python -m crawler_common.replay stats [--dir replay_fixtures]
+    python -m crawler_common.replay serve [--dir replay_fixtures] [--port 8765]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from requests.adapters import HTTPAdapter
+
+
+MODE_ENV = 'CRAWLER_REPLAY'
+DIR_ENV = 'CRAWLER_REPLAY_DIR'
+DEFAULT_DIR = 'replay_fixtures'
+KEPT_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Retry-After', 'Location')
+SCRIPT_PATTERN = re.compile(r'<script\b.*?</script\s*>', re.IGNORECASE | re.DOTALL)
+# 快照頁面禁止載入任何外部資源，重播時瀏覽器完全不連網
+SNAPSHOT_CSP = "default-src 'none'; style-src 'unsafe-inline'; img-src data:; font-src data:"
+
+
+def current_mode():
+    """目前的模式：'record'、'replay' 或 None"""
+    mode = os.environ.get(MODE_ENV, '').strip().lower()
+    return mode if mode in ('record', 'replay') else None
+
+
+def request_key(method, url, body=None):
+    """請求的識別字串：方法、查詢參數排序後的網址，有內容時再加上內容雜湊"""
+    parts = urllib.parse.urlsplit(url)
+    query = urllib.parse.urlencode(sorted(urllib.parse.parse_qsl(parts.query, keep_blank_values=True)))
+    key = f'{method.upper()} {urllib.parse.urlunsplit(parts._replace(query=query, fragment=""))}'
+    if body:
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        key += ' ' + hashlib.sha256(data).hexdigest()[:16]
+    return key
+
+
+def page_key(key):
+    """瀏覽器快照的識別字串，key 可以是字串或 tuple"""
+    return 'PAGE ' + json.dumps(key, ensure_ascii=False)
+
+
+def fixture_id(key):
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class FixtureStore:
+    def __init__(self, fixture_dir=DEFAULT_DIR):
+        """
+        開啟或建立錄製資料
+
+        Args:
+            fixture_dir (str): 資料夾，內含 index.sqlite 與 blobs/（以 sha256 命名，相同內容只存一份）
+        """
+        self.fixture_dir = fixture_dir
+        self.blob_dir = os.path.join(fixture_dir, 'blobs')
+        os.makedirs(self.blob_dir, exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(os.path.join(fixture_dir, 'index.sqlite'), check_same_thread=False)
+        self.db.execute('''CREATE TABLE IF NOT EXISTS fixtures (
+                               id TEXT PRIMARY KEY,
+                               key TEXT NOT NULL,
+                               kind TEXT NOT NULL,
+                               url TEXT,
+                               status INTEGER NOT NULL,
+                               headers TEXT NOT NULL,
+                               blob TEXT NOT NULL,
+                               size INTEGER NOT NULL,
+                               recorded REAL NOT NULL)''')
+        self.db.commit()
+
+    def _blob_path(self, blob):
+        return os.path.join(self.blob_dir, blob[:2], blob)
+
+    def save(self, key, kind, url, status, headers, body):
+        """保存一筆回應或快照（同一個 key 以最後一次錄製為準）"""
+        blob = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(blob)
+        with self.lock:
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f'{path}.{threading.get_ident()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+                os.replace(tmp_path, path)
+            self.db.execute('INSERT OR REPLACE INTO fixtures VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                            (fixture_id(key), key, kind, url, status,
+                             json.dumps(headers, ensure_ascii=False), blob, len(body), time.time()))
+            self.db.commit()
+
+    def save_response(self, request, response):
+        headers = {name: response.headers[name] for name in KEPT_HEADERS if name in response.headers}
+        self.save(request_key(request.method, request.url, request.body), 'http', request.url,
+                  response.status_code, headers, response.content)
+
+    def save_page(self, key, url, html):
+        # 去掉 script，快照只保留渲染後的 DOM，重播時不會再執行網站的程式
+        body = SCRIPT_PATTERN.sub('', html).encode('utf-8')
+        self.save(page_key(key), 'page', url, 200, {'Content-Type': 'text/html; charset=utf-8'}, body)
+
+    def lookup(self, identifier):
+        """
+        依 id 取得錄製內容
+
+        Returns:
+            tuple: (status, headers, body, url)，沒有錄製時回傳 None
+        """
+        with self.lock:
+            row = self.db.execute('SELECT status, headers, blob, url FROM fixtures WHERE id = ?',
+                                  (identifier,)).fetchone()
+        if not row or not os.path.exists(self._blob_path(row[2])):
+            return None
+        with open(self._blob_path(row[2]), 'rb') as f:
+            return row[0], json.loads(row[1]), f.read(), row[3]
+
+    def stats(self):
+        with self.lock:
+            rows = self.db.execute('SELECT kind, COUNT(*), SUM(size) FROM fixtures GROUP BY kind').fetchall()
+        return {kind: {'count': count, 'bytes': size} for kind, count, size in rows}
+
+    def print_stats(self):
+        s = self.stats()
+        for kind, name in (('http', 'HTTP 回應'), ('page', '頁面快照')):
+            entry = s.get(kind, {'count': 0, 'bytes': 0})
+            print(f"錄製資料 {name}: {entry['count']} 筆，{entry['bytes'] / 1024:.0f} KB")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+class ReplayServer:
+    def __init__(self, store, host='127.0.0.1', port=0):
+        """
+        回放錄製內容的本機替身伺服器，路徑為 /r/<fixture id>
+
+        Args:
+            store (FixtureStore): 錄製資料
+            host (str): 綁定位址
+            port (int): 綁定埠號，0 表示自動挑選
+        """
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                identifier = urllib.parse.urlsplit(self.path).path.rsplit('/', 1)[-1]
+                fixture = server.store.lookup(identifier)
+                if fixture is None:
+                    server.misses += 1
+                    self.send_response(404)
+                    self.send_header('X-Replay-Miss', '1')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                server.hits += 1
+                status, headers, body, _ = fixture
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                if headers.get('Content-Type', '').startswith('text/html'):
+                    self.send_header('Content-Security-Policy', SNAPSHOT_CSP)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_POST = do_GET
+            do_HEAD = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def url_for(self, key):
+        return f'{self.base_url}/r/{fixture_id(key)}'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+_store = None
+_server = None
+_lock = threading.Lock()
+_original_send = HTTPAdapter.send
+
+
+def get_store():
+    """取得 CRAWLER_REPLAY_DIR 的錄製資料（第一次呼叫時開啟）"""
+    global _store
+    with _lock:
+        if _store is None:
+            _store = FixtureStore(os.environ.get(DIR_ENV) or DEFAULT_DIR)
+        return _store
+
+
+def get_server():
+    """取得回放用的替身伺服器（第一次呼叫時在背景執行緒啟動）"""
+    global _server
+    store = get_store()
+    with _lock:
+        if _server is None:
+            _server = ReplayServer(store).start()
+            print(f'重播模式：請求改由 {_server.base_url} 回放 {store.fixture_dir}')
+        return _server
+
+
+def _send(adapter, request, **kwargs):
+    mode = current_mode()
+    if mode == 'record':
+        response = _original_send(adapter, request, **kwargs)
+        get_store().save_response(request, response)
+        return response
+    if mode == 'replay':
+        original_url = request.url
+        request.url = get_server().url_for(request_key(request.method, original_url, request.body))
+        kwargs['proxies'] = {}
+        try:
+            response = _original_send(adapter, request, **kwargs)
+        finally:
+            request.url = original_url
+        response.url = original_url
+        return response
+    return _original_send(adapter, request, **kwargs)
+
+
+def install():
+    """在 HTTPAdapter 層安裝錄製 / 重播（可重複呼叫，沒有設定 CRAWLER_REPLAY 時不做任何事）"""
+    if current_mode() and HTTPAdapter.send is not _send:
+        HTTPAdapter.send = _send
+
+
+class BrowserReplay:
+    def __init__(self, driver):
+        """
+        Selenium 的錄製 / 重播
+
+        Args:
+            driver: selenium webdriver
+        """
+        self.driver = driver
+        self.mode = current_mode()
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def snapshot(self, key):
+        """錄製模式時保存目前頁面（導覽、等待完成後呼叫），其他模式不做任何事"""
+        if self.recording:
+            get_store().save_page(key, self.driver.current_url, self.driver.page_source)
+
+    def restore(self, key):
+        """
+        重播模式：讓瀏覽器載入 key 的快照，之後的 find_element 照常執行
+
+        Returns:
+            bool: 沒有錄製這個 key 時回傳 False
+        """
+        if get_store().lookup(fixture_id(page_key(key))) is None:
+            print(f'重播資料中沒有這個頁面: {key}')
+            return False
+        self.driver.get(get_server().url_for(page_key(key)))
+        return True
+
+    def page_source(self, key):
+        """
+        取得 page_source：錄製模式同時保存；重播模式直接讀取快照，不經過瀏覽器
+
+        Returns:
+            str: HTML，重播資料中沒有時回傳空字串
+        """
+        if self.replaying:
+            fixture = get_store().lookup(fixture_id(page_key(key)))
+            if fixture is None:
+                print(f'重播資料中沒有這個頁面: {key}')
+                return ''
+            return fixture[2].decode('utf-8')
+        html = self.driver.page_source
+        if self.recording:
+            get_store().save_page(key, self.driver.current_url, html)
+        return html
+
+
+def main():
+    parser = argparse.ArgumentParser(description='錄製 / 重播資料工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    stats_parser = sub.add_parser('stats', help='顯示錄製資料統計')
+    stats_parser.add_argument('--dir', default=os.environ.get(DIR_ENV, DEFAULT_DIR))
+    serve_parser = sub.add_parser('serve', help='單獨啟動替身伺服器')
+    serve_parser.add_argument('--dir', default=os.environ.get(DIR_ENV, DEFAULT_DIR))
+    serve_parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    store = FixtureStore(args.dir)
+    if args.command == 'stats':
+        store.print_stats()
+        return
+    server = ReplayServer(store, port=args.port)
+    print(f'替身伺服器：{server.base_url}/r/<fixture id>（Ctrl+C 結束）')
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+搜尋結果快取
+以 (引擎, 正規化後的查詢字串, 搜尋深度) 為鍵（深度即翻幾頁，1 頁與 5 頁的結果分開保存），把解析好的結果列表存到 SQLite：
+    TTL 內            直接回傳，不連網
+    TTL ~ stale_ttl   先回傳舊結果，同時在背景重新搜尋更新（stale-while-revalidate）
+    超過 stale_ttl    視為沒有快取，照常搜尋
+筆數超過上限時依最近最少使用 (LRU) 淘汰。空結果不快取（多半是被擋或暫時錯誤）
+
+使用方式：
+    @cached_search('Bing')
+    def search_via_bing(query, max_results=10): ...
+
+    python -m crawler_common.search_cache stats [--db search_cache.sqlite]
+    python -m crawler_common.search_cache clear [--db search_cache.sqlite] [--engine Bing]
+"""
+
+import argparse
+import functools
+import inspect
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+
+
+class CachedResults(list):
+    """從快取取得的結果列表：沒有發出請求，呼叫端可依 from_cache 略過速率間隔與收穫紀錄"""
+    from_cache = True
+
+
+def normalize_query(query):
+    """全形轉半形、統一大小寫與空白，'中山  治安' 與 '中山 治安' 視為同一個查詢"""
+    return ' '.join(unicodedata.normalize('NFKC', query).lower().split())
+
+
+def search_depth(search, kwargs):
+    """搜尋深度：呼叫時指定的 max_pages，否則為搜尋函數的預設值；沒有 max_pages 參數的函數視為 1 頁"""
+    if 'max_pages' in kwargs:
+        return kwargs['max_pages']
+    param = inspect.signature(search).parameters.get('max_pages')
+    if param is None or param.default is param.empty:
+        return 1
+    return param.default
+
+
+class SearchCache:
+    def __init__(self, db_path='search_cache.sqlite', ttl=6 * 3600, stale_ttl=7 * 24 * 3600,
+                 max_entries=20000):
+        """
+        初始化快取
+
+        Args:
+            db_path (str): SQLite 檔案路徑
+            ttl (float): 結果視為新鮮的秒數
+            stale_ttl (float): 超過 ttl 但未超過這個秒數時，回傳舊結果並在背景更新
+            max_entries (int): 最多保留幾筆，超過時淘汰最久沒用到的
+        """
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(db_path, check_same_thread=False)
+        columns = [row[1] for row in self.db.execute('PRAGMA table_info(results)')]
+        if 'page' in columns:
+            # 舊版以沒有用到的頁碼為鍵，不同深度的結果互相覆蓋；只是快取，直接重建
+            self.db.execute('DROP TABLE results')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS results (
+                               engine TEXT NOT NULL,
+                               query TEXT NOT NULL,
+                               depth INTEGER NOT NULL,
+                               max_results INTEGER NOT NULL,
+                               results TEXT NOT NULL,
+                               fetched REAL NOT NULL,
+                               last_access REAL NOT NULL,
+                               PRIMARY KEY (engine, query, depth))''')
+        self.db.execute('CREATE INDEX IF NOT EXISTS idx_results_access ON results(last_access)')
+        self.db.commit()
+        self.refreshing = set()
+
+        # 統計：fresh = TTL 內命中，stale = 回傳舊結果並背景更新，misses = 實際搜尋
+        self.fresh = 0
+        self.stale = 0
+        self.misses = 0
+        self.refreshes = 0
+
+    def get(self, engine, query, depth=1, max_results=10):
+        """
+        查詢快取
+
+        Returns:
+            tuple: (結果列表, 是否新鮮)，沒有可用的快取時回傳 None
+        """
+        key = (engine, normalize_query(query), depth)
+        with self.lock:
+            row = self.db.execute('SELECT max_results, results, fetched FROM results '
+                                  'WHERE engine = ? AND query = ? AND depth = ?', key).fetchone()
+            if not row:
+                return None
+            cached_max, results, fetched = row
+            results = json.loads(results)
+            # 以前只要了較少筆而且剛好被截斷時，不能滿足這次較多的需求
+            if max_results > cached_max and len(results) >= cached_max:
+                return None
+            age = time.time() - fetched
+            if age > self.stale_ttl:
+                return None
+            self.db.execute('UPDATE results SET last_access = ? WHERE engine = ? AND query = ? AND depth = ?',
+                            (time.time(),) + key)
+            self.db.commit()
+        return results[:max_results], age <= self.ttl
+
+    def put(self, engine, query, results, depth=1, max_results=10):
+        """保存結果（空結果不保存）"""
+        if not results:
+            return
+        now = time.time()
+        with self.lock:
+            self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (engine, normalize_query(query), depth, max_results,
+                             json.dumps(results, ensure_ascii=False), now, now))
+            self._evict()
+            self.db.commit()
+
+    def _evict(self):
+        count = self.db.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+        if count > self.max_entries:
+            self.db.execute('DELETE FROM results WHERE rowid IN '
+                            '(SELECT rowid FROM results ORDER BY last_access LIMIT ?)',
+                            (count - self.max_entries,))
+
+    def _refresh(self, key, search, query, max_results, kwargs):
+        """背景重新搜尋，成功時更新快取"""
+        engine, _, depth = key
+        try:
+            results = search(query, max_results, **kwargs)
+            self.put(engine, query, results, depth, max_results)
+        except Exception as e:
+            print(f'背景更新搜尋快取失敗 ({engine} {query}): {e}')
+        finally:
+            with self.lock:
+                self.refreshing.discard(key)
+
+    def fetch_cached(self, engine, search, query, max_results=10, **kwargs):
+        """
+        只查快取：命中時回傳 CachedResults（舊結果同時在背景更新），沒有可用的快取時回傳 None
+        """
+        depth = search_depth(search, kwargs)
+        cached = self.get(engine, query, depth, max_results)
+        if cached is None:
+            return None
+        results, fresh = cached
+        key = (engine, normalize_query(query), depth)
+        with self.lock:
+            start_refresh = not fresh and key not in self.refreshing
+            if fresh:
+                self.fresh += 1
+            else:
+                self.stale += 1
+            if start_refresh:
+                self.refreshing.add(key)
+                self.refreshes += 1
+        if start_refresh:
+            threading.Thread(target=self._refresh, args=(key, search, query, max_results, kwargs),
+                             daemon=True).start()
+        print(f"💾 {engine} 使用{'快取' if fresh else '舊快取（背景更新中）'}: {query}，{len(results)} 筆")
+        return CachedResults(results)
+
+    def fetch(self, engine, search, query, max_results=10, **kwargs):
+        """
+        經過快取的搜尋
+
+        Args:
+            engine (str): 引擎名稱（快取鍵的一部分）
+            search (callable): 實際的搜尋函數 search(query, max_results, **kwargs)
+            query (str): 搜尋字串
+            max_results (int): 結果上限
+            **kwargs: 其餘傳給搜尋函數的參數，其中 max_pages（搜尋深度）也是快取鍵的一部分
+
+        Returns:
+            list: 結果列表，來自快取時為 CachedResults（from_cache 為 True）
+        """
+        cached = self.fetch_cached(engine, search, query, max_results, **kwargs)
+        if cached is not None:
+            return cached
+
+        with self.lock:
+            self.misses += 1
+        results = search(query, max_results, **kwargs)
+        self.put(engine, query, results, search_depth(search, kwargs), max_results)
+        return results
+
+    def clear(self, engine=None):
+        with self.lock:
+            if engine:
+                self.db.execute('DELETE FROM results WHERE engine = ?', (engine,))
+            else:
+                self.db.execute('DELETE FROM results')
+            self.db.commit()
+
+    def stats(self):
+        with self.lock:
+            rows = self.db.execute('SELECT engine, COUNT(*) FROM results GROUP BY engine').fetchall()
+            total = self.fresh + self.stale + self.misses
+            return {
+                'fresh': self.fresh,
+                'stale': self.stale,
+                'misses': self.misses,
+                'refreshes': self.refreshes,
+                'hit_rate': (self.fresh + self.stale) / total if total else 0.0,
+                'entries': dict(rows),
+            }
+
+    def print_stats(self):
+        s = self.stats()
+        entries = '、'.join(f'{engine} {count}' for engine, count in s['entries'].items()) or '無'
+        print(f"搜尋快取: 新鮮命中 {s['fresh']}，舊結果命中 {s['stale']}（背景更新 {s['refreshes']}），"
+              f"未命中 {s['misses']}（命中率 {s['hit_rate']:.1%}），快取筆數: {entries}")
+
+    def close(self):
+        with self.lock:
+            self.db.close()
+
+
+_shared_cache = None
+
+
+def get_search_cache():
+    """取得整個程式共用的 SearchCache（第一次呼叫時建立）"""
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = SearchCache()
+    return _shared_cache
+
+
+def cached_search(engine):
+    """
+    裝飾器：讓搜尋函數 func(query, max_results=10, **kwargs) 經過共用的搜尋快取
+    wrapper.peek(query, max_results) 只查快取（沒有時回傳 None），排程器用來判斷是否需要等待請求間隔
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(query, max_results=10, **kwargs):
+            return get_search_cache().fetch(engine, func, query, max_results, **kwargs)
+
+        def peek(query, max_results=10, **kwargs):
+            return get_search_cache().fetch_cached(engine, func, query, max_results, **kwargs)
+
+        wrapper.uncached = func
+        wrapper.peek = peek
+        return wrapper
+    return decorator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='搜尋結果快取工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    stats_parser = sub.add_parser('stats', help='顯示各引擎的快取筆數')
+    stats_parser.add_argument('--db', default='search_cache.sqlite')
+    clear_parser = sub.add_parser('clear', help='清除快取')
+    clear_parser.add_argument('--db', default='search_cache.sqlite')
+    clear_parser.add_argument('--engine', default=None, help='只清除某個引擎')
+    args = parser.parse_args()
+
+    cache = SearchCache(args.db)
+    if args.command == 'stats':
+        cache.print_stats()
+    else:
+        cache.clear(args.engine)
+        print('已清除搜尋快取')
+    cache.close()
+
+
+if __name__ == '__main__':
+    main()
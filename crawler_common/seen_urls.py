@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨執行共用的「已看過網址」紀錄
+記憶體映射 (mmap) 的 Bloom filter 擋掉絕大多數沒看過的網址，
+Bloom filter 判定可能看過時再查 SQLite 上的精確集合，所以不會誤判；
+查詢為 O(1)，記憶體用量只取決於設定的容量與誤判率，與網址數無關
+
+使用方式：
+    python -m crawler_common.seen_urls stats --store 0820/ptt_links_master_seen
+    python -m crawler_common.seen_urls rebuild --store ptt_crawled_urls [--capacity 5000000] [--error-rate 0.001]
+    python -m crawler_common.seen_urls import --store 0820/ptt_links_master_seen --input 0820/ptt_links_master.json
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import time
+
+
+BLOOM_MAGIC = b'BLOOM1'
+BLOOM_HEADER = struct.Struct('<6sQQQQd')  # magic, 位元數, 雜湊數, 已加入數, 容量, 誤判率
+
+
+def bloom_parameters(capacity, error_rate):
+    """依容量與誤判率計算位元數 m 與雜湊數 k"""
+    bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, hashes
+
+
+class BloomFilter:
+    def __init__(self, filename, capacity=1000000, error_rate=0.001):
+        """
+        開啟或建立記憶體映射的 Bloom filter
+
+        Args:
+            filename (str): 位元陣列檔；已存在時沿用檔案內的參數
+            capacity (int): 預計加入的網址數
+            error_rate (float): 達到容量時的誤判率
+        """
+        self.filename = filename
+        if not os.path.exists(filename):
+            bits, hashes = bloom_parameters(capacity, error_rate)
+            with open(filename, 'wb') as f:
+                f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, bits, hashes, 0, capacity, error_rate))
+                f.truncate(BLOOM_HEADER.size + (bits + 7) // 8)
+
+        self.file = open(filename, 'r+b')
+        self.mm = mmap.mmap(self.file.fileno(), 0)
+        (magic, self.bits, self.hashes, self.count,
+         self.capacity, self.error_rate) = BLOOM_HEADER.unpack_from(self.mm, 0)
+        if magic != BLOOM_MAGIC:
+            raise ValueError(f'{filename} 不是 Bloom filter 檔案')
+
+    def _positions(self, url):
+        # 雙重雜湊：一次 blake2b 取兩個 64 位元值，組出 k 個位置
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.bits for i in range(self.hashes)]
+
+    def __contains__(self, url):
+        offset = BLOOM_HEADER.size
+        mm = self.mm
+        return all(mm[offset + (pos >> 3)] & (1 << (pos & 7)) for pos in self._positions(url))
+
+    def add(self, url):
+        offset = BLOOM_HEADER.size
+        for pos in self._positions(url):
+            self.mm[offset + (pos >> 3)] |= 1 << (pos & 7)
+        self.count += 1
+
+    def estimated_error_rate(self):
+        """以目前加入數估計的誤判率"""
+        return (1 - math.exp(-self.hashes * self.count / self.bits)) ** self.hashes
+
+    def flush(self):
+        BLOOM_HEADER.pack_into(self.mm, 0, BLOOM_MAGIC, self.bits, self.hashes, self.count,
+                               self.capacity, self.error_rate)
+        self.mm.flush()
+
+    def close(self):
+        if not self.mm.closed:
+            self.flush()
+            self.mm.close()
+            self.file.close()
+
+
+class SeenURLStore:
+    def __init__(self, path_prefix='seen_urls', capacity=1000000, error_rate=0.001):
+        """
+        開啟已看過網址的紀錄
+
+        Args:
+            path_prefix (str): 檔名前綴，會產生 {prefix}.bloom 與 {prefix}.sqlite
+            capacity (int): Bloom filter 容量，超過時誤判率上升（執行 rebuild 放大）
+            error_rate (float): Bloom filter 的誤判率（誤判只會多查一次 SQLite）
+        """
+        self.path_prefix = path_prefix
+        self.bloom_file = path_prefix + '.bloom'
+        self.db = sqlite3.connect(path_prefix + '.sqlite')
+        self.db.execute('''CREATE TABLE IF NOT EXISTS seen (
+                               url TEXT PRIMARY KEY,
+                               source TEXT,
+                               added TEXT NOT NULL)''')
+        self.db.commit()
+        self.bloom = BloomFilter(self.bloom_file, capacity, error_rate)
+        if self.bloom.count == 0 and len(self):
+            # Bloom filter 檔遺失或剛建立時，由精確集合重建
+            self._fill_bloom()
+        self.pending = 0
+
+    def _fill_bloom(self):
+        for (url,) in self.db.execute('SELECT url FROM seen'):
+            self.bloom.add(url)
+        self.bloom.flush()
+
+    def __len__(self):
+        return self.db.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def __contains__(self, url):
+        if url not in self.bloom:
+            return False
+        return self.db.execute('SELECT 1 FROM seen WHERE url = ?', (url,)).fetchone() is not None
+
+    def add(self, url, source=None):
+        """
+        加入網址
+
+        Returns:
+            bool: 之前沒看過時回傳 True
+        """
+        if url in self:
+            return False
+        cursor = self.db.execute('INSERT OR IGNORE INTO seen (url, source, added) VALUES (?, ?, ?)',
+                                 (url, source, time.strftime('%Y-%m-%d %H:%M:%S')))
+        self.bloom.add(url)
+        self.pending += 1
+        if self.pending >= 100:
+            self.flush()
+        return cursor.rowcount > 0
+
+    def add_many(self, urls, source=None):
+        """加入多個網址，回傳新加入的數量"""
+        return sum(1 for url in urls if self.add(url, source))
+
+    def clear(self):
+        """清空紀錄（對應的資料檔重新開始時使用）"""
+        self.db.execute('DELETE FROM seen')
+        self.db.commit()
+        self.rebuild()
+
+    def rebuild(self, capacity=None, error_rate=None):
+        """
+        依精確集合重建 Bloom filter
+        網址數接近容量時用較大的 capacity 重建，誤判率就會回到設定值
+        """
+        capacity = capacity or max(self.bloom.capacity, len(self) * 2)
+        error_rate = error_rate or self.bloom.error_rate
+        self.bloom.close()
+        os.remove(self.bloom_file)
+        self.bloom = BloomFilter(self.bloom_file, capacity, error_rate)
+        self._fill_bloom()
+
+    def stats(self):
+        return {
+            'urls': len(self),
+            'capacity': self.bloom.capacity,
+            'bloom_bytes': (self.bloom.bits + 7) // 8,
+            'hashes': self.bloom.hashes,
+            'estimated_error_rate': self.bloom.estimated_error_rate(),
+        }
+
+    def print_stats(self):
+        s = self.stats()
+        print(f"已看過網址 {s['urls']} 個（容量 {s['capacity']}），Bloom filter "
+              f"{s['bloom_bytes'] / 1024:.0f} KB、{s['hashes']} 個雜湊，估計誤判率 {s['estimated_error_rate']:.4%}")
+
+    def flush(self):
+        self.db.commit()
+        self.bloom.flush()
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.bloom.close()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_urls(filename):
+    """從 ptt_links_master.json、文章 JSON 或每行一個網址的文字檔取出網址"""
+    if filename.endswith('.json'):
+        with open(filename, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        items = data.get('all_links', []) if isinstance(data, dict) else data
+        for item in items:
+            if item.get('url'):
+                yield item['url']
+        return
+    with open(filename, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield line.strip()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='已看過網址紀錄的維護工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+    for name, help_text in [('stats', '顯示統計'), ('rebuild', '由精確集合重建 Bloom filter'),
+                            ('import', '從 JSON / 文字檔匯入網址')]:
+        sub_parser = sub.add_parser(name, help=help_text)
+        sub_parser.add_argument('--store', required=True, help='檔名前綴（不含 .bloom / .sqlite）')
+        if name == 'rebuild':
+            sub_parser.add_argument('--capacity', type=int, default=None, help='新的容量（預設為網址數兩倍）')
+            sub_parser.add_argument('--error-rate', type=float, default=None, help='新的誤判率')
+        if name == 'import':
+            sub_parser.add_argument('--input', required=True, nargs='+', help='要匯入的檔案')
+    args = parser.parse_args()
+
+    with SeenURLStore(args.store) as store:
+        if args.command == 'rebuild':
+            start = time.perf_counter()
+            store.rebuild(args.capacity, args.error_rate)
+            print(f'已重建 Bloom filter（{time.perf_counter() - start:.2f} 秒）')
+        elif args.command == 'import':
+            for filename in args.input:
+                added = store.add_many(iter_urls(filename), source=os.path.basename(filename))
+                print(f'{filename}: 新增 {added} 個網址')
+        store.print_stats()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本機 PTT 替身伺服器
+把已爬取的文章還原成 PTT 的 HTML 版面，讓爬蟲可以在不連網的情況下做效能測試
+"""
+
+import hashlib
+import html
+import json
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def article_path(url):
+    """取得文章網址的路徑部分，例如 /bbs/home-sale/M.1690000000.A.123.html"""
+    return urllib.parse.urlsplit(url).path
+
+
+def strip_title_suffix(title):
+    """crawled_articles.json 的標題保留了 <title> 的「- 看板 xxx - 批踢踢實業坊」，還原時先去掉"""
+    return re.sub(r'\s*-\s*看板\s.*$', '', title)
+
+
+def render_body(content):
+    """正文中的網址和 PTT 一樣轉成連結，圖片網址後面加上 richcontent 預覽區塊"""
+    def link(match):
+        url = match.group(0)
+        anchor = f'<a href="{url}" target="_blank" rel="noopener noreferrer nofollow">{url}</a>'
+        if 'imgur.com' in url:
+            anchor += f'<div class="richcontent"><img src="{url}" alt="" /></div>'
+        return anchor
+
+    return re.sub(r'https?://[^\s<>"]+', link, html.escape(content, quote=False))
+
+
+def render_ptt_article(record):
+    """
+    把 crawled_articles.json 的一筆資料轉成 PTT 文章頁面的 HTML
+
+    Args:
+        record (dict): 含 url、title、content、comments 的文章資料
+    """
+    board_match = re.search(r'/bbs/([^/]+)/', record.get('url', ''))
+    board = board_match.group(1) if board_match else 'Test'
+    title = strip_title_suffix(record.get('title', ''))
+
+    meta = [
+        ('article-metaline', '作者', record.get('author', 'stub (stub)')),
+        ('article-metaline-right', '看板', board),
+        ('article-metaline', '標題', title),
+        ('article-metaline', '時間', record.get('date', 'Tue Aug  8 10:00:00 2023')),
+    ]
+    meta_html = ''.join(
+        f'<div class="{cls}"><span class="article-meta-tag">{tag}</span>'
+        f'<span class="article-meta-value">{html.escape(value)}</span></div>'
+        for cls, tag, value in meta
+    )
+
+    push_html = ''.join(
+        '<div class="push">'
+        f'<span class="hl push-tag">{html.escape(c.get("tag", "→"))} </span>'
+        f'<span class="f3 hl push-userid">{html.escape(c.get("user", ""))}</span>'
+        f'<span class="f3 push-content">: {html.escape(c.get("text", ""))}</span>'
+        f'<span class="push-ipdatetime"> {html.escape(c.get("datetime", "08/08 10:52"))}\n</span>'
+        '</div>'
+        for c in record.get('comments', [])
+    )
+
+    url = html.escape(record.get('url', ''))
+    return (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+        f'<title>{html.escape(title)} - 看板 {board} - 批踢踢實業坊</title>\n'
+        '</head>\n<body>\n'
+        '<div id="main-container">\n'
+        f'<div id="main-content" class="bbs-screen bbs-content">{meta_html}'
+        f'{render_body(record.get("content", ""))}\n'
+        '--\n<span class="f2">※ 發信站: 批踢踢實業坊(ptt.cc), 來自: 127.0.0.1 (臺灣)\n</span>'
+        f'<span class="f2">※ 文章網址: <a href="{url}" target="_blank" rel="noopener noreferrer nofollow">'
+        f'{url}</a>\n</span>'
+        f'{push_html}</div>\n'
+        '</div>\n</body>\n</html>\n'
+    )
+
+
+def render_ptt_index(board, records, number, max_number):
+    """
+    產生看板索引頁 index{number}.html 的 HTML
+
+    Args:
+        board (str): 看板名稱
+        records (list): 本頁的文章資料（由舊到新）
+        number (int): 本頁頁碼
+        max_number (int): 最新頁頁碼
+    """
+    prev_href = f'href="/bbs/{board}/index{number - 1}.html"' if number > 1 else ''
+    next_href = f'href="/bbs/{board}/index{number + 1}.html"' if number < max_number else ''
+    entries = ''.join(
+        '<div class="r-ent"><div class="nrec"></div>'
+        f'<div class="title"><a href="{html.escape(article_path(r["url"]))}">'
+        f'{html.escape(strip_title_suffix(r.get("title", "")))}</a></div>'
+        '</div>'
+        for r in records
+    )
+    return (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+        f'<title>看板 {board} 文章列表 - 批踢踢實業坊</title>\n'
+        '</head>\n<body>\n'
+        '<div class="btn-group btn-group-paging">'
+        f'<a class="btn wide" href="/bbs/{board}/index1.html">最舊</a>'
+        f'<a class="btn wide" {prev_href}>&lsaquo; 上頁</a>'
+        f'<a class="btn wide" {next_href}>下頁 &rsaquo;</a>'
+        f'<a class="btn wide" href="/bbs/{board}/index.html">最新</a>'
+        '</div>\n'
+        f'<div class="r-list-container action-bar-margin bbs-screen">{entries}</div>\n'
+        '</body>\n</html>\n'
+    )
+
+
+def render_ptt_search(board, records, query, page, per_page=20):
+    """
+    產生看板搜尋結果頁 search?q=...&page=N 的 HTML
+    標題含有查詢字串的每個詞才算符合，新文章在第一頁，「上頁」指向下一頁較舊的結果
+    """
+    terms = query.split()
+    matched = [r for r in reversed(records)
+               if all(term in strip_title_suffix(r.get('title', '')) for term in terms)]
+    page_records = matched[(page - 1) * per_page:page * per_page]
+    quoted = urllib.parse.quote(query)
+    prev_href = (f'href="/bbs/{board}/search?page={page + 1}&amp;q={quoted}"'
+                 if page * per_page < len(matched) else '')
+    entries = ''.join(
+        '<div class="r-ent"><div class="nrec"></div>'
+        f'<div class="title"><a href="{html.escape(article_path(r["url"]))}">'
+        f'{html.escape(strip_title_suffix(r.get("title", "")))}</a></div>'
+        '<div class="meta"><div class="author">stub</div><div class="date"> 8/08</div></div>'
+        '</div>'
+        for r in page_records
+    )
+    return (
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+        f'<title>看板 {board} 文章列表 - 批踢踢實業坊</title>\n'
+        '</head>\n<body>\n'
+        '<div class="btn-group btn-group-paging">'
+        f'<a class="btn wide" {prev_href}>&lsaquo; 上頁</a>'
+        '</div>\n'
+        f'<div class="r-list-container action-bar-margin bbs-screen">{entries}</div>\n'
+        '</body>\n</html>\n'
+    )
+
+
+class PTTStubServer:
+    def __init__(self, pages=None, latency=0.0, host='127.0.0.1', port=0):
+        """
+        初始化替身伺服器
+
+        Args:
+            pages (dict): 路徑 -> HTML 字串
+            latency (float): 每個回應前人為加入的延遲秒數，用來模擬網路往返
+            host (str): 綁定位址
+            port (int): 綁定埠號，0 表示自動挑選
+        """
+        self.pages = pages if pages is not None else {}
+        self.boards = {}
+        self.latency = latency
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                time.sleep(server.latency)
+                server.hits += 1
+                parts = urllib.parse.urlsplit(self.path)
+                body = server.pages.get(parts.path)
+                search = re.fullmatch(r'/bbs/([^/]+)/search', parts.path)
+                if search and search.group(1) in server.boards:
+                    params = urllib.parse.parse_qs(parts.query)
+                    body = render_ptt_search(search.group(1), server.boards[search.group(1)],
+                                             params.get('q', [''])[0], int(params.get('page', ['1'])[0]))
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                data = body.encode('utf-8')
+                etag = '"%s"' % hashlib.md5(data).hexdigest()
+                if self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def local_url(self, url):
+        """把 ptt.cc 的網址改寫成指向替身伺服器的網址"""
+        return self.base_url + article_path(url)
+
+    def add_articles(self, records):
+        """把多篇文章資料轉成頁面加入伺服器"""
+        for record in records:
+            self.pages[article_path(record['url'])] = render_ptt_article(record)
+
+    def add_board(self, board, records, per_page=20):
+        """把文章依代碼時間排序後分頁，產生看板的 index{k}.html 與 index.html"""
+        records = sorted(records, key=lambda r: article_path(r['url']).rsplit('/', 1)[-1])
+        self.boards[board] = records
+        max_number = max(1, (len(records) + per_page - 1) // per_page)
+        for number in range(1, max_number + 1):
+            page = render_ptt_index(board, records[(number - 1) * per_page:number * per_page],
+                                    number, max_number)
+            self.pages[f'/bbs/{board}/index{number}.html'] = page
+            if number == max_number:
+                self.pages[f'/bbs/{board}/index.html'] = page
+        self.add_articles(records)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def load_records(json_filename):
+    """讀取 crawled_articles.json 格式的文章列表"""
+    with open(json_filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PTT 看板的增量爬取水位線
+以文章代碼 M.<epoch>.A.<hash> 的時間戳記錄每個看板上次爬到的最新文章，
+下次翻頁時遇到更舊的文章就停止，排程只需下載新增的部分
+"""
+
+import json
+import os
+import re
+import time
+
+
+ARTICLE_ID_PATTERN = re.compile(r'M\.(\d+)\.A\.([0-9A-Za-z]+)')
+
+
+def parse_article_id(url):
+    """從文章網址取出 (epoch, 文章代碼)，格式不符時回傳 None"""
+    match = ARTICLE_ID_PATTERN.search(url)
+    if not match:
+        return None
+    return int(match.group(1)), match.group(0)
+
+
+class BoardWatermarks:
+    def __init__(self, filename='ptt_watermarks.json'):
+        """
+        初始化水位線紀錄
+
+        Args:
+            filename (str): 保存各看板水位線的 JSON 檔
+        """
+        self.filename = filename
+        self.marks = {}
+        if os.path.exists(filename):
+            with open(filename, 'r', encoding='utf-8') as f:
+                self.marks = json.load(f)
+
+    def get(self, board):
+        """取得看板的水位線 {'epoch': int, 'ids': [...]}，沒有紀錄時回傳 None"""
+        return self.marks.get(board)
+
+    def is_new(self, board, url):
+        """文章是否比上次爬到的最新文章還新"""
+        mark = self.marks.get(board)
+        parsed = parse_article_id(url)
+        if not mark or not parsed:
+            return True
+        epoch, article_id = parsed
+        # 同一秒可能有多篇文章，所以相同 epoch 時再比對文章代碼
+        return epoch > mark['epoch'] or (epoch == mark['epoch'] and article_id not in mark['ids'])
+
+    def reached(self, board, page_links):
+        """
+        這一頁是否已經碰到上次爬過的位置
+        索引頁由舊到新排列，置底文章在最後面，所以只看第一篇（本頁最舊的一般文章）
+        """
+        if not self.marks.get(board) or not page_links:
+            return False
+        return not self.is_new(board, page_links[0])
+
+    def advance(self, board, urls, reached=True, errors=0):
+        """
+        用這次爬到的文章推進水位線
+
+        Args:
+            board (str): 看板名稱
+            urls: 這次爬到的文章網址
+            reached (bool): 這次是否翻到了上次的水位線（或看板的第一頁）
+            errors (int): 這次下載或解析失敗的文章與索引頁數
+
+        Returns:
+            bool: 是否推進了水位線。中間還有沒爬到的頁（翻頁上限先到）或有文章失敗時保留原本的水位線，
+                  下次從最新頁重新翻到舊的位置，已爬過的文章由 SeenURLStore 略過
+        """
+        mark = self.marks.get(board)
+        if errors or (mark and not reached):
+            reason = f'{errors} 篇文章失敗' if errors else '翻頁上限內沒有到達上次爬取的位置'
+            print(f'{board} {reason}，保留原本的水位線')
+            return False
+        mark = mark or {'epoch': 0, 'ids': []}
+        epoch, ids = mark['epoch'], set(mark['ids'])
+        for url in urls:
+            parsed = parse_article_id(url)
+            if not parsed:
+                continue
+            if parsed[0] > epoch:
+                epoch, ids = parsed[0], {parsed[1]}
+            elif parsed[0] == epoch:
+                ids.add(parsed[1])
+        self.marks[board] = {
+            'epoch': epoch,
+            'ids': sorted(ids),
+            'updated': time.strftime('%Y-%m-%d %H:%M:%S')
+        }
+        return True
+
+    def save(self):
+        """先寫入暫存檔再取代，避免中斷時留下損毀的檔案"""
+        tmp_filename = self.filename + '.tmp'
+        with open(tmp_filename, 'w', encoding='utf-8') as f:
+            json.dump(self.marks, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_filename, self.filename)